@@ -1,16 +1,35 @@
 """Python asyncio library for Simple Service Discovery Protocol (SSDP)."""
 
+import importlib
+
 from . import _version
-from .aio import SimpleServiceDiscoveryProtocol
-from .deprecation import moved
-from .messages import SSDPMessage, SSDPRequest, SSDPResponse
 
 __version__ = _version.version
 __all__ = []
 
 VERSION = _version.version_tuple
 
-SimpleServiceDiscoveryProtocol = moved(SimpleServiceDiscoveryProtocol)
-SSDPMessage = moved(SSDPMessage)
-SSDPRequest = moved(SSDPRequest)
-SSDPResponse = moved(SSDPResponse)
+# Deprecated aliases are imported on first access,
+# to keep `import ssdp` from loading asyncio.
+_MOVED = {
+    "SimpleServiceDiscoveryProtocol": ".aio",
+    "SSDPMessage": ".messages",
+    "SSDPRequest": ".messages",
+    "SSDPResponse": ".messages",
+}
+
+
+def __getattr__(name):
+    try:
+        module = _MOVED[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    from .deprecation import moved
+
+    value = moved(getattr(importlib.import_module(module, __name__), name))
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted({*globals(), *_MOVED})
@@ -1,22 +1,88 @@
 #!/usr/bin/env python3
 import asyncio
+import collections
+import functools
+import importlib.util
+import json
 import logging
+import socket
+import sys
 import time
 
-from ssdp import messages, network
+from ssdp import aio, capture, filters, messages, network
 from ssdp.aio import SSDP
 
 try:
     import click
-    from pygments import formatters, highlight
 
-    from .lexers import SSDPLexer
+    # Pygments is only imported, once a message is highlighted.
+    if importlib.util.find_spec("pygments") is None:
+        raise ImportError("No module named 'pygments'", name="pygments")
 except ImportError as e:
     raise ImportError(
         "The SSDP CLI requires needs to be installed via `pip install ssdp[cli]`."
     ) from e
 
 
+@functools.cache
+def _highlighter():
+    # Lexing is the expensive part of pretty printing, so both are reused.
+    from pygments import formatters, highlight
+
+    from .lexers import SSDPLexer
+
+    return functools.partial(
+        highlight, lexer=SSDPLexer(), formatter=formatters.TerminalFormatter()
+    )
+
+
+class Timestamp:
+    """Format the current time, at most once per second."""
+
+    __slots__ = ("_second", "_text")
+
+    def __init__(self):
+        self._second = None
+        self._text = ""
+
+    def __call__(self, now):
+        second = int(now)
+        if second != self._second:
+            self._second = second
+            self._text = time.asctime(time.localtime(second))
+        return self._text
+
+
+def format_host(addr):
+    return f"[{addr[0]}]" if ":" in addr[0] else addr[0]
+
+
+def format_plain(msg, addr, now, timestamp):
+    return f"{format_host(addr)}:{addr[1]} - - [{timestamp(now)}] {msg}\n"
+
+
+def format_pretty(msg, addr, now, timestamp):
+    host = click.style(format_host(addr), fg="green", bold=True)
+    port = click.style(str(addr[1]), fg="yellow", bold=True)
+    pretty_msg = _highlighter()(str(msg))
+    return f"{host}:{port} - - [{timestamp(now)}] {pretty_msg}"
+
+
+def format_jsonl(msg, addr, now, timestamp):
+    record = {"time": round(now, 6), "host": addr[0], "port": addr[1]}
+    if isinstance(msg, messages.SSDPResponse):
+        record["status_code"] = msg.status_code
+        record["reason"] = msg.reason
+    else:
+        record["method"] = msg.method
+        record["uri"] = msg.uri
+    record["headers"] = list(msg.headers)
+    return json.dumps(record) + "\n"
+
+
+FORMATS = {"jsonl": format_jsonl, "plain": format_plain, "pretty": format_pretty}
+
+
 class ConsoleMessageProcessor:
     """Print SSDP messages to stdout."""
 
@@ -29,17 +95,95 @@ class ConsoleMessageProcessor:
     @staticmethod
     def pprint(msg, addr):
         """Pretty print the message."""
-        host = f"[{addr[0]}]" if ":" in addr[0] else addr[0]
-        host = click.style(host, fg="green", bold=True)
-        port = click.style(str(addr[1]), fg="yellow", bold=True)
-        pretty_msg = highlight(str(msg), SSDPLexer(), formatters.TerminalFormatter())
-        click.echo(f"{host}:{port} - - [{time.asctime()}] {pretty_msg}")
+        click.echo(format_pretty(msg, addr, time.time(), Timestamp()))
 
 
 class PrintSSDMessageProtocol(ConsoleMessageProcessor, SSDP):
     pass
 
 
+class MonitorProtocol(SSDP):
+    """
+    Write received messages to a stream in batches.
+
+    Args:
+        formatter (Callable): One of the :data:`FORMATS`.
+        stream (io.TextIOBase): Stream to write messages to.
+        filters (Iterable[Callable[[bytes, Tuple[str, int]], bool]]):
+            Filters applied to each datagram before it is parsed.
+        flush_interval (float): Maximum time in seconds
+            messages are buffered before they are written.
+        max_buffer (int): Maximum number of buffered messages.
+
+    Attributes:
+        targets (collections.Counter): Messages per ST or NT header
+            since the last summary.
+        sources (collections.Counter): Messages per source host
+            since the last summary.
+
+    """
+
+    def __init__(
+        self, formatter, stream, filters=(), flush_interval=0.2, max_buffer=256
+    ):
+        super().__init__(filters=filters)
+        self.formatter = formatter
+        self.stream = stream
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.targets = collections.Counter()
+        self.sources = collections.Counter()
+        self._timestamp = Timestamp()
+        self._buffer = []
+        self._flush_handle = None
+
+    def response_received(self, response, addr):
+        self.write(response, addr)
+
+    def request_received(self, request, addr):
+        self.write(request, addr)
+
+    def write(self, msg, addr):
+        """Buffer a message and count it for the summary."""
+        self.targets[msg.get_header("ST") or msg.get_header("NT")] += 1
+        self.sources[addr[0]] += 1
+        self._buffer.append(self.formatter(msg, addr, time.time(), self._timestamp))
+        if len(self._buffer) >= self.max_buffer:
+            self.flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                self.flush_interval, self.flush
+            )
+
+    def flush(self):
+        """Write all buffered messages to the stream."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._buffer:
+            self.stream.write("".join(self._buffer))
+            self.stream.flush()
+            self._buffer.clear()
+
+    def summary(self, elapsed, top=5):
+        """Return a summary line of the message rates and reset the counters."""
+        total = sum(self.sources.values())
+        parts = [f"{total / elapsed:.1f} msg/s"]
+        for name, counter in [("targets", self.targets), ("sources", self.sources)]:
+            rates = ", ".join(
+                f"{key} {count / elapsed:.1f}/s"
+                for key, count in counter.most_common(top)
+            )
+            parts.append(f"{name}: {rates or '-'}")
+        self.targets.clear()
+        self.sources.clear()
+        return f"[{time.asctime()}] " + " | ".join(parts)
+
+    def connection_lost(self, exc):
+        self.flush()
+        super().connection_lost(exc)
+
+
 @click.group()
 @click.option("-v", "--verbose", count=True, help="Increase verbosity.")
 def ssdp(verbose):
@@ -66,34 +210,226 @@ def ssdp(verbose):
 @click.option(
     "--max-wait",
     "--mx",
-    default=5,
-    help="Maximum wait time in seconds [default: 5]",
+    default=2,
+    help="Maximum wait time in seconds [default: 2]",
+)
+@click.option(
+    "--retries",
+    default=2,
+    help="Number of M-SEARCH retransmissions [default: 2]",
+)
+@click.option(
+    "--quiet-period",
+    default=1.0,
+    help="Stop if no new device responded for this many seconds, "
+    "once the maximum wait time passed [default: 1]",
 )
-def discover(bind, search_target, max_wait):
+def discover(bind, search_target, max_wait, retries, quiet_period):
     """Send out an M-SEARCH request and listening for responses."""
     family, addr = network.get_best_family(bind, network.PORT)
-    loop = asyncio.get_event_loop()
-
-    connect = loop.create_datagram_endpoint(PrintSSDMessageProtocol, family=family)
-    transport, protocol = loop.run_until_complete(connect)
-
-    search_request = messages.SSDPRequest(
-        "M-SEARCH",
-        headers={
-            "HOST": f"{network.MULTICAST_ADDRESS_IPV4}:{network.PORT:d}",
-            "MAN": '"ssdp:discover"',
-            "MX": str(max_wait),  # seconds to delay response [1..5]
-            "ST": search_target,
-        },
+    target = network.MULTICAST_ADDRESS_IPV4, network.PORT
+
+    search_request = aio.search_request(search_target, max_wait, target)
+    PrintSSDMessageProtocol.pprint(search_request, addr[:2])
+
+    async def print_responses():
+        async for response, response_addr in aio.discover(
+            search_target,
+            mx=max_wait,
+            retries=retries,
+            quiet_period=quiet_period,
+            addr=target,
+            family=family,
+        ):
+            PrintSSDMessageProtocol.pprint(response, response_addr)
+
+    asyncio.run(print_responses())
+
+
+def _create_listen_socket(bind, port):
+    family, addr = network.get_best_family(bind, port)
+    group = (
+        network.MULTICAST_ADDRESS_IPV6_LINK_LOCAL
+        if family == socket.AF_INET6
+        else network.MULTICAST_ADDRESS_IPV4
     )
+    return network.create_socket(family, addr[0], port, group=group)
 
-    search_request.sendto(transport, (network.MULTICAST_ADDRESS_IPV4, network.PORT))
 
-    PrintSSDMessageProtocol.pprint(search_request, addr[:2])
+@ssdp.command()
+@click.option(
+    "--bind",
+    "-b",
+    help="Specify alternate bind address [default: all interfaces]",
+)
+@click.option(
+    "--port",
+    default=network.PORT,
+    help=f"Port to listen on [default: {network.PORT}]",
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(list(FORMATS)),
+    default="plain",
+    help="Output format [default: plain]",
+)
+@click.option(
+    "--target",
+    "--st",
+    multiple=True,
+    help="Only show messages with this ST or NT header, can be repeated",
+)
+@click.option(
+    "--target-prefix",
+    multiple=True,
+    help="Only show messages whose ST or NT header starts with this prefix",
+)
+@click.option(
+    "--source",
+    multiple=True,
+    help="Only show messages from this host, can be repeated",
+)
+@click.option(
+    "--summary-interval",
+    default=10.0,
+    help="Print message rates to stderr every N seconds, 0 to disable [default: 10]",
+)
+@click.option(
+    "--duration",
+    type=float,
+    help="Stop after N seconds [default: run until interrupted]",
+)
+def monitor(
+    bind,
+    port,
+    output_format,
+    target,
+    target_prefix,
+    source,
+    summary_interval,
+    duration,
+):
+    """Listen for SSDP messages and write them to stdout."""
+    drop = []
+    if target or target_prefix:
+        drop.append(filters.TargetFilter(targets=target, prefixes=target_prefix))
+    if source:
+        drop.append(filters.SourceFilter(source))
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        transport, protocol = await loop.create_datagram_endpoint(
+            lambda: MonitorProtocol(FORMATS[output_format], sys.stdout, drop),
+            sock=_create_listen_socket(bind, port),
+        )
+        deadline = None if duration is None else loop.time() + duration
+        last = loop.time()
+        try:
+            while deadline is None or loop.time() < deadline:
+                wakeup = last + (summary_interval or 3600)
+                if deadline is not None:
+                    wakeup = min(wakeup, deadline)
+                await asyncio.sleep(wakeup - loop.time())
+                now = loop.time()
+                if summary_interval and now - last >= summary_interval:
+                    protocol.flush()
+                    click.echo(protocol.summary(now - last), err=True)
+                    last = now
+        finally:
+            protocol.flush()
+            transport.close()
+
     try:
-        loop.run_until_complete(asyncio.sleep(4))
-    finally:
-        transport.close()
+        asyncio.run(run())
+    except KeyboardInterrupt:  # pragma: no cover
+        pass
+
+
+@ssdp.command()
+@click.argument("path", type=click.Path(dir_okay=False))
+@click.option(
+    "--bind",
+    "-b",
+    help="Specify alternate bind address [default: all interfaces]",
+)
+@click.option(
+    "--port",
+    default=network.PORT,
+    help=f"Port to listen on [default: {network.PORT}]",
+)
+@click.option(
+    "--duration",
+    type=float,
+    help="Stop after N seconds [default: run until interrupted]",
+)
+def record(path, bind, port, duration):
+    """Append raw SSDP datagrams to a capture file."""
+    with open(path, "ab") as file:
+        writer = capture.CaptureWriter(file)
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            transport, _ = await loop.create_datagram_endpoint(
+                lambda: capture.RecordingProtocol(writer),
+                sock=_create_listen_socket(bind, port),
+            )
+            try:
+                if duration is None:
+                    await loop.create_future()
+                else:
+                    await asyncio.sleep(duration)
+            finally:
+                transport.close()
+
+        try:
+            asyncio.run(run())
+        except KeyboardInterrupt:  # pragma: no cover
+            pass
+    click.echo(f"Recorded {writer.count} datagrams to {path}", err=True)
+
+
+class DiscardProtocol(SSDP):
+    """Parse messages and discard them."""
+
+    def request_received(self, request, addr):
+        pass
+
+    def response_received(self, response, addr):
+        pass
+
+
+def _import_protocol(ctx, param, value):
+    if value is None:
+        return DiscardProtocol
+    module_name, _, name = value.partition(":")
+    try:
+        return getattr(importlib.import_module(module_name), name)
+    except (ImportError, AttributeError, ValueError) as e:
+        raise click.BadParameter(f"Cannot import {value}: {e}") from e
+
+
+@ssdp.command()
+@click.argument("path", type=click.File("rb"))
+@click.option(
+    "--speed",
+    type=float,
+    help="Replay at the original timing times N [default: as fast as possible]",
+)
+@click.option(
+    "--protocol",
+    "protocol_class",
+    callback=_import_protocol,
+    help="Protocol class to feed as module:Class [default: parse and discard]",
+)
+def replay(path, speed, protocol_class):
+    """Feed a capture into a protocol and report messages per second."""
+    protocol = protocol_class()
+    stats = asyncio.run(capture.replay(path, protocol, speed=speed))
+    summary = f"Replayed {stats}"
+    if getattr(protocol, "rejected", 0):
+        summary += f", {protocol.rejected} rejected"
+    click.echo(summary, err=True)
 
 
 if __name__ == "__main__":  # pragma: no cover
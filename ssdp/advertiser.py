@@ -0,0 +1,229 @@
+"""
+Announce devices and services via SSDP.
+
+The :class:`Advertiser` announces any number of :class:`Advertisement`
+instances. Refreshes and delayed search responses of all advertisements
+are kept in a single heap, that is served by a single timer. Everything
+that is due within a short window is sent in the same wakeup.
+Searches are answered by the :class:`~ssdp.responder.Responder` base class.
+"""
+
+import heapq
+import platform
+import random
+
+from . import _version, aio, messages, network, responder
+
+__all__ = ["Advertisement", "Advertiser"]
+
+SERVER = f"{platform.system()}/{platform.release()} UPnP/1.1 ssdp/{_version.version}"
+
+
+class Advertisement:
+    """
+    A single notification type of a device or service to announce.
+
+    Devices announce multiple advertisements, e.g. ``upnp:rootdevice``,
+    their UUID, their device type and each of their service types.
+
+    Args:
+        nt (str): Notification type, also matched against search targets.
+        usn (str): Unique service name.
+        location (str): URL of the device description.
+        max_age (int): Number of seconds the advertisement is valid for.
+        server (str): Value of the ``SERVER`` header.
+        headers (Iterable[Tuple[str, str]]): Additional headers,
+            e.g. ``BOOTID.UPNP.ORG``.
+
+    """
+
+    __slots__ = ("nt", "usn", "location", "max_age", "server", "headers")
+
+    def __init__(self, nt, usn, location, max_age=1800, server=SERVER, headers=()):
+        self.nt = nt
+        self.usn = usn
+        self.location = location
+        self.max_age = max_age
+        self.server = server
+        self.headers = list(headers)
+
+    def notify(self, nts, addr):
+        """
+        Return a NOTIFY request.
+
+        Args:
+            nts (str): Notification sub type, ``ssdp:alive`` or ``ssdp:byebye``.
+            addr (Tuple[str, int]): Multicast address the request is sent to.
+
+        Returns:
+            ssdp.messages.SSDPRequest: NOTIFY request.
+
+        """
+        headers = [("HOST", aio._format_host(addr))]
+        if nts == "ssdp:alive":
+            headers += [
+                ("CACHE-CONTROL", f"max-age={self.max_age}"),
+                ("LOCATION", self.location),
+            ]
+        headers += [("NT", self.nt), ("NTS", nts)]
+        if nts == "ssdp:alive":
+            headers.append(("SERVER", self.server))
+        headers.append(("USN", self.usn))
+        return messages.SSDPRequest("NOTIFY", headers=headers + self.headers)
+
+    def response(self):
+        """
+        Return a response to a matching M-SEARCH request.
+
+        Returns:
+            ssdp.messages.SSDPResponse: Search response.
+
+        """
+        headers = [
+            ("CACHE-CONTROL", f"max-age={self.max_age}"),
+            ("EXT", ""),
+            ("LOCATION", self.location),
+            ("SERVER", self.server),
+            ("ST", self.nt),
+            ("USN", self.usn),
+        ]
+        return messages.SSDPResponse(200, "OK", headers=headers + self.headers)
+
+    def __repr__(self):
+        return f"<{type(self).__qualname__}: {self.usn}>"
+
+
+class Advertiser(responder.Responder):
+    """
+    Announce advertisements and answer matching M-SEARCH requests.
+
+    Advertisements are announced shortly after they are added and then
+    refreshed at a random interval slightly below half their ``max-age``,
+    as recommended by the UPnP Device Architecture. On :meth:`close`,
+    ``ssdp:byebye`` notifications are sent for all advertisements.
+    Searches are answered like by :class:`~ssdp.responder.Responder`.
+
+    Example:
+        >>> sock = network.create_socket(group=network.MULTICAST_ADDRESS_IPV4)
+        >>> transport, advertiser = await loop.create_datagram_endpoint(
+        ...     lambda: Advertiser(advertisements), sock=sock
+        ... )
+        >>> advertiser.add(Advertisement("upnp:rootdevice", usn, location))
+
+    Args:
+        advertisements (Iterable[Advertisement]): Initial advertisements.
+        addr (Tuple[str, int]): Multicast address to send notifications to.
+        jitter (float): Fraction of the refresh interval, that is randomized.
+        initial_delay (float): Maximum random delay of the first announcement
+            in seconds.
+        repeat (int): Number of times each notification is sent,
+            to make up for lost datagrams.
+        **kwargs: Passed to :class:`~ssdp.responder.Responder`.
+
+    """
+
+    def __init__(
+        self,
+        advertisements=(),
+        addr=(network.MULTICAST_ADDRESS_IPV4, network.PORT),
+        jitter=0.2,
+        initial_delay=0.1,
+        repeat=1,
+        **kwargs,
+    ):
+        self.addr = addr
+        self.jitter = jitter
+        self.initial_delay = initial_delay
+        self.repeat = repeat
+        # Refreshes of removed advertisements are skipped lazily.
+        self._compact_at = 64
+        self._notifications = {}
+        self._scheduled = {}
+        super().__init__(advertisements, **kwargs)
+
+    def _push(self, due, advertisement, data=None, addr=None):
+        super()._push(due, advertisement, data, addr)
+        if advertisement is not None:
+            self._scheduled[advertisement.usn] = self._sequence
+        if len(self._heap) > self._compact_at:
+            self._compact()
+
+    def _compact(self):
+        """Drop refreshes of removed advertisements from the heap."""
+        scheduled = self._scheduled
+        self._heap = [
+            entry
+            for entry in self._heap
+            if entry[2] is None or scheduled.get(entry[2].usn) == entry[1]
+        ]
+        heapq.heapify(self._heap)
+        self._compact_at = 2 * len(self._heap) + 64
+
+    def add(self, advertisement):
+        """
+        Add an advertisement and announce it after a short random delay.
+
+        An advertisement with the same USN is replaced.
+
+        Args:
+            advertisement (Advertisement): Advertisement to announce.
+
+        """
+        self.remove(advertisement.usn, byebye=False)
+        super().add(advertisement)
+        self._notifications[advertisement.usn] = (
+            bytes(advertisement.notify("ssdp:alive", self.addr)),
+            bytes(advertisement.notify("ssdp:byebye", self.addr)),
+        )
+        delay = random.uniform(0, self.initial_delay)  # noqa: S311
+        self._push(self.clock() + delay, advertisement)
+        self._schedule()
+
+    def remove(self, usn, byebye=True):
+        """
+        Remove an advertisement.
+
+        Args:
+            usn (str): Unique service name of the advertisement.
+            byebye (bool): Whether to send ``ssdp:byebye`` notifications.
+
+        Returns:
+            Advertisement: Removed advertisement, or ``None``.
+
+        """
+        advertisement = super().remove(usn)
+        if advertisement is None:
+            return None
+        _, byebye_data = self._notifications.pop(usn)
+        del self._scheduled[usn]
+        if byebye and self.transport is not None:
+            for _ in range(self.repeat):
+                self._send(byebye_data, self.addr)
+        return advertisement
+
+    def _refresh_interval(self, advertisement):
+        return (
+            advertisement.max_age / 2 * random.uniform(1 - self.jitter, 1)  # noqa: S311
+        )
+
+    def _due(self, entries, now):
+        refreshed = []
+        for sequence, advertisement in entries:
+            if self._scheduled.get(advertisement.usn) == sequence:
+                alive = self._notifications[advertisement.usn][0]
+                for _ in range(self.repeat):
+                    self._send(alive, self.addr)
+                refreshed.append(advertisement)
+        for advertisement in refreshed:
+            self._push(now + self._refresh_interval(advertisement), advertisement)
+
+    def close(self):
+        """
+        Send ``ssdp:byebye`` for all advertisements and stop the timer.
+
+        The notifications are sent in a single burst. Close the transport
+        afterwards, which sends all buffered datagrams before it is closed.
+        """
+        for usn in list(self._advertisements):
+            self.remove(usn)
+        super().close()
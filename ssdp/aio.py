@@ -7,14 +7,99 @@ implementing SSDP clients and servers.
 """
 
 import asyncio
+import collections
 import errno
 import logging
+import socket
+import time
 
-from . import messages
+from . import messages, network
 
 logger = logging.getLogger(__name__)
 
-__all__ = ["SSDP", "SimpleServiceDiscoveryProtocol"]
+__all__ = [
+    "SSDP",
+    "SimpleServiceDiscoveryProtocol",
+    "BatchedDatagramTransport",
+    "MulticastManager",
+    "TokenBucket",
+    "create_batched_datagram_endpoint",
+    "discover",
+    "search",
+    "search_request",
+]
+
+DROP_NEWEST = "drop_newest"
+DROP_OLDEST = "drop_oldest"
+
+
+class TokenBucket:
+    """
+    Token bucket to pace or limit the rate of datagrams.
+
+    The bucket holds up to ``burst`` tokens and is refilled at ``rate``
+    tokens per second. It can either reject datagrams exceeding the rate,
+    see :meth:`consume`, or tell how long to wait before a datagram may be
+    sent, see :meth:`delay`.
+
+    Args:
+        rate (float): Tokens added per second, e.g. datagrams per second.
+        burst (float): Capacity of the bucket, defaults to the tokens
+            added in 10 milliseconds, but at least one.
+        clock (Callable[[], float]): Monotonic clock in seconds.
+
+    """
+
+    __slots__ = ("rate", "burst", "clock", "_tokens", "_updated")
+
+    def __init__(self, rate, burst=None, clock=time.monotonic):
+        if rate <= 0:
+            raise ValueError(f"Rate must be positive, got {rate!r}")
+        self.rate = rate
+        self.burst = max(rate / 100, 1) if burst is None else burst
+        self.clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        tokens = self._tokens + (now - self._updated) * self.rate
+        self._tokens = min(tokens, self.burst)
+        self._updated = now
+        return self._tokens
+
+    def consume(self, tokens=1):
+        """
+        Take tokens from the bucket, if there are enough.
+
+        Args:
+            tokens (float): Number of tokens to take.
+
+        Returns:
+            bool: Whether the tokens were taken.
+
+        """
+        if self._refill() < tokens:
+            return False
+        self._tokens -= tokens
+        return True
+
+    def delay(self, tokens=1):
+        """
+        Reserve tokens and return how long to wait until they are available.
+
+        Reservations are taken right away, so that subsequent calls
+        return increasing delays.
+
+        Args:
+            tokens (float): Number of tokens to reserve.
+
+        Returns:
+            float: Delay in seconds, ``0`` if the tokens are available.
+
+        """
+        self._tokens = self._refill() - tokens
+        return -self._tokens / self.rate if self._tokens < 0 else 0.0
 
 
 class SimpleServiceDiscoveryProtocol(asyncio.DatagramProtocol):
@@ -23,16 +108,169 @@ class SimpleServiceDiscoveryProtocol(asyncio.DatagramProtocol):
 
     SSDP is part of UPnP protocol stack. For more information see:
     https://en.wikipedia.org/wiki/Simple_Service_Discovery_Protocol
+
+    Args:
+        filters (Iterable[Callable[[bytes, Tuple[str, int]], bool]]):
+            Filters applied to each datagram before it is parsed,
+            see :mod:`ssdp.filters`. A datagram is dropped,
+            if any filter returns ``True``.
+        metrics (ssdp.metrics.Metrics): Metrics to record, disabled by default.
+        limits (ssdp.messages.Limits): Limits for received datagrams,
+            defaults to :data:`ssdp.messages.DEFAULT_LIMITS`.
+        intern_table (ssdp.messages.InternTable): Table to share header
+            names and values of received messages with, disabled by default.
+
+    Attributes:
+        interface (ssdp.network.Interface): Network interface the protocol
+            receives on, if it was created by a :class:`MulticastManager`.
+        rejected (int): Number of invalid datagrams, that were dropped.
+
     """
 
+    filters = ()
+    metrics = None
+    limits = messages.DEFAULT_LIMITS
+    intern_table = None
+    rejected = 0
+    transport = None
+    interface = None
+
+    def __init__(self, filters=(), metrics=None, limits=None, intern_table=None):
+        self.filters = tuple(filters)
+        self.metrics = metrics
+        if limits is not None:
+            self.limits = limits
+        self.intern_table = intern_table
+
+    def connection_made(self, transport):
+        self.transport = transport
+
     def datagram_received(self, data, addr):
-        data = data.decode()
-        logger.debug("%s:%s – – %s", *addr, data)
+        metrics = self.metrics
+        if metrics is not None:
+            return self._datagram_received_with_metrics(metrics, data, addr)
+        for drop in self.filters:
+            if drop(data, addr):
+                return
+        try:
+            message = messages.SSDPMessage.parse_bytes(
+                data, self.limits, self.intern_table
+            )
+        except messages.InvalidMessage as e:
+            self.rejected += 1
+            logger.debug("%s:%s – – Dropped invalid datagram: %s", *addr, e)
+            return
+        logger.debug("%s:%s – – %s", *addr, message)
 
-        if data.startswith("HTTP/"):
-            self.response_received(messages.SSDPResponse.parse(data), addr)
+        if isinstance(message, messages.SSDPResponse):
+            self.response_received(message, addr)
         else:
-            self.request_received(messages.SSDPRequest.parse(data), addr)
+            self.request_received(message, addr)
+
+    def _datagram_received_with_metrics(self, metrics, data, addr):
+        metrics.packets_received += 1
+        metrics.bytes_received += len(data)
+        for drop in self.filters:
+            if drop(data, addr):
+                metrics.packets_filtered += 1
+                return
+        start = time.perf_counter()
+        try:
+            message = messages.SSDPMessage.parse_bytes(
+                data, self.limits, self.intern_table
+            )
+        except messages.InvalidMessage as e:
+            self.rejected += 1
+            metrics.parse_failures += 1
+            logger.debug("%s:%s – – Dropped invalid datagram: %s", *addr, e)
+            return
+        # Decode lazily parsed headers now, not in the timed callback.
+        message.headers  # noqa: B018
+        metrics.parse_seconds.observe(time.perf_counter() - start)
+        logger.debug("%s:%s – – %s", *addr, message)
+
+        start = time.perf_counter()
+        if isinstance(message, messages.SSDPResponse):
+            metrics.count_response(message.status_code)
+            self.response_received(message, addr)
+        else:
+            metrics.count_request(message.method)
+            self.request_received(message, addr)
+        metrics.callback_seconds.observe(time.perf_counter() - start)
+
+    def sendto(self, message, addr):
+        """
+        Send a message to a given address via the protocol's transport.
+
+        Args:
+            message (ssdp.messages.SSDPMessage): Message to send.
+            addr (Tuple[str, int]): IP address and port pair
+                to send the message to.
+
+        """
+        data = bytes(message)
+        logger.debug("%s:%s - - %s", *addr, message)
+        self.transport.sendto(data, addr)
+        if self.metrics is not None:
+            self.metrics.packets_sent += 1
+            self.metrics.bytes_sent += len(data)
+
+    async def sendto_many(self, messages, addrs, bucket=None):
+        """
+        Send each message to each address in a single burst.
+
+        Every message is encoded once, no matter the number of addresses.
+        The datagrams are sent in a tight loop, that only yields to the event
+        loop to keep the pace of the given token bucket.
+
+        Example:
+            >>> requests = [search_request(st) for st in targets]
+            >>> await protocol.sendto_many(requests, [addr], TokenBucket(500))
+
+        Args:
+            messages (Iterable[ssdp.messages.SSDPMessage]): Messages to send.
+            addrs (Iterable[Tuple[str, int]]): Addresses to send to.
+            bucket (TokenBucket): Token bucket to pace the burst with,
+                one token per datagram. Buckets can be shared between
+                protocols to pace bursts on multiple sockets.
+
+        Returns:
+            int: Number of sent datagrams.
+
+        """
+        datagrams = []
+        for message in messages:
+            datagrams.append(bytes(message))
+            logger.debug("%s", message)
+        sendto = self.transport.sendto
+        rounds = 0
+        for addr in addrs:
+            for data in datagrams:
+                if bucket is not None:
+                    delay = bucket.delay()
+                    if delay:
+                        await asyncio.sleep(delay)
+                sendto(data, addr)
+            rounds += 1
+        if self.metrics is not None:
+            self.metrics.packets_sent += rounds * len(datagrams)
+            self.metrics.bytes_sent += rounds * sum(map(len, datagrams))
+        return rounds * len(datagrams)
+
+    def datagrams_received(self, batch):
+        """
+        Being called with a batch of datagrams received in one wakeup.
+
+        This hook is only used by :class:`BatchedDatagramTransport`.
+        By default, each datagram is passed to :meth:`datagram_received`.
+
+        Args:
+            batch (List[Tuple[bytes, Tuple[str, int]]]):
+                List of datagram and address pairs.
+
+        """
+        for data, addr in batch:
+            self.datagram_received(data, addr)
 
     def response_received(self, response, addr):
         """
@@ -57,13 +295,561 @@ class SimpleServiceDiscoveryProtocol(asyncio.DatagramProtocol):
         raise NotImplementedError()
 
     def error_received(self, exc):
+        if self.metrics is not None:
+            self.metrics.errors_received += 1
         if exc == errno.EAGAIN or exc == errno.EWOULDBLOCK:
             logger.exception("Blocking IO error", exc_info=exc)
         else:
             raise exc
 
     def connection_lost(self, exc):
-        logger.exception("Connection lost", exc_info=exc)
+        if exc is not None:
+            logger.exception("Connection lost", exc_info=exc)
 
 
 SSDP = SimpleServiceDiscoveryProtocol  # alias
+
+
+class BatchedDatagramTransport(asyncio.DatagramTransport):
+    """
+    Datagram transport, that drains the socket in batches.
+
+    Asyncio's datagram transport reads a single datagram per wakeup of the
+    event loop. This transport reads up to ``batch_size`` datagrams with
+    non-blocking reads per wakeup and passes them to
+    :meth:`SimpleServiceDiscoveryProtocol.datagrams_received` at once.
+
+    It requires an event loop that supports :meth:`~asyncio.loop.add_reader`,
+    which excludes the proactor event loop on Windows.
+    Use :func:`create_batched_datagram_endpoint` to create an instance.
+    """
+
+    max_size = 64 * 1024
+
+    def __init__(self, loop, sock, protocol, batch_size=64):
+        super().__init__(extra={"socket": sock, "sockname": sock.getsockname()})
+        self._loop = loop
+        self._sock = sock
+        self._protocol = protocol
+        self._batch_size = batch_size
+        self._buffer = collections.deque()
+        self._closing = False
+        self._lost = False
+        sock.setblocking(False)
+        loop.call_soon(protocol.connection_made, self)
+        loop.add_reader(sock.fileno(), self._read_ready)
+
+    def _receive(self):
+        """Read a datagram, return ``None`` to skip it."""
+        return self._sock.recvfrom(self.max_size)
+
+    def _read_ready(self):
+        batch = []
+        for _ in range(self._batch_size):
+            try:
+                item = self._receive()
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError as exc:
+                self._protocol.error_received(exc)
+                break
+            if item is not None:
+                batch.append(item)
+        if batch:
+            self._protocol.datagrams_received(batch)
+
+    def sendto(self, data, addr=None):
+        if self._closing:
+            return
+        if not self._buffer:
+            try:
+                self._send(data, addr)
+                return
+            except (BlockingIOError, InterruptedError):
+                self._loop.add_writer(self._sock.fileno(), self._write_ready)
+            except OSError as exc:
+                self._protocol.error_received(exc)
+                return
+        self._buffer.append((bytes(data), addr))
+
+    def _write_ready(self):
+        while self._buffer:
+            data, addr = self._buffer[0]
+            try:
+                self._send(data, addr)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as exc:
+                self._protocol.error_received(exc)
+            self._buffer.popleft()
+        self._loop.remove_writer(self._sock.fileno())
+        if self._closing:
+            self._lose_connection()
+
+    def _send(self, data, addr):
+        if addr is None:
+            # Connected sockets send to their peer.
+            self._sock.send(data)
+        else:
+            self._sock.sendto(data, addr)
+
+    def get_write_buffer_size(self):
+        return sum(len(data) for data, _ in self._buffer)
+
+    def is_closing(self):
+        return self._closing
+
+    def close(self):
+        if self._closing:
+            return
+        self._closing = True
+        self._loop.remove_reader(self._sock.fileno())
+        if not self._buffer:
+            self._lose_connection()
+
+    def abort(self):
+        self._buffer.clear()
+        self._loop.remove_writer(self._sock.fileno())
+        self._loop.remove_reader(self._sock.fileno())
+        self._closing = True
+        self._lose_connection()
+
+    def _lose_connection(self):
+        """Schedule :meth:`_call_connection_lost`, unless it already is."""
+        if not self._lost:
+            self._lost = True
+            self._loop.call_soon(self._call_connection_lost, None)
+
+    def _call_connection_lost(self, exc):
+        try:
+            self._protocol.connection_lost(exc)
+        finally:
+            self._sock.close()
+
+
+async def create_batched_datagram_endpoint(protocol_factory, sock, batch_size=64):
+    """
+    Create a datagram endpoint, that receives datagrams in batches.
+
+    Args:
+        protocol_factory (Callable[[], SimpleServiceDiscoveryProtocol]):
+            Factory returning the protocol instance.
+        sock (socket.socket): Bound datagram socket.
+        batch_size (int): Maximum number of datagrams read per wakeup.
+
+    Returns:
+        Tuple[BatchedDatagramTransport, SimpleServiceDiscoveryProtocol]:
+            Transport and protocol pair.
+
+    """
+    loop = asyncio.get_running_loop()
+    protocol = protocol_factory()
+    transport = BatchedDatagramTransport(loop, sock, protocol, batch_size=batch_size)
+    return transport, protocol
+
+
+def _format_host(addr):
+    host, port = addr[:2]
+    return f"[{host}]:{port:d}" if ":" in host else f"{host}:{port:d}"
+
+
+def _with_host(message, host):
+    """Return a copy of a request with the given ``HOST`` header."""
+    if not isinstance(message, messages.SSDPRequest):
+        return message
+    headers = [
+        (name, value) for name, value in message.headers if name.upper() != "HOST"
+    ]
+    return messages.SSDPRequest(
+        message.method,
+        message.uri,
+        message.version,
+        headers=[("HOST", host), *headers],
+    )
+
+
+class _SearchProtocol(SimpleServiceDiscoveryProtocol):
+    """Protocol feeding search responses into a bounded queue."""
+
+    def __init__(self, queue, overflow):
+        self.queue = queue
+        self.overflow = overflow
+        self.dropped = 0
+
+    def response_received(self, response, addr):
+        if self.queue.full():
+            self.dropped += 1
+            if self.overflow == DROP_NEWEST:
+                return
+            self.queue.get_nowait()
+        self.queue.put_nowait((response, addr))
+
+    def request_received(self, request, addr):
+        pass  # ignore other control points and notifications
+
+
+def search_request(st="ssdp:all", mx=5, addr=None):
+    """
+    Return an M-SEARCH request.
+
+    Args:
+        st (str): Search target.
+        mx (int): Maximum wait time in seconds devices may delay their response.
+        addr (Tuple[str, int]): Address the request is sent to,
+            defaults to the IPv4 multicast address.
+
+    Returns:
+        ssdp.messages.SSDPRequest: M-SEARCH request.
+
+    """
+    if addr is None:
+        addr = network.MULTICAST_ADDRESS_IPV4, network.PORT
+    return messages.SSDPRequest(
+        "M-SEARCH",
+        headers={
+            "HOST": _format_host(addr),
+            "MAN": '"ssdp:discover"',
+            "MX": str(mx),
+            "ST": st,
+        },
+    )
+
+
+async def search(
+    st="ssdp:all",
+    mx=5,
+    timeout=None,
+    max_results=None,
+    idle_timeout=None,
+    quiet_period=None,
+    retries=0,
+    retry_interval=0.5,
+    queue_size=256,
+    overflow=DROP_NEWEST,
+    addr=(network.MULTICAST_ADDRESS_IPV4, network.PORT),
+    family=socket.AF_INET,
+    local_addr=None,
+):
+    """
+    Send an M-SEARCH request and yield responses as they arrive.
+
+    Example:
+        >>> async for response, addr in search("upnp:rootdevice", mx=2):
+        ...     print(response.get_header("LOCATION"), addr)
+
+    Args:
+        st (str): Search target.
+        mx (int): Maximum wait time in seconds devices may delay their response.
+        timeout (float): Maximum duration of the search in seconds,
+            defaults to ``mx`` plus one second.
+        max_results (int): Stop after this many responses.
+        idle_timeout (float): Stop if no response arrived for this many seconds.
+        quiet_period (float): Stop if no response with a new USN arrived
+            for this many seconds. The search never stops early within
+            ``mx`` seconds of the first request, since devices may delay
+            their responses that long.
+        retries (int): Number of times the request is retransmitted,
+            to recover from packet loss.
+        retry_interval (float): Delay in seconds before the first
+            retransmission, doubled for each following one.
+        queue_size (int): Maximum number of responses that are buffered,
+            while the consumer is busy.
+        overflow (str): Policy if the queue is full, either :data:`DROP_NEWEST`
+            to discard the incoming response or :data:`DROP_OLDEST` to discard
+            the oldest buffered response.
+        addr (Tuple[str, int]): Address the request is sent to.
+        family (int): Address family of the socket.
+        local_addr (Tuple[str, int]): Local address to bind the socket to.
+
+    Yields:
+        Tuple[ssdp.messages.SSDPResponse, Tuple[str, int]]:
+            Response and address pairs.
+
+    """
+    if overflow not in (DROP_NEWEST, DROP_OLDEST):
+        raise ValueError(f"Invalid overflow policy: {overflow!r}")
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=queue_size)
+    transport, protocol = await loop.create_datagram_endpoint(
+        lambda: _SearchProtocol(queue, overflow),
+        family=family,
+        local_addr=local_addr,
+    )
+    request = search_request(st, mx, addr)
+    handles = []
+    try:
+        request.sendto(transport, addr)
+        start = loop.time()
+        deadline = start + (mx + 1 if timeout is None else timeout)
+        handles = _schedule_retries(
+            loop, request, transport, addr, retries, retry_interval, deadline
+        )
+        usns = set()
+        last_new_usn = start
+        results = 0
+        while max_results is None or results < max_results:
+            now = loop.time()
+            wait = deadline - now
+            if idle_timeout is not None:
+                wait = min(wait, idle_timeout)
+            if quiet_period is not None:
+                quiet = max(last_new_usn + quiet_period, start + mx)
+                wait = min(wait, quiet - now)
+            if wait <= 0:
+                break
+            try:
+                result = await asyncio.wait_for(queue.get(), wait)
+            except asyncio.TimeoutError:
+                break
+            usn = result[0].get_header("USN")
+            if usn not in usns:
+                usns.add(usn)
+                last_new_usn = loop.time()
+            results += 1
+            yield result
+    finally:
+        for handle in handles:
+            handle.cancel()
+        transport.close()
+        if protocol.dropped:
+            logger.warning("Dropped %d search responses", protocol.dropped)
+
+
+def _schedule_retries(loop, request, transport, addr, retries, interval, deadline):
+    """Schedule retransmissions with exponential backoff before the deadline."""
+    handles = []
+    when = loop.time()
+    for i in range(retries):
+        when += interval * 2**i
+        if when >= deadline:
+            break
+        handles.append(loop.call_at(when, request.sendto, transport, addr))
+    return handles
+
+
+async def discover(st="ssdp:all", mx=5, retries=2, quiet_period=1.0, **kwargs):
+    """
+    Discover devices, yielding the first response of each USN.
+
+    Unlike :func:`search`, the request is retransmitted with a backoff
+    and the discovery finishes once no new USN was seen
+    for ``quiet_period`` seconds, but not before ``mx`` seconds
+    after the first request. On a quiet network, it finishes
+    after ``mx`` seconds instead of the one second longer timeout.
+
+    Args:
+        st (str): Search target.
+        mx (int): Maximum wait time in seconds devices may delay their response.
+        retries (int): Number of times the request is retransmitted.
+        quiet_period (float): Stop if no response with a new USN arrived
+            for this many seconds.
+        **kwargs: Keyword arguments passed to :func:`search`.
+
+    Yields:
+        Tuple[ssdp.messages.SSDPResponse, Tuple[str, int]]:
+            Response and address pairs.
+
+    """
+    usns = set()
+    async for response, addr in search(
+        st, mx, retries=retries, quiet_period=quiet_period, **kwargs
+    ):
+        usn = response.get_header("USN")
+        if usn is not None:
+            if usn in usns:
+                continue
+            usns.add(usn)
+        yield response, addr
+
+
+class _InterfaceTransport(BatchedDatagramTransport):
+    """
+    Batched transport, that passes datagrams to the protocol of their interface.
+
+    Sockets, that are not bound to a device, receive unicast datagrams of any
+    interface. The ingress interface of each datagram is read from its
+    ``IP_PKTINFO`` or ``IPV6_PKTINFO`` ancillary data instead.
+    Datagrams of interfaces without a protocol are dropped.
+    """
+
+    def __init__(self, loop, sock, protocol, routes):
+        network.enable_packet_info(sock)
+        self._routes = routes
+        self._ancillary_size = socket.CMSG_SPACE(20)
+        super().__init__(loop, sock, protocol)
+
+    def _receive(self):
+        data, ancillary, _, addr = self._sock.recvmsg(
+            self.max_size, self._ancillary_size
+        )
+        index, _ = network.parse_packet_info(ancillary)
+        protocol = self._routes.get(index)
+        if protocol is self._protocol:
+            return data, addr
+        if protocol is None:
+            logger.debug("%s:%s – – Dropped datagram of interface %s", *addr, index)
+        else:
+            protocol.datagram_received(data, addr)
+        return None
+
+
+class MulticastManager:
+    """
+    Run SSDP on every interface and address family.
+
+    One socket is opened per interface and family, that joined the SSDP
+    multicast group on that interface. All sockets run on the same event loop.
+    Each socket gets its own protocol instance, whose :attr:`~.SimpleServiceDiscoveryProtocol.interface`
+    attribute tells the ingress interface of received messages.
+
+    Without the privileges to bind sockets to a device, every socket may
+    receive unicast datagrams, e.g. search responses, of any interface.
+    Where :meth:`~socket.socket.recvmsg` is available, each datagram is
+    passed to the protocol of the interface it was received on instead.
+
+    Example:
+        >>> manager = MulticastManager(MyProtocol)
+        >>> await manager.start()
+        >>> manager.search("upnp:rootdevice")
+
+    Args:
+        protocol_factory (Callable[[], SimpleServiceDiscoveryProtocol]):
+            Factory called for each socket.
+        interfaces (Iterable[ssdp.network.Interface]): Interfaces to use,
+            defaults to all interfaces, see :func:`ssdp.network.get_interfaces`.
+        families (Iterable[int]): Address families to use.
+        port (int): Port to bind to and send to.
+        ttl (int): Time-to-live or hop limit of sent datagrams.
+        loopback (bool): Whether sent datagrams are looped back to this host.
+
+    """
+
+    def __init__(
+        self,
+        protocol_factory,
+        interfaces=None,
+        families=(socket.AF_INET, socket.AF_INET6),
+        port=network.PORT,
+        ttl=2,
+        loopback=True,
+    ):
+        self.protocol_factory = protocol_factory
+        self.interfaces = interfaces
+        self.families = tuple(families)
+        self.port = port
+        self.ttl = ttl
+        self.loopback = loopback
+        self.endpoints = []
+        self._routes = {}
+
+    async def start(self):
+        """Open and join a socket for every interface and family."""
+        loop = asyncio.get_running_loop()
+        interfaces = self.interfaces
+        if interfaces is None:
+            interfaces = network.get_interfaces()
+        for interface in interfaces:
+            for family in self.families:
+                if family == socket.AF_INET:
+                    if not interface.ipv4:
+                        continue
+                    addr = network.MULTICAST_ADDRESS_IPV4, self.port
+                else:
+                    if not interface.ipv6:
+                        continue
+                    addr = (
+                        network.MULTICAST_ADDRESS_IPV6_LINK_LOCAL,
+                        self.port,
+                        0,
+                        interface.index,
+                    )
+                try:
+                    sock = network.create_multicast_socket(
+                        family,
+                        interface,
+                        port=self.port,
+                        ttl=self.ttl,
+                        loopback=self.loopback,
+                    )
+                except OSError as e:
+                    logger.warning(
+                        "Cannot join %s on %s: %s", addr[0], interface.name, e
+                    )
+                    continue
+                if hasattr(sock, "recvmsg"):
+                    protocol = self.protocol_factory()
+                    routes = self._routes.setdefault(family, {})
+                    routes[interface.index] = protocol
+                    transport = _InterfaceTransport(loop, sock, protocol, routes)
+                else:  # pragma: no cover
+                    transport, protocol = await loop.create_datagram_endpoint(
+                        self.protocol_factory, sock=sock
+                    )
+                protocol.interface = interface
+                self.endpoints.append((transport, protocol, addr))
+
+    def sendto(self, message):
+        """
+        Send a message to the multicast group on all interfaces.
+
+        The ``HOST`` header of requests is set to the group of each socket.
+
+        Args:
+            message (ssdp.messages.SSDPMessage): Message, e.g. a NOTIFY request.
+
+        """
+        encoded = {}
+        for transport, _, addr in self.endpoints:
+            host = _format_host(addr)
+            data = encoded.get(host)
+            if data is None:
+                data = encoded[host] = bytes(_with_host(message, host))
+            transport.sendto(data, addr)
+
+    def search(self, st="ssdp:all", mx=5):
+        """
+        Send an M-SEARCH request on all interfaces.
+
+        Responses are passed to the protocols'
+        :meth:`~.SimpleServiceDiscoveryProtocol.response_received` method.
+
+        Args:
+            st (str): Search target.
+            mx (int): Maximum wait time in seconds devices may delay their response.
+
+        """
+        for transport, _, addr in self.endpoints:
+            transport.sendto(bytes(search_request(st, mx, addr)), addr)
+
+    async def search_many(self, targets, mx=5, rate=None, burst=None):
+        """
+        Send M-SEARCH requests for multiple search targets on all interfaces.
+
+        The requests are sent in one burst, that is paced across all sockets.
+
+        Args:
+            targets (Iterable[str]): Search targets.
+            mx (int): Maximum wait time in seconds devices may delay their response.
+            rate (float): Maximum number of requests per second,
+                by default requests are sent as fast as possible.
+            burst (float): Number of requests, that may exceed the rate,
+                see :class:`TokenBucket`.
+
+        Returns:
+            int: Number of sent requests.
+
+        """
+        targets = list(targets)
+        bucket = None if rate is None else TokenBucket(rate, burst)
+        sent = 0
+        for _, protocol, addr in self.endpoints:
+            requests = [search_request(st, mx, addr) for st in targets]
+            sent += await protocol.sendto_many(requests, [addr], bucket)
+        return sent
+
+    def close(self):
+        """Close all sockets."""
+        for transport, _, _ in self.endpoints:
+            transport.close()
+        self.endpoints.clear()
+        self._routes.clear()
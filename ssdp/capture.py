@@ -0,0 +1,246 @@
+"""
+Record and replay raw SSDP traffic.
+
+Captures are append-only files of length-prefixed records. A capture starts
+with the 8 byte magic ``SSDPCAP1``, followed by records of the form::
+
+    timestamp   float64   seconds since the epoch
+    port        uint16    source port
+    host size   uint8     4 for IPv4, 16 for IPv6
+    data size   uint16    size of the datagram
+    host        bytes     packed source address
+    data        bytes     raw datagram
+
+All integers are in network byte order. :class:`RecordingProtocol` flushes
+records at most ``flush_interval`` seconds after they are received, so a
+capture of a crashed process is only missing the records of that interval.
+A truncated last record is ignored by :func:`read`.
+"""
+
+import asyncio
+import socket
+import struct
+import time
+
+__all__ = ["CaptureWriter", "RecordingProtocol", "ReplayStats", "read", "replay"]
+
+MAGIC = b"SSDPCAP1"
+
+_RECORD = struct.Struct("!dHBH")
+_FAMILIES = {4: socket.AF_INET, 16: socket.AF_INET6}
+
+
+class CaptureWriter:
+    """
+    Append datagrams to a capture file.
+
+    Example:
+        >>> with open("storm.ssdpcap", "ab") as f:
+        ...     writer = CaptureWriter(f)
+        ...     writer.write(data, ("192.168.1.2", 1900))
+
+    Args:
+        file (BinaryIO): File opened for appending in binary mode.
+            The magic is written, if the file is empty.
+
+    Attributes:
+        count (int): Number of written records.
+
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self.count = 0
+        if file.tell() == 0:
+            file.write(MAGIC)
+
+    def write(self, data, addr, timestamp=None):
+        """
+        Append a datagram.
+
+        Args:
+            data (bytes-like): Raw datagram.
+            addr (Tuple[str, int]): Source address.
+            timestamp (float): Receive time, defaults to now.
+
+        """
+        host = addr[0].partition("%")[0]  # drop the IPv6 scope
+        family = socket.AF_INET6 if ":" in host else socket.AF_INET
+        packed = socket.inet_pton(family, host)
+        if timestamp is None:
+            timestamp = time.time()
+        header = _RECORD.pack(timestamp, addr[1], len(packed), len(data))
+        self.file.write(b"".join([header, packed, data]))
+        self.count += 1
+
+    def flush(self):
+        """Flush the underlying file."""
+        self.file.flush()
+
+
+def read(file):
+    """
+    Read the records of a capture file.
+
+    A truncated last record, e.g. of a crashed recording, is ignored.
+
+    Args:
+        file (BinaryIO): File opened for reading in binary mode.
+
+    Yields:
+        Tuple[float, bytes, Tuple[str, int]]: Timestamp, datagram
+            and source address of each record.
+
+    Raises:
+        ValueError: If the file is not a capture.
+
+    """
+    if file.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Not an SSDP capture file.")
+    while header := file.read(_RECORD.size):
+        if len(header) < _RECORD.size:
+            return
+        timestamp, port, host_size, data_size = _RECORD.unpack(header)
+        packed = file.read(host_size)
+        data = file.read(data_size)
+        if len(packed) < host_size or len(data) < data_size:
+            return
+        if host_size not in _FAMILIES:
+            raise ValueError(f"Corrupt record at offset {file.tell()}.")
+        host = socket.inet_ntop(_FAMILIES[host_size], packed)
+        yield timestamp, data, (host, port)
+
+
+class RecordingProtocol(asyncio.DatagramProtocol):
+    """
+    Write all received datagrams to a capture, without parsing them.
+
+    Args:
+        writer (CaptureWriter): Writer to append datagrams to.
+        flush_interval (float): Maximum time in seconds
+            records are buffered before they are flushed.
+
+    """
+
+    def __init__(self, writer, flush_interval=1.0):
+        self.writer = writer
+        self.flush_interval = flush_interval
+        self._flush_handle = None
+
+    def datagram_received(self, data, addr):
+        self.writer.write(data, addr)
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                self.flush_interval, self.flush
+            )
+
+    def flush(self):
+        """Flush all written records to the file."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self.writer.flush()
+
+    def connection_lost(self, exc):
+        self.flush()
+
+
+class _ReplayTransport(asyncio.DatagramTransport):
+    """Transport, that discards sent datagrams and counts them instead."""
+
+    def __init__(self):
+        super().__init__()
+        self.sent = 0
+        self._closing = False
+
+    def sendto(self, data, addr=None):
+        self.sent += 1
+
+    def close(self):
+        self._closing = True
+
+    def is_closing(self):
+        return self._closing
+
+    def get_extra_info(self, name, default=None):
+        return default
+
+
+class ReplayStats:
+    """
+    Statistics of a replay.
+
+    Attributes:
+        messages (int): Number of replayed datagrams.
+        size (int): Total size of the replayed datagrams in bytes.
+        sent (int): Number of datagrams the protocol sent.
+        seconds (float): Duration of the replay.
+
+    """
+
+    __slots__ = ("messages", "size", "sent", "seconds")
+
+    def __init__(self, messages=0, size=0, sent=0, seconds=0.0):
+        self.messages = messages
+        self.size = size
+        self.sent = sent
+        self.seconds = seconds
+
+    @property
+    def messages_per_second(self):
+        """Replayed datagrams per second."""
+        return self.messages / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (
+            f"{self.messages} messages in {self.seconds:.3f}s"
+            f" ({self.messages_per_second:.0f} messages/s)"
+        )
+
+
+async def replay(file, protocol, speed=None):
+    """
+    Feed a capture into a protocol, without any network involved.
+
+    Datagrams are passed to :meth:`~asyncio.DatagramProtocol.datagram_received`.
+    Datagrams the protocol sends are discarded. When replaying as fast as
+    possible, control is yielded to the event loop every 1024 datagrams.
+
+    Args:
+        file (BinaryIO): Capture file opened for reading in binary mode.
+        protocol (asyncio.DatagramProtocol): Protocol to feed,
+            e.g. a :class:`~ssdp.aio.SimpleServiceDiscoveryProtocol`.
+        speed (float): Replay at the original timing multiplied by this
+            factor, e.g. ``1`` for the original timing.
+            By default, datagrams are replayed as fast as possible.
+
+    Returns:
+        ReplayStats: Number of replayed datagrams and the replay duration.
+
+    """
+    loop = asyncio.get_running_loop()
+    transport = _ReplayTransport()
+    protocol.connection_made(transport)
+    stats = ReplayStats()
+    start = time.perf_counter()
+    first = None
+    try:
+        for timestamp, data, addr in read(file):
+            if speed is not None:
+                if first is None:
+                    first = timestamp, loop.time()
+                delay = first[1] + (timestamp - first[0]) / speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif not stats.messages % 1024:
+                # Let callbacks scheduled by the protocol run once in a while.
+                await asyncio.sleep(0)
+            protocol.datagram_received(data, addr)
+            stats.messages += 1
+            stats.size += len(data)
+        stats.seconds = time.perf_counter() - start
+    finally:
+        transport.close()
+        protocol.connection_lost(None)
+    stats.sent = transport.sent
+    return stats
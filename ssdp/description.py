@@ -0,0 +1,365 @@
+"""
+Fetch UPnP device descriptions for SSDP messages.
+
+Discovered devices announce the URL of their description in the ``LOCATION``
+header. The :class:`DescriptionFetcher` downloads these descriptions with a
+minimal asyncio HTTP/1.1 client, that keeps connections alive per host,
+limits the number of concurrent requests and caches descriptions.
+
+Descriptions are cached per ``LOCATION``. As long as the ``BOOTID.UPNP.ORG``
+and ``CONFIGID.UPNP.ORG`` headers of a device don't change, the cached
+description is returned without a request. Otherwise, the description is
+revalidated with its ``ETag`` or ``Last-Modified`` header.
+"""
+
+import asyncio
+import collections
+import logging
+import urllib.parse
+import xml.etree.ElementTree as ET
+
+from . import messages
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["Description", "DescriptionFetcher", "FetchError"]
+
+
+class FetchError(Exception):
+    """Raised if a description can't be fetched."""
+
+
+class Description:
+    """
+    Device description and its cache validators.
+
+    Attributes:
+        location (str): URL of the description.
+        root (xml.etree.ElementTree.Element): Root element of the description.
+        boot_id (str): ``BOOTID.UPNP.ORG`` of the announcing message.
+        config_id (str): ``CONFIGID.UPNP.ORG`` of the announcing message.
+        etag (str): ``ETag`` header of the HTTP response.
+        last_modified (str): ``Last-Modified`` header of the HTTP response.
+
+    """
+
+    __slots__ = ("location", "root", "boot_id", "config_id", "etag", "last_modified")
+
+    def __init__(
+        self,
+        location,
+        root,
+        boot_id=None,
+        config_id=None,
+        etag=None,
+        last_modified=None,
+    ):
+        self.location = location
+        self.root = root
+        self.boot_id = boot_id
+        self.config_id = config_id
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def __repr__(self):
+        return f"<{type(self).__qualname__}: {self.location}>"
+
+
+class _Connection:
+    __slots__ = ("reader", "writer")
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    def close(self):
+        self.writer.close()
+
+
+_CHUNK_SIZE = 64 * 1024
+
+
+async def _feed(reader, parser, size):
+    """Feed exactly ``size`` bytes to the parser in bounded chunks."""
+    while size > 0:
+        chunk = await reader.readexactly(min(size, _CHUNK_SIZE))
+        parser.feed(chunk)
+        size -= len(chunk)
+
+
+async def _read_body(reader, response, parser, max_size):
+    """
+    Feed the response body to the parser and return if the connection is reusable.
+
+    Raises:
+        ValueError: If the body exceeds ``max_size`` bytes.
+
+    """
+    too_large = f"Description exceeds {max_size} bytes"
+    if response.get_header("Transfer-Encoding", "").lower() == "chunked":
+        remaining = max_size
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            if size == 0:
+                # Skip the trailer section.
+                while await reader.readuntil(b"\r\n") != b"\r\n":
+                    pass
+                return True
+            if size > remaining:
+                raise ValueError(too_large)
+            remaining -= size
+            await _feed(reader, parser, size)
+            await reader.readexactly(2)
+    length = response.get_header("Content-Length")
+    if length is not None:
+        length = int(length)
+        if length > max_size:
+            raise ValueError(too_large)
+        await _feed(reader, parser, length)
+        return True
+    remaining = max_size
+    while chunk := await reader.read(min(remaining + 1, _CHUNK_SIZE)):
+        remaining -= len(chunk)
+        if remaining < 0:
+            raise ValueError(too_large)
+        parser.feed(chunk)
+    return False
+
+
+def _parse_response(head):
+    """
+    Parse the head of an HTTP response.
+
+    Unlike in SSDP, the reason phrase may be empty, e.g. ``HTTP/1.1 200 ``.
+
+    Raises:
+        ValueError: If the status line is invalid.
+
+    """
+    status_line, _, headers = str(head, "utf-8", "replace").partition("\r\n")
+    try:
+        version, status_code, *reason = status_line.split(None, 2)
+        response = messages.SSDPResponse(status_code, "".join(reason), version=version)
+    except ValueError:
+        raise ValueError(f"Invalid status line: {status_line!r}") from None
+    response.headers = messages.SSDPMessage.parse_headers(headers)
+    return response
+
+
+def _conditional_headers(description):
+    """Return the headers to revalidate a cached description."""
+    headers = {}
+    if description.etag:
+        headers["If-None-Match"] = description.etag
+    if description.last_modified:
+        headers["If-Modified-Since"] = description.last_modified
+    return headers
+
+
+class DescriptionFetcher:
+    """
+    Fetch and cache device descriptions.
+
+    Example:
+        >>> fetcher = DescriptionFetcher()
+        >>> description = await fetcher.fetch_message(response)
+        >>> description.root.find("{urn:schemas-upnp-org:device-1-0}device")
+
+    Args:
+        limit (int): Maximum number of concurrent requests.
+        connections_per_host (int): Maximum number of idle connections
+            kept alive per host.
+        max_entries (int): Maximum number of cached descriptions.
+        timeout (float): Timeout of a single request in seconds.
+        max_size (int): Maximum size of a description in bytes.
+
+    """
+
+    def __init__(
+        self,
+        limit=16,
+        connections_per_host=2,
+        max_entries=1024,
+        timeout=10,
+        max_size=1024 * 1024,
+    ):
+        self.connections_per_host = connections_per_host
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.max_size = max_size
+        self._semaphore = asyncio.Semaphore(limit)
+        self._pool = collections.defaultdict(list)
+        self._cache = collections.OrderedDict()
+        self._pending = {}
+
+    def get(self, location):
+        """Return the cached description for a location, or ``None``."""
+        return self._cache.get(location)
+
+    async def fetch_message(self, message):
+        """
+        Fetch the description of the device, that sent the message.
+
+        Args:
+            message (ssdp.messages.SSDPMessage): Received SSDP message.
+
+        Returns:
+            Description: Device description.
+
+        """
+        return await self.fetch(
+            message.get_header("LOCATION"),
+            boot_id=message.get_header("BOOTID.UPNP.ORG"),
+            config_id=message.get_header("CONFIGID.UPNP.ORG"),
+        )
+
+    async def fetch(self, location, boot_id=None, config_id=None):
+        """
+        Fetch a description.
+
+        Concurrent fetches of the same location share a single request.
+
+        Args:
+            location (str): URL of the description.
+            boot_id (str): ``BOOTID.UPNP.ORG`` of the announcing message.
+            config_id (str): ``CONFIGID.UPNP.ORG`` of the announcing message.
+
+        Returns:
+            Description: Device description.
+
+        Raises:
+            FetchError: If the description can't be fetched or parsed.
+
+        """
+        cached = self._cache.get(location)
+        if (
+            cached is not None
+            and boot_id is not None
+            and (cached.boot_id, cached.config_id) == (boot_id, config_id)
+        ):
+            self._cache.move_to_end(location)
+            return cached
+        key = location, boot_id, config_id
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._fetch(location, boot_id, config_id))
+            self._pending[key] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+        return await asyncio.shield(pending)
+
+    async def _fetch(self, location, boot_id, config_id):
+        cached = self._cache.get(location)
+        headers = {} if cached is None else _conditional_headers(cached)
+        async with self._semaphore:
+            try:
+                response, root = await asyncio.wait_for(
+                    self._request(location, headers), self.timeout
+                )
+            except (
+                OSError,
+                EOFError,
+                ValueError,
+                ET.ParseError,
+                asyncio.LimitOverrunError,
+            ) as e:
+                raise FetchError(f"Failed to fetch {location}: {e}") from e
+            except asyncio.TimeoutError as e:
+                raise FetchError(f"Timeout fetching {location}") from e
+        etag = response.get_header("ETag")
+        last_modified = response.get_header("Last-Modified")
+        if response.status_code == 304 and cached is not None:
+            # A 304 response may omit the validators, that are still valid.
+            root = cached.root
+            if etag is None:
+                etag = cached.etag
+            if last_modified is None:
+                last_modified = cached.last_modified
+        elif response.status_code != 200:
+            raise FetchError(f"Failed to fetch {location}: {response.status_code}")
+        elif root is None:
+            raise FetchError(f"Failed to fetch {location}: empty description")
+        description = Description(
+            location,
+            root,
+            boot_id=boot_id,
+            config_id=config_id,
+            etag=etag,
+            last_modified=last_modified,
+        )
+        self._cache[location] = description
+        self._cache.move_to_end(location)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return description
+
+    async def _request(self, location, headers):
+        url = urllib.parse.urlsplit(location)
+        if url.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported scheme: {url.scheme!r}")
+        port = url.port or (443 if url.scheme == "https" else 80)
+        origin = url.scheme, url.hostname, port
+        path = url.path or "/"
+        if url.query:
+            path += f"?{url.query}"
+        request = messages.SSDPRequest(
+            "GET",
+            path,
+            headers={
+                "Host": url.netloc,
+                "Connection": "keep-alive",
+                "Accept": "text/xml, application/xml",
+                **headers,
+            },
+        )
+        idle = self._pool[origin]
+        # Idle connections might have been closed by the server in the meantime.
+        for attempt in range(2):
+            if idle:
+                connection, reused = idle.pop(), True
+            else:
+                reader, writer = await asyncio.open_connection(
+                    url.hostname, port, ssl=url.scheme == "https"
+                )
+                connection, reused = _Connection(reader, writer), False
+            try:
+                return await self._exchange(connection, origin, request)
+            except (OSError, EOFError) as e:
+                connection.close()
+                if not reused or attempt:
+                    raise
+                logger.debug("Reconnecting to %s:%s: %s", url.hostname, port, e)
+            except BaseException:
+                connection.close()
+                raise
+
+    async def _exchange(self, connection, origin, request):
+        reader, writer = connection.reader, connection.writer
+        writer.write(bytes(request))
+        await writer.drain()
+        head = await reader.readuntil(b"\r\n\r\n")
+        response = _parse_response(head)
+        parser = ET.XMLPullParser(events=("start",))
+        if response.status_code == 304:
+            keep_alive = True
+        else:
+            keep_alive = await _read_body(reader, response, parser, self.max_size)
+        root = None
+        for _, element in parser.read_events():
+            root = element
+            break
+        if response.status_code == 200:
+            parser.close()
+        if keep_alive and response.get_header("Connection", "").lower() != "close":
+            idle = self._pool[origin]
+            if len(idle) < self.connections_per_host:
+                idle.append(connection)
+                return response, root
+        connection.close()
+        return response, root
+
+    def close(self):
+        """Close all idle connections."""
+        for idle in self._pool.values():
+            for connection in idle:
+                connection.close()
+        self._pool.clear()
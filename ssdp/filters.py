@@ -0,0 +1,169 @@
+"""
+Filters for received datagrams.
+
+Filters operate on raw datagrams and are applied by
+:class:`.SimpleServiceDiscoveryProtocol` before a datagram is parsed.
+A filter is a callable, that takes the datagram and the address it was
+received from, and returns ``True`` if the datagram should be dropped.
+"""
+
+import collections
+import re
+import time
+import zlib
+
+from . import messages
+
+__all__ = ["DuplicateFilter", "ShardFilter", "SourceFilter", "TargetFilter"]
+
+_TARGET = re.compile(rb"\n(?:ST|NT):[ \t]*([^\r\n]*)", re.IGNORECASE)
+
+
+class DuplicateFilter:
+    """
+    Drop repeated messages within a time window.
+
+    Devices answer every retransmitted M-SEARCH request and send their
+    notifications on multiple interfaces. Messages are considered equal,
+    if their USN, NTS header and source address match. Messages without
+    a USN header always pass.
+
+    Args:
+        window (float): Time window in seconds, in which repeated messages
+            are dropped.
+        max_entries (int): Maximum number of remembered messages. If exceeded,
+            the oldest entries are forgotten first.
+        clock (Callable[[], float]): Monotonic clock in seconds.
+
+    Attributes:
+        passed (int): Number of datagrams that passed the filter.
+        suppressed (int): Number of datagrams that were dropped.
+
+    """
+
+    def __init__(self, window=10, max_entries=10000, clock=time.monotonic):
+        self.window = window
+        self.max_entries = max_entries
+        self.clock = clock
+        self.passed = 0
+        self.suppressed = 0
+        self._seen = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._seen)
+
+    def __call__(self, data, addr):
+        """Return ``True`` if the datagram is a duplicate and should be dropped."""
+        usn = messages.peek_header(data, b"USN")
+        if usn is None:
+            self.passed += 1
+            return False
+        key = usn, messages.peek_header(data, b"NTS"), addr[0]
+        now = self.clock()
+        seen = self._seen
+        # Entries are ordered by the time they were first seen.
+        while seen:
+            oldest_key, first_seen = next(iter(seen.items()))
+            if now - first_seen < self.window:
+                break
+            del seen[oldest_key]
+        if key in seen:
+            self.suppressed += 1
+            return True
+        seen[key] = now
+        if len(seen) > self.max_entries:
+            seen.popitem(last=False)
+        self.passed += 1
+        return False
+
+
+class TargetFilter:
+    """
+    Drop messages for unwanted search or notification targets.
+
+    The ``ST`` or ``NT`` header is looked up in the raw datagram.
+    Messages without either header are dropped as well.
+
+    Example:
+        >>> TargetFilter(
+        ...     targets=["upnp:rootdevice"],
+        ...     prefixes=["urn:schemas-upnp-org:device:MediaRenderer:"],
+        ... )
+
+    Args:
+        targets (Iterable[str]): Allowed targets.
+        prefixes (Iterable[str]): Allowed target prefixes.
+
+    Attributes:
+        passed (int): Number of datagrams that passed the filter.
+        rejected (int): Number of datagrams that were dropped.
+
+    """
+
+    def __init__(self, targets=(), prefixes=()):
+        self.targets = frozenset(target.encode() for target in targets)
+        self.prefixes = tuple(prefix.encode() for prefix in prefixes)
+        self.passed = 0
+        self.rejected = 0
+
+    def __call__(self, data, addr):
+        """Return ``True`` if the datagram has no allowed target and should be dropped."""
+        match = _TARGET.search(data)
+        if match is not None:
+            target = match[1]
+            if target in self.targets or (
+                self.prefixes and target.startswith(self.prefixes)
+            ):
+                self.passed += 1
+                return False
+        self.rejected += 1
+        return True
+
+
+class SourceFilter:
+    """
+    Drop messages from unwanted source hosts.
+
+    Args:
+        hosts (Iterable[str]): Allowed source IP addresses.
+
+    Attributes:
+        passed (int): Number of datagrams that passed the filter.
+        rejected (int): Number of datagrams that were dropped.
+
+    """
+
+    def __init__(self, hosts):
+        self.hosts = frozenset(hosts)
+        self.passed = 0
+        self.rejected = 0
+
+    def __call__(self, data, addr):
+        """Return ``True`` if the source host is not allowed."""
+        if addr[0] in self.hosts:
+            self.passed += 1
+            return False
+        self.rejected += 1
+        return True
+
+
+class ShardFilter:
+    """
+    Drop messages from sources assigned to other shards.
+
+    Each source host is assigned to one of ``count`` shards by a stable
+    hash, so that all messages of a device are handled by the same shard.
+
+    Args:
+        index (int): Index of this shard.
+        count (int): Total number of shards.
+
+    """
+
+    def __init__(self, index, count):
+        self.index = index
+        self.count = count
+
+    def __call__(self, data, addr):
+        """Return ``True`` if the source belongs to another shard."""
+        return zlib.crc32(addr[0].encode()) % self.count != self.index
@@ -1,12 +1,394 @@
-import email.parser
+import functools
 import logging
+import re
+import urllib.parse
 
 logger = logging.getLogger("ssdp")
 
+_START_LINE = re.compile(rb"([^\r\n]*)(?:\r\n|\n|\r)?")
+_VERSION = re.compile(r"HTTP/\d\.\d")
+_MAX_AGE = re.compile(r"max-age\s*=\s*\"?(\d+)", re.IGNORECASE)
+
+
+class InvalidMessage(ValueError):
+    """Raised if a datagram is not a valid SSDP message."""
+
+
+class Limits:
+    """
+    Limits for parsing untrusted datagrams with :meth:`SSDPMessage.parse_bytes`.
+
+    Datagrams exceeding any limit are rejected before they are parsed.
+    In lenient mode, invalid header lines end the header block and invalid
+    UTF-8 is replaced once headers are decoded. In strict mode, headers are
+    decoded right away and any invalid header line, invalid UTF-8 or an
+    unknown HTTP version rejects the datagram.
+
+    Args:
+        max_size (int): Maximum size of a datagram in bytes.
+        max_headers (int): Maximum number of header lines.
+        max_line_length (int): Maximum length of a single line in bytes.
+        strict (bool): Whether to reject any deviation from the grammar.
+
+    """
+
+    __slots__ = ("max_size", "max_headers", "max_line_length", "strict")
+
+    def __init__(
+        self, max_size=8192, max_headers=64, max_line_length=1024, strict=False
+    ):
+        self.max_size = max_size
+        self.max_headers = max_headers
+        self.max_line_length = max_line_length
+        self.strict = strict
+
+    def check(self, data):
+        """
+        Reject a datagram, that exceeds the limits.
+
+        Args:
+            data (bytes-like): Raw datagram.
+
+        Raises:
+            InvalidMessage: If any limit is exceeded.
+
+        """
+        size = len(data)
+        if size > self.max_size:
+            raise InvalidMessage(f"Datagram exceeds {self.max_size} bytes.")
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        # Lines may end with CR, LF or both. The start line
+        # and the empty line ending the headers are not counted.
+        if max(data.count(b"\n"), data.count(b"\r")) > self.max_headers + 2:
+            raise InvalidMessage(f"Datagram exceeds {self.max_headers} headers.")
+        # Lines can only be too long in datagrams that exceed the line limit.
+        if size > self.max_line_length and (
+            max(map(len, data.split(b"\n"))) > self.max_line_length + 1  # \r
+        ):
+            raise InvalidMessage(f"Line exceeds {self.max_line_length} bytes.")
+
+
+#: Default limits, applied by :class:`.SimpleServiceDiscoveryProtocol`.
+DEFAULT_LIMITS = Limits()
+
+
+class InternTable:
+    """
+    Share header names and common header values between parsed messages.
+
+    Identical devices send the same header names and mostly the same values.
+    Messages parsed with an intern table share the strings of header names
+    and the header tuples of headers, whose values repeat across devices.
+    Values of other headers, e.g. ``USN`` or ``LOCATION``, are unique per
+    device and are not interned.
+
+    The table is bounded. Once it is full, it is cleared, so that a sender
+    of random headers can only defeat the sharing, but not grow the table.
+
+    Example:
+        >>> table = InternTable(values={"CACHE-CONTROL", "SERVER", "MODEL"})
+        >>> SSDPMessage.parse_bytes(data, intern_table=table)
+
+    Args:
+        max_size (int): Maximum number of interned names and of interned
+            headers each.
+        max_length (int): Maximum length of an interned value.
+        values (Iterable[str]): Case-insensitive names of headers,
+            whose values are interned.
+
+    """
+
+    __slots__ = ("max_size", "max_length", "values", "_names", "_headers")
+
+    #: Names of standard headers, that have the same values across devices.
+    VALUES = frozenset(
+        {
+            "cache-control",
+            "date",
+            "ext",
+            "host",
+            "man",
+            "mx",
+            "nt",
+            "nts",
+            "opt",
+            "server",
+            "st",
+        }
+    )
+
+    def __init__(self, max_size=4096, max_length=256, values=VALUES):
+        self.max_size = max_size
+        self.max_length = max_length
+        self.values = frozenset(name.lower() for name in values)
+        self._names = {}
+        self._headers = {}
+
+    def __len__(self):
+        return len(self._names) + len(self._headers)
+
+    def header(self, name, value):
+        """
+        Return an interned header tuple.
+
+        Args:
+            name (str): Header name.
+            value (str): Header value.
+
+        Returns:
+            Tuple[str, str]: Header tuple, that might be shared with
+                other messages.
+
+        """
+        names = self._names
+        try:
+            name, shared = names[name]
+        except KeyError:
+            if len(names) >= self.max_size:
+                names.clear()
+            shared = name.lower() in self.values
+            names[name] = name, shared
+        header = name, value
+        if not shared or len(value) > self.max_length:
+            return header
+        headers = self._headers
+        try:
+            return headers[header]
+        except KeyError:
+            if len(headers) >= self.max_size:
+                headers.clear()
+            headers[header] = header
+            return header
+
+    def clear(self):
+        """Remove all entries."""
+        self._names.clear()
+        self._headers.clear()
+
+
+def _parse_header_lines(lines, strict=False, intern_table=None):
+    """
+    Parse header lines into a list of name-value tuples.
+
+    Parsing stops at the first empty line, which separates the headers
+    from the body, or at the first line that is not a valid header.
+    Continuation lines, starting with a space or tab, are appended to
+    the value of the previous header.
+
+    Args:
+        lines (Iterable[str]): Header lines without line terminators.
+        strict (bool): Raise on invalid header lines instead of stopping.
+        intern_table (InternTable): Table to share names and values with.
+
+    Returns:
+        (List[Tuple[str, str]]): List of header tuples.
+
+    Raises:
+        InvalidMessage: If a header line is invalid in strict mode.
+
+    """
+    headers = []
+    for line in lines:
+        if not line:
+            break
+        if line[0] in " \t":
+            if headers:
+                name, value = headers[-1]
+                headers[-1] = name, f"{value}\r\n{line}"
+            elif strict:
+                raise InvalidMessage(f"Continuation without header: {line!r}")
+            continue
+        name, sep, value = line.partition(":")
+        if not sep or not name or " " in name or "\t" in name:
+            if strict:
+                raise InvalidMessage(f"Invalid header line: {line!r}")
+            break
+        value = value.lstrip(" \t")
+        if intern_table is None:
+            headers.append((name, value))
+        else:
+            headers.append(intern_table.header(name, value))
+    return headers
+
+
+def _split_start_line(data, limits=None, intern_table=None):
+    """
+    Split a raw datagram into its decoded start line and raw header block.
+
+    The header block is returned as a :class:`memoryview` of the datagram,
+    unless the underlying buffer is mutable, in which case the headers are
+    decoded right away, since the buffer might be reused for the next packet.
+    Headers are also decoded right away when they are interned, so that
+    the message doesn't keep the datagram alive.
+
+    Args:
+        data (bytes-like): Raw datagram.
+        limits (Limits): Limits to check the datagram against.
+        intern_table (InternTable): Table to intern headers with.
+
+    Returns:
+        (Tuple[str, Union[memoryview, List[Tuple[str, str]]]]):
+            Start line and raw or parsed headers.
+
+    Raises:
+        InvalidMessage: If the datagram exceeds the limits
+            or the start line is not valid UTF-8.
+
+    """
+    if limits is not None:
+        limits.check(data)
+    view = memoryview(data)
+    match = _START_LINE.match(view)
+    try:
+        start_line = match[1].decode()
+    except UnicodeDecodeError as e:
+        raise InvalidMessage(f"Invalid start line: {e}") from None
+    raw_headers = view[match.end() :]
+    if limits is not None and limits.strict:
+        try:
+            text = str(raw_headers, "utf-8")
+        except UnicodeDecodeError as e:
+            raise InvalidMessage(f"Invalid headers: {e}") from None
+        headers = _parse_header_lines(text.splitlines(), True, intern_table)
+        if len(headers) > limits.max_headers:
+            raise InvalidMessage(f"Datagram exceeds {limits.max_headers} headers.")
+        return start_line, headers
+    if not view.readonly or intern_table is not None:
+        return start_line, _parse_header_lines(
+            str(raw_headers, "utf-8", "replace").splitlines(),
+            intern_table=intern_table,
+        )
+    return start_line, raw_headers
+
+
+def _check_version(version, limits):
+    if limits is not None and limits.strict and not _VERSION.fullmatch(version):
+        raise InvalidMessage(f"Invalid HTTP version: {version!r}")
+
+
+@functools.lru_cache(maxsize=64)
+def _header_pattern(name):
+    return re.compile(rb"\n" + re.escape(name) + rb":[ \t]*([^\r\n]*)", re.IGNORECASE)
+
+
+def peek_header(data, name):
+    """
+    Return the raw value of a header, without parsing the datagram.
+
+    This is a cheap way to look at a single header, e.g. to drop unwanted
+    datagrams before they are parsed. Continuation lines are ignored.
+
+    Args:
+        data (bytes-like): Raw datagram.
+        name (bytes): Case-insensitive header name, e.g. ``b"USN"``.
+
+    Returns:
+        bytes: Header value, or ``None`` if the header is missing.
+
+    """
+    match = _header_pattern(name).search(data)
+    return match[1] if match else None
+
+
+def _mutator(name):
+    method = getattr(list, name)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self._index = None
+        self._version += 1
+        return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+class Headers(list):
+    """
+    List of header tuples with case-insensitive lookups.
+
+    The lookup index is built on the first call to :meth:`get`
+    and discarded whenever the list is modified. Every modification
+    also increments a version counter, that allows messages to tell
+    if their cached encoding is still up to date.
+    """
+
+    __slots__ = ("_index", "_version")
+
+    def __init__(self, headers=()):
+        super().__init__(headers)
+        self._index = None
+        self._version = 0
+
+    __setitem__ = _mutator("__setitem__")
+    __delitem__ = _mutator("__delitem__")
+    __iadd__ = _mutator("__iadd__")
+    __imul__ = _mutator("__imul__")
+    append = _mutator("append")
+    extend = _mutator("extend")
+    insert = _mutator("insert")
+    pop = _mutator("pop")
+    remove = _mutator("remove")
+    clear = _mutator("clear")
+    sort = _mutator("sort")
+    reverse = _mutator("reverse")
+
+    def get(self, name, default=None):
+        """
+        Return the value of the first header matching the given name.
+
+        Args:
+            name (str): Case-insensitive header name.
+            default: Value returned if the header is missing.
+
+        Returns:
+            str: Header value.
+
+        """
+        if self._index is None:
+            index = {}
+            for key, value in self:
+                index.setdefault(key.lower(), value)
+            self._index = index
+        return self._index.get(name.lower(), default)
+
+
+def _accessor(method):
+    """
+    Turn a method into a property, that is computed once per message.
+
+    Values are cached until the headers are modified or replaced.
+    """
+    name = method.__name__
+
+    @functools.wraps(method)
+    def getter(self):
+        headers = self.headers
+        cache = self._accessors
+        if cache is None or cache[0] is not headers or cache[1] != headers._version:
+            cache = self._accessors = headers, headers._version, {}
+        values = cache[2]
+        try:
+            return values[name]
+        except KeyError:
+            value = values[name] = method(self)
+            return value
+
+    return property(getter)
+
+
+def _int_header(message, name):
+    try:
+        return int(message.headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
 
 class SSDPMessage:
     """Simplified HTTP message to serve as a SSDP message."""
 
+    __slots__ = ("version", "_headers", "_raw_headers", "_bytes", "_accessors")
+
     def __init__(self, version="HTTP/1.1", headers=None):
         if headers is None:
             headers = []
@@ -14,7 +396,106 @@ class SSDPMessage:
             headers = headers.items()
 
         self.version = version
-        self.headers = list(headers)
+        self.headers = Headers(headers)
+        self._bytes = None
+        self._accessors = None
+
+    @property
+    def headers(self):
+        """List of header tuples, decoded on first access for raw messages."""
+        if self._headers is None:
+            self._headers = Headers(
+                _parse_header_lines(
+                    str(self._raw_headers, "utf-8", "replace").splitlines()
+                )
+            )
+            self._raw_headers = None
+        return self._headers
+
+    @headers.setter
+    def headers(self, headers):
+        if isinstance(headers, memoryview):
+            self._headers, self._raw_headers = None, headers
+        else:
+            if not isinstance(headers, Headers):
+                headers = Headers(headers)
+            self._headers, self._raw_headers = headers, None
+
+    def get_header(self, name, default=None):
+        """
+        Return the value of a header.
+
+        Args:
+            name (str): Case-insensitive header name, e.g. ``location``.
+            default: Value returned if the header is missing.
+
+        Returns:
+            str: Value of the first header with the given name.
+
+        """
+        return self.headers.get(name, default)
+
+    @_accessor
+    def max_age(self):
+        """int: ``max-age`` directive of the ``CACHE-CONTROL`` header, or ``None``."""
+        match = _MAX_AGE.search(self.headers.get("CACHE-CONTROL", ""))
+        return int(match[1]) if match else None
+
+    @_accessor
+    def location(self):
+        """urllib.parse.SplitResult: Parsed ``LOCATION`` URL, or ``None``."""
+        location = self.headers.get("LOCATION")
+        if not location:
+            return None
+        try:
+            return urllib.parse.urlsplit(location)
+        except ValueError:
+            return None
+
+    @_accessor
+    def _usn_parts(self):
+        usn = self.headers.get("USN")
+        if usn is None:
+            return None, None
+        uuid, _, type = usn.partition("::")
+        if uuid[:5].lower() == "uuid:":
+            uuid = uuid[5:]
+        return uuid, type or None
+
+    @property
+    def usn_uuid(self):
+        """str: UUID part of the ``USN`` header, without the ``uuid:`` prefix."""
+        return self._usn_parts[0]
+
+    @property
+    def usn_type(self):
+        """str: Type part of the ``USN`` header after ``::``, or ``None``."""
+        return self._usn_parts[1]
+
+    @_accessor
+    def boot_id(self):
+        """int: Value of the ``BOOTID.UPNP.ORG`` header, or ``None``."""
+        return _int_header(self, "BOOTID.UPNP.ORG")
+
+    @_accessor
+    def config_id(self):
+        """int: Value of the ``CONFIGID.UPNP.ORG`` header, or ``None``."""
+        return _int_header(self, "CONFIGID.UPNP.ORG")
+
+    def __getstate__(self):
+        state = dict(getattr(self, "__dict__", {}))
+        for cls in type(self).__mro__:
+            for name in getattr(cls, "__slots__", ()):
+                if not name.startswith("_"):
+                    state[name] = getattr(self, name)
+        state["headers"] = list(self.headers)
+        return state
+
+    def __setstate__(self, state):
+        self._bytes = None
+        self._accessors = None
+        for name, value in state.items():
+            setattr(self, name, value)
 
     @classmethod
     def parse(cls, msg: str):
@@ -33,6 +514,38 @@ class SSDPMessage:
         else:
             return SSDPRequest.parse(msg)
 
+    @classmethod
+    def parse_bytes(cls, data, limits=None, intern_table=None):
+        """
+        Parse a raw datagram into a :class:`SSDPMessage` instance.
+
+        Unlike :meth:`parse`, the datagram is not decoded as a whole.
+        Only the start line is decoded right away, the headers are decoded
+        once :attr:`headers` is first accessed. Invalid UTF-8 in headers
+        is replaced with ``U+FFFD``.
+
+        Args:
+            data (bytes-like): Raw datagram, e.g. :class:`bytes`
+                or :class:`memoryview`.
+            limits (Limits): Limits to check untrusted datagrams against,
+                e.g. :data:`DEFAULT_LIMITS`. Not checked by default.
+            intern_table (InternTable): Table to share header names and
+                values with other messages. Interned headers are decoded
+                right away.
+
+        Returns:
+            SSDPMessage: Message parsed from bytes.
+
+        Raises:
+            InvalidMessage: If the datagram is not a valid message
+                or exceeds the limits.
+
+        """
+        if data[:5] == b"HTTP/":
+            return SSDPResponse.parse_bytes(data, limits, intern_table)
+        else:
+            return SSDPRequest.parse_bytes(data, limits, intern_table)
+
     @classmethod
     def parse_headers(cls, msg):
         """
@@ -45,20 +558,59 @@ class SSDPMessage:
             (List[Tuple[str, str]]): List of header tuples.
 
         """
-        return list(email.parser.Parser().parsestr(msg).items())
+        return _parse_header_lines(msg.splitlines())
+
+    def template(self, *fields):
+        """
+        Return a template to send this message with varying header values.
+
+        Args:
+            *fields (str): Case-insensitive names of the headers that change
+                between sends, e.g. ``DATE`` or ``ST``. Headers missing in
+                the message are appended to it.
+
+        Returns:
+            MessageTemplate: Template with precomputed static parts.
+
+        """
+        return MessageTemplate(self, fields)
+
+    def _start_line(self):
+        """Return the start line, or ``None`` if the message has none."""
+        return None
 
     def __str__(self):
         """Return full HTTP message."""
         raise NotImplementedError()
 
     def __bytes__(self):
-        """Return full HTTP message as bytes."""
-        return self.__str__().encode() + b"\r\n\r\n"
+        """
+        Return full HTTP message as bytes.
+
+        The encoding is cached until the start line or headers change.
+        """
+        start_line = self._start_line()
+        if start_line is None:
+            return self.__str__().encode() + b"\r\n\r\n"
+        headers = self.headers
+        cache = self._bytes
+        if (
+            cache is None
+            or cache[0] is not headers
+            or cache[1] != headers._version
+            or cache[2] != start_line
+        ):
+            cache = headers, headers._version, start_line
+            cache += (self.__str__().encode() + b"\r\n\r\n",)
+            self._bytes = cache
+        return cache[3]
 
 
 class SSDPResponse(SSDPMessage):
     """Simple Service Discovery Protocol (SSDP) response."""
 
+    __slots__ = ("status_code", "reason")
+
     def __init__(self, status_code, reason, **kwargs):
         self.status_code = int(status_code)
         self.reason = reason
@@ -68,12 +620,25 @@ class SSDPResponse(SSDPMessage):
     def parse(cls, msg: str):
         """Parse message string to response object."""
         lines = msg.splitlines()
-        version, status_code, reason = lines[0].split()
-        headers = cls.parse_headers("\r\n".join(lines[1:]))
+        version, status_code, reason = lines[0].split(None, 2)
+        headers = _parse_header_lines(lines[1:])
         return cls(
             version=version, status_code=status_code, reason=reason, headers=headers
         )
 
+    @classmethod
+    def parse_bytes(cls, data, limits=None, intern_table=None):
+        """Parse raw datagram to response object."""
+        start_line, headers = _split_start_line(data, limits, intern_table)
+        try:
+            version, status_code, reason = start_line.split(None, 2)
+            response = cls(version=version, status_code=status_code, reason=reason)
+        except ValueError:
+            raise InvalidMessage(f"Invalid status line: {start_line!r}") from None
+        _check_version(version, limits)
+        response.headers = headers
+        return response
+
     def sendto(self, transport, addr):
         """
         Send response to a given address via given transport.
@@ -88,10 +653,13 @@ class SSDPResponse(SSDPMessage):
         logger.debug("%s:%s - - %s", *(addr + (self,)))
         transport.sendto(bytes(self), addr)
 
+    def _start_line(self):
+        return " ".join([self.version, str(self.status_code), self.reason])
+
     def __str__(self):
         """Return complete SSDP response."""
         lines = []
-        lines.append(" ".join([self.version, str(self.status_code), self.reason]))
+        lines.append(self._start_line())
         for header in self.headers:
             lines.append("{}: {}".format(*header))
         return "\r\n".join(lines)
@@ -100,6 +668,8 @@ class SSDPResponse(SSDPMessage):
 class SSDPRequest(SSDPMessage):
     """Simple Service Discovery Protocol (SSDP) request."""
 
+    __slots__ = ("method", "uri")
+
     def __init__(self, method, uri="*", version="HTTP/1.1", headers=None):
         self.method = method
         self.uri = uri
@@ -110,9 +680,22 @@ class SSDPRequest(SSDPMessage):
         """Parse message string to request object."""
         lines = msg.splitlines()
         method, uri, version = lines[0].split()
-        headers = cls.parse_headers("\r\n".join(lines[1:]))
+        headers = _parse_header_lines(lines[1:])
         return cls(version=version, uri=uri, method=method, headers=headers)
 
+    @classmethod
+    def parse_bytes(cls, data, limits=None, intern_table=None):
+        """Parse raw datagram to request object."""
+        start_line, headers = _split_start_line(data, limits, intern_table)
+        try:
+            method, uri, version = start_line.split()
+        except ValueError:
+            raise InvalidMessage(f"Invalid request line: {start_line!r}") from None
+        _check_version(version, limits)
+        request = cls(version=version, uri=uri, method=method)
+        request.headers = headers
+        return request
+
     def sendto(self, transport, addr):
         """
         Send request to a given address via given transport.
@@ -127,10 +710,97 @@ class SSDPRequest(SSDPMessage):
         logger.debug("%s:%s - - %s", *(addr + (self,)))
         transport.sendto(bytes(self), addr)
 
+    def _start_line(self):
+        return " ".join([self.method, self.uri, self.version])
+
     def __str__(self):
         """Return complete SSDP request."""
         lines = []
-        lines.append(" ".join([self.method, self.uri, self.version]))
+        lines.append(self._start_line())
         for header in self.headers:
             lines.append("{}: {}".format(*header))
         return "\r\n".join(lines)
+
+
+class MessageTemplate:
+    """
+    Precomputed encoding of a message, with a few variable header values.
+
+    All static parts of the message are encoded once. Only the values of
+    the variable headers are encoded when the template is rendered.
+
+    Example:
+        >>> response = SSDPResponse(200, "OK", headers={"DATE": "", "ST": ""})
+        >>> template = response.template("DATE", "ST")
+        >>> template.render(date="Sun, 11 Jun 2023 12:07:09 GMT", st="ssdp:all")
+
+    """
+
+    __slots__ = ("_parts", "_fields", "_defaults")
+
+    def __init__(self, message, fields):
+        start_line = message._start_line()
+        if start_line is None:
+            raise TypeError(f"{type(message).__qualname__} has no start line.")
+        fields = {field.lower(): field for field in fields}
+        headers = list(message.headers)
+        present = {name.lower() for name, _ in headers}
+        headers += [(field, "") for key, field in fields.items() if key not in present]
+
+        parts, keys, defaults = [], [], {}
+        chunk = [start_line]
+        for name, value in headers:
+            key = name.lower()
+            if key in fields and key not in defaults:
+                chunk.append(f"{name}: ")
+                parts.append("\r\n".join(chunk).encode())
+                keys.append(key)
+                defaults[key] = value
+                chunk = [""]
+            else:
+                chunk.append(f"{name}: {value}")
+        chunk.append("\r\n")
+        parts.append("\r\n".join(chunk).encode())
+
+        self._parts = parts
+        self._fields = keys
+        self._defaults = defaults
+
+    def render(self, **fields):
+        """
+        Return the message as bytes, with the given header values.
+
+        Args:
+            **fields (str): Values for the variable headers, keyed by their
+                case-insensitive name. Missing values default to the values
+                of the message the template was created from.
+
+        Returns:
+            bytes: Encoded message.
+
+        """
+        values = self._defaults
+        if fields:
+            values = {**values, **{key.lower(): value for key, value in fields.items()}}
+        parts = self._parts
+        out = [parts[0]]
+        for key, part in zip(self._fields, parts[1:], strict=True):
+            out.append(values[key].encode())
+            out.append(part)
+        return b"".join(out)
+
+    def sendto(self, transport, addr, **fields):
+        """
+        Render and send the message to a given address via given transport.
+
+        Args:
+            transport (asyncio.DatagramTransport):
+                Write transport to send the message on.
+            addr (Tuple[str, int]):
+                IP address and port pair to send the message to.
+            **fields (str): Values for the variable headers.
+
+        """
+        data = self.render(**fields)
+        logger.debug("%s:%s - - %s", *addr, data)
+        transport.sendto(data, addr)
@@ -0,0 +1,187 @@
+"""
+Metrics for the hot path of :class:`.SimpleServiceDiscoveryProtocol`.
+
+Metrics are disabled by default and cost a single attribute lookup per
+datagram. To enable them, pass a :class:`Metrics` instance to the protocol.
+Snapshots can be exported as JSON or in the Prometheus text format.
+"""
+
+import bisect
+import collections
+import json
+
+__all__ = ["Histogram", "Metrics"]
+
+#: Key for requests and responses, that are not counted individually.
+OTHER = "other"
+
+DEFAULT_BUCKETS = (
+    0.000001,
+    0.000005,
+    0.00001,
+    0.00005,
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.1,
+    1.0,
+)
+
+
+def _escape_label(value):
+    """Escape a label value for the Prometheus text exposition format."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """
+    Histogram of durations in seconds with fixed buckets.
+
+    Args:
+        buckets (Sequence[float]): Sorted upper bounds of the buckets.
+
+    """
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        """Record a single value."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self):
+        """Return buckets with cumulative counts, sum and count as a dictionary."""
+        cumulative, buckets = 0, {}
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts, strict=True):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {"buckets": buckets, "sum": self.sum, "count": self.count}
+
+
+class Metrics:
+    """
+    Counters and latency histograms of a protocol.
+
+    Args:
+        exporters (Iterable[Callable[[dict], None]]):
+            Callables :meth:`export` passes snapshots to.
+        buckets (Sequence[float]): Upper bounds of the histogram buckets.
+
+    Attributes:
+        packets_received (int): Number of received datagrams.
+        bytes_received (int): Number of received bytes.
+        packets_sent (int): Number of sent datagrams.
+        bytes_sent (int): Number of sent bytes.
+        packets_filtered (int): Number of datagrams dropped by filters.
+        parse_failures (int): Number of datagrams that failed to parse.
+        errors_received (int): Number of socket errors.
+        requests (collections.Counter): Received requests per method,
+            unknown methods are counted as :data:`OTHER`.
+        responses (collections.Counter): Received responses per status code,
+            invalid status codes are counted as :data:`OTHER`.
+        parse_seconds (Histogram): Time spent parsing datagrams,
+            including their headers.
+        callback_seconds (Histogram): Time spent in the request
+            and response callbacks.
+
+    """
+
+    COUNTERS = (
+        "packets_received",
+        "bytes_received",
+        "packets_sent",
+        "bytes_sent",
+        "packets_filtered",
+        "parse_failures",
+        "errors_received",
+    )
+
+    #: Request methods, that are counted individually.
+    METHODS = frozenset({"M-SEARCH", "NOTIFY"})
+
+    #: Status codes, that are counted individually.
+    STATUS_CODES = range(100, 600)
+
+    def __init__(self, exporters=(), buckets=DEFAULT_BUCKETS):
+        self.exporters = list(exporters)
+        for name in self.COUNTERS:
+            setattr(self, name, 0)
+        self.requests = collections.Counter()
+        self.responses = collections.Counter()
+        self.parse_seconds = Histogram(buckets)
+        self.callback_seconds = Histogram(buckets)
+
+    def count_request(self, method):
+        """
+        Count a received request.
+
+        Keys are taken from the network, so only known methods are counted
+        individually, to keep the number of counters bounded.
+
+        Args:
+            method (str): Request method.
+
+        """
+        self.requests[method if method in self.METHODS else OTHER] += 1
+
+    def count_response(self, status_code):
+        """
+        Count a received response.
+
+        Args:
+            status_code (int): Response status code.
+
+        """
+        if status_code not in self.STATUS_CODES:
+            status_code = OTHER
+        self.responses[status_code] += 1
+
+    def snapshot(self):
+        """Return all metrics as a dictionary."""
+        return {
+            **{name: getattr(self, name) for name in self.COUNTERS},
+            "requests": dict(self.requests),
+            "responses": {str(code): count for code, count in self.responses.items()},
+            "parse_seconds": self.parse_seconds.snapshot(),
+            "callback_seconds": self.callback_seconds.snapshot(),
+        }
+
+    def export(self):
+        """Pass a snapshot to all exporters."""
+        snapshot = self.snapshot()
+        for exporter in self.exporters:
+            exporter(snapshot)
+
+    def to_json(self):
+        """Return a snapshot as JSON."""
+        return json.dumps(self.snapshot())
+
+    def to_prometheus(self, prefix="ssdp"):
+        """Return a snapshot in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+        for name in self.COUNTERS:
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {snapshot[name]}")
+        for name, label in [("requests", "method"), ("responses", "status_code")]:
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            for value, count in snapshot[name].items():
+                value = _escape_label(value)
+                lines.append(f'{prefix}_{name}_total{{{label}="{value}"}} {count}')
+        for name in ["parse_seconds", "callback_seconds"]:
+            histogram = snapshot[name]
+            lines.append(f"# TYPE {prefix}_{name} histogram")
+            for bound, count in histogram["buckets"].items():
+                lines.append(f'{prefix}_{name}_bucket{{le="{bound}"}} {count}')
+            lines.append(f"{prefix}_{name}_sum {histogram['sum']}")
+            lines.append(f"{prefix}_{name}_count {histogram['count']}")
+        return "\n".join(lines) + "\n"
@@ -1,5 +1,9 @@
+import functools
+import ipaddress
 import socket
+import struct
 import sys
+import typing
 
 __all__ = [
     "MULTICAST_ADDRESS_IPV4",
@@ -8,6 +12,14 @@ __all__ = [
     "MULTICAST_ADDRESS_IPV6_ORG_LOCAL",
     "MULTICAST_ADDRESS_IPV6_GLOBAL",
     "PORT",
+    "Interface",
+    "create_multicast_socket",
+    "create_socket",
+    "enable_packet_info",
+    "get_best_family",
+    "get_interfaces",
+    "join_group",
+    "parse_packet_info",
 ]
 
 
@@ -19,6 +31,20 @@ MULTICAST_ADDRESS_IPV6_GLOBAL = "ff0e::c"
 
 PORT = 1900
 
+SIOCGIFADDR = 0x8915  # Linux
+IP_MULTICAST_ALL = 49  # Linux
+IPV6_MULTICAST_ALL = 29  # Linux
+IP_PKTINFO = getattr(socket, "IP_PKTINFO", 8)  # Linux
+
+
+class Interface(typing.NamedTuple):
+    """Network interface and its addresses."""
+
+    name: str
+    index: int
+    ipv4: tuple = ()
+    ipv6: tuple = ()
+
 
 def get_best_family(*address):
     """Backport of private `http.server._get_best_family`."""
@@ -32,3 +58,221 @@ def get_best_family(*address):
     )
     family, type, proto, canonname, sockaddr = next(iter(infos))
     return family, sockaddr
+
+
+def create_socket(
+    family=socket.AF_INET, host="", port=PORT, group=None, reuse_port=False
+):
+    """
+    Create a bound UDP socket, that optionally joined a multicast group.
+
+    Args:
+        family (int): Address family, either ``AF_INET`` or ``AF_INET6``.
+        host (str): Address to bind to, defaults to all interfaces.
+        port (int): Port to bind to.
+        group (str): Multicast group to join, e.g. :data:`MULTICAST_ADDRESS_IPV4`.
+        reuse_port (bool): Set ``SO_REUSEPORT``, to allow multiple sockets,
+            e.g. of multiple processes, to bind the same address.
+
+    Returns:
+        socket.socket: Bound socket.
+
+    """
+    sock = socket.socket(family, socket.SOCK_DGRAM)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reuse_port:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind((host, port))
+        if group is not None:
+            join_group(sock, family, group)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def join_group(sock, family, group):
+    """Join a multicast group on the default interface."""
+    if family == socket.AF_INET:
+        mreq = struct.pack("=4sL", socket.inet_aton(group), socket.INADDR_ANY)
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+    else:
+        mreq = struct.pack("16sI", socket.inet_pton(socket.AF_INET6, group), 0)
+        sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_JOIN_GROUP, mreq)
+
+
+def enable_packet_info(sock):
+    """
+    Receive the ingress interface and destination of datagrams as ancillary data.
+
+    Args:
+        sock (socket.socket): ``AF_INET`` or ``AF_INET6`` datagram socket.
+
+    """
+    if sock.family == socket.AF_INET:
+        sock.setsockopt(socket.IPPROTO_IP, IP_PKTINFO, 1)
+    else:
+        sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_RECVPKTINFO, 1)
+
+
+def parse_packet_info(ancillary):
+    """
+    Return the ingress interface and destination type of a datagram.
+
+    Args:
+        ancillary (List[Tuple[int, int, bytes]]): Ancillary data returned by
+            :meth:`socket.socket.recvmsg` of a socket, that
+            :func:`enable_packet_info` was called for.
+
+    Returns:
+        Tuple[int, bool]: Interface index, or ``None`` if unknown,
+            and whether the datagram was sent to a multicast group.
+
+    """
+    for level, kind, info in ancillary:
+        if level == socket.IPPROTO_IP and kind == IP_PKTINFO:
+            # struct in_pktinfo: ifindex, local address, destination
+            return int.from_bytes(info[:4], sys.byteorder), info[8] & 0xF0 == 0xE0
+        if level == socket.IPPROTO_IPV6 and kind == socket.IPV6_PKTINFO:
+            # struct in6_pktinfo: destination, ifindex
+            return int.from_bytes(info[16:20], sys.byteorder), info[0] == 0xFF
+    return None, False
+
+
+def _get_ipv4_addresses(name):
+    try:
+        import fcntl
+    except ImportError:  # pragma: no cover
+        return ()
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        try:
+            ifreq = fcntl.ioctl(
+                sock.fileno(), SIOCGIFADDR, struct.pack("256s", name[:15].encode())
+            )
+        except OSError:
+            return ()
+    return (socket.inet_ntoa(ifreq[20:24]),)
+
+
+def _get_ipv6_addresses():
+    addresses = {}
+    try:
+        with open("/proc/net/if_inet6") as f:
+            for line in f:
+                address, _, _, _, _, name = line.split()
+                address = str(ipaddress.IPv6Address(bytes.fromhex(address)))
+                addresses.setdefault(name, []).append(address)
+    except OSError:  # pragma: no cover
+        pass
+    return addresses
+
+
+@functools.cache
+def get_interfaces():
+    """
+    Return all network interfaces and their addresses.
+
+    IPv4 and IPv6 addresses are only available on Linux.
+    The result is cached, call ``get_interfaces.cache_clear()`` to refresh it.
+
+    Returns:
+        Tuple[Interface]: Network interfaces.
+
+    """
+    ipv6 = _get_ipv6_addresses()
+    return tuple(
+        Interface(
+            name=name,
+            index=index,
+            ipv4=_get_ipv4_addresses(name),
+            ipv6=tuple(ipv6.get(name, ())),
+        )
+        for index, name in socket.if_nameindex()
+    )
+
+
+def create_multicast_socket(
+    family, interface, group=None, port=PORT, ttl=2, loopback=True
+):
+    """
+    Create a UDP socket, that sends and receives multicast on a single interface.
+
+    Args:
+        family (int): Address family, either ``AF_INET`` or ``AF_INET6``.
+        interface (Interface): Interface to join the group and send on.
+            IPv4 requires the interface to have an IPv4 address.
+        group (str): Multicast group to join, defaults to the IPv4
+            or IPv6 link-local SSDP address.
+        port (int): Port to bind to.
+        ttl (int): Time-to-live or hop limit of sent datagrams.
+        loopback (bool): Whether sent datagrams are looped back to this host.
+
+    Returns:
+        socket.socket: Bound socket.
+
+    """
+    sock = socket.socket(family, socket.SOCK_DGRAM)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, "SO_REUSEPORT"):
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        if hasattr(socket, "SO_BINDTODEVICE"):
+            try:
+                sock.setsockopt(
+                    socket.SOL_SOCKET, socket.SO_BINDTODEVICE, interface.name.encode()
+                )
+            except PermissionError:
+                # Only privileged sockets are bound to the interface, others
+                # may receive unicast datagrams of any interface.
+                pass
+        if family == socket.AF_INET:
+            _configure_ipv4(
+                sock, interface, group or MULTICAST_ADDRESS_IPV4, ttl, loopback
+            )
+            sock.bind(("", port))
+        else:
+            _configure_ipv6(
+                sock,
+                interface,
+                group or MULTICAST_ADDRESS_IPV6_LINK_LOCAL,
+                ttl,
+                loopback,
+            )
+            sock.bind(("::", port))
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def _configure_ipv4(sock, interface, group, ttl, loopback):
+    address = socket.inet_aton(interface.ipv4[0])
+    sock.setsockopt(
+        socket.IPPROTO_IP,
+        socket.IP_ADD_MEMBERSHIP,
+        struct.pack("4s4s", socket.inet_aton(group), address),
+    )
+    sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, address)
+    sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, ttl)
+    sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, int(loopback))
+    if sys.platform == "linux":
+        # Only receive groups joined by this socket, not by any socket on the host.
+        sock.setsockopt(socket.IPPROTO_IP, IP_MULTICAST_ALL, 0)
+
+
+def _configure_ipv6(sock, interface, group, ttl, loopback):
+    sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 1)
+    sock.setsockopt(
+        socket.IPPROTO_IPV6,
+        socket.IPV6_JOIN_GROUP,
+        struct.pack("16sI", socket.inet_pton(socket.AF_INET6, group), interface.index),
+    )
+    sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_MULTICAST_IF, interface.index)
+    sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_MULTICAST_HOPS, ttl)
+    sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_MULTICAST_LOOP, int(loopback))
+    if sys.platform == "linux":
+        try:
+            sock.setsockopt(socket.IPPROTO_IPV6, IPV6_MULTICAST_ALL, 0)
+        except OSError:  # pragma: no cover
+            pass  # requires Linux 4.20
@@ -0,0 +1,373 @@
+"""
+Registry of SSDP devices seen on the network.
+
+The registry consumes NOTIFY requests and M-SEARCH responses and keeps
+track of all live entries, keyed by their unique service name (USN).
+Entries expire according to the ``max-age`` directive of their
+``CACHE-CONTROL`` header. Expiry is tracked in a single heap, rather than
+a timer per entry, which keeps the registry cheap for large fleets.
+
+Registries can be saved to and loaded from snapshots, so that a restarted
+process serves known devices right away, while a single search verifies
+them in the background.
+"""
+
+import collections
+import gzip
+import heapq
+import json
+import time
+import urllib.parse
+
+from . import messages
+
+__all__ = ["Device", "Registry"]
+
+SNAPSHOT_VERSION = 1
+
+
+def _get_host(location):
+    try:
+        return urllib.parse.urlsplit(location).hostname
+    except ValueError:
+        return None
+
+
+class Device:
+    """
+    Registry entry for a single unique service name (USN).
+
+    Attributes:
+        usn (str): Unique service name.
+        type (str): Notification or search target, e.g. ``upnp:rootdevice``.
+        location (str): URL of the device description.
+        host (str): Host name of the location URL.
+        headers (ssdp.messages.Headers): Headers of the last message.
+        addr (Tuple[str, int]): Address the last message was received from.
+        expires (float): Time the entry expires at, see :attr:`Registry.clock`.
+
+    """
+
+    __slots__ = ("usn", "type", "location", "host", "headers", "addr", "expires")
+
+    def __init__(self, usn, type, location, headers, addr, expires, host=None):
+        self.usn = usn
+        self.type = type
+        self.location = location
+        if host is None and location:
+            host = _get_host(location)
+        self.host = host
+        self.headers = headers
+        self.addr = addr
+        self.expires = expires
+
+    def __repr__(self):
+        return f"<{type(self).__qualname__}: {self.usn}>"
+
+
+class Registry:
+    """
+    Registry of live SSDP devices.
+
+    Feed received messages to :meth:`process`, e.g. from
+    :meth:`.SimpleServiceDiscoveryProtocol.response_received` and
+    :meth:`.SimpleServiceDiscoveryProtocol.request_received`.
+
+    Args:
+        max_entries (int): Maximum number of entries. If exceeded, the least
+            recently seen entry is evicted. Defaults to no limit.
+        default_max_age (int): Lifetime in seconds of entries
+            without a valid ``CACHE-CONTROL`` header.
+        clock (Callable[[], float]): Monotonic clock in seconds.
+
+    """
+
+    def __init__(self, max_entries=None, default_max_age=1800, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.default_max_age = default_max_age
+        self.clock = clock
+        self._devices = collections.OrderedDict()
+        self._by_type = collections.defaultdict(set)
+        self._by_host = collections.defaultdict(set)
+        self._expiry = []
+        self._counter = 0
+
+    def __len__(self):
+        self.expire()
+        return len(self._devices)
+
+    def __iter__(self):
+        self.expire()
+        return iter(list(self._devices.values()))
+
+    def __contains__(self, usn):
+        return self.get(usn) is not None
+
+    def process(self, message, addr=None):
+        """
+        Update the registry with a received message.
+
+        ``ssdp:alive`` and ``ssdp:update`` notifications as well as search
+        responses add or refresh an entry, ``ssdp:byebye`` notifications
+        remove it. All other messages are ignored.
+
+        Args:
+            message (ssdp.messages.SSDPMessage): Received message.
+            addr (Tuple[str, int]): Address the message was received from.
+
+        Returns:
+            Device: Added, refreshed or removed entry, or ``None``.
+
+        """
+        usn = message.get_header("USN")
+        if not usn:
+            return None
+        if isinstance(message, messages.SSDPResponse):
+            if message.status_code != 200:
+                return None
+            return self._update(usn, message.get_header("ST"), message, addr)
+        if message.method != "NOTIFY":
+            return None
+        nts = message.get_header("NTS")
+        if nts == "ssdp:byebye":
+            return self.remove(usn)
+        if nts in ("ssdp:alive", "ssdp:update"):
+            return self._update(usn, message.get_header("NT"), message, addr)
+        return None
+
+    def get(self, usn):
+        """Return the live entry for the given USN, or ``None``."""
+        self.expire()
+        device = self._devices.get(usn)
+        if device is not None:
+            self._devices.move_to_end(usn)
+        return device
+
+    def by_type(self, type):
+        """Return all live entries of the given notification or search target."""
+        self.expire()
+        return [self._devices[usn] for usn in self._by_type.get(type, ())]
+
+    def by_host(self, host):
+        """Return all live entries with a location on the given host."""
+        self.expire()
+        return [self._devices[usn] for usn in self._by_host.get(host, ())]
+
+    def remove(self, usn):
+        """
+        Remove an entry from the registry.
+
+        Returns:
+            Device: Removed entry, or ``None`` if there was none.
+
+        """
+        device = self._devices.pop(usn, None)
+        if device is not None:
+            self._unindex(device)
+        return device
+
+    def expire(self, now=None):
+        """
+        Remove all expired entries.
+
+        Args:
+            now (float): Current time, defaults to :attr:`clock`.
+
+        Returns:
+            List[Device]: Expired entries.
+
+        """
+        heap = self._expiry
+        if not heap:
+            return []
+        if now is None:
+            now = self.clock()
+        expired = []
+        while heap and heap[0][0] <= now:
+            expires, _, usn = heapq.heappop(heap)
+            device = self._devices.get(usn)
+            # Skip stale heap entries of refreshed or removed devices.
+            if device is not None and device.expires == expires:
+                expired.append(self.remove(usn))
+        return expired
+
+    def next_expiry(self):
+        """
+        Return the time the next entry expires at, or ``None``.
+
+        This can be used to schedule a single timer for the whole registry,
+        that calls :meth:`expire`.
+        """
+        heap = self._expiry
+        while heap:
+            expires, _, usn = heap[0]
+            device = self._devices.get(usn)
+            if device is not None and device.expires == expires:
+                return expires
+            heapq.heappop(heap)
+        return None
+
+    def dump(self, file, wall_time=None):
+        """
+        Write a snapshot of all live entries to a file.
+
+        Snapshots are gzip compressed JSON. Expiry times are stored as wall
+        clock times, since monotonic clocks are reset on reboot.
+
+        Args:
+            file (BinaryIO): File opened for writing in binary mode.
+            wall_time (float): Current time since the epoch, defaults to now.
+
+        """
+        now = self.clock()
+        if wall_time is None:
+            wall_time = time.time()
+        devices = [
+            [
+                device.usn,
+                device.type,
+                device.location,
+                round(wall_time + device.expires - now, 3),
+                list(device.headers),
+                device.addr,
+            ]
+            for device in self
+        ]
+        data = json.dumps(
+            {"version": SNAPSHOT_VERSION, "devices": devices}, separators=(",", ":")
+        )
+        with gzip.GzipFile(fileobj=file, mode="wb", mtime=0) as f:
+            f.write(data.encode())
+
+    def load(self, file, wall_time=None):
+        """
+        Add the entries of a snapshot, that did not expire yet.
+
+        Entries already in the registry are kept, since they are more recent.
+
+        Args:
+            file (BinaryIO): File opened for reading in binary mode.
+            wall_time (float): Current time since the epoch, defaults to now.
+
+        Returns:
+            List[Device]: Loaded entries.
+
+        Raises:
+            ValueError: If the file is not a snapshot.
+
+        """
+        try:
+            with gzip.GzipFile(fileobj=file, mode="rb") as f:
+                snapshot = json.loads(f.read())
+        except (OSError, EOFError) as e:
+            raise ValueError(f"Invalid snapshot: {e}") from e
+        version = snapshot.get("version") if isinstance(snapshot, dict) else None
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version: {version}")
+        now = self.clock()
+        if wall_time is None:
+            wall_time = time.time()
+        loaded = []
+        for usn, type, location, expires, headers, addr in snapshot["devices"]:
+            max_age = expires - wall_time
+            if max_age <= 0 or usn in self._devices:
+                continue
+            device = Device(
+                usn,
+                type,
+                location,
+                messages.Headers(map(tuple, headers)),
+                tuple(addr) if addr is not None else None,
+                now + max_age,
+            )
+            self._insert(device)
+            loaded.append(device)
+        return loaded
+
+    async def verify(self, st="ssdp:all", mx=2, prune=False, **kwargs):
+        """
+        Refresh all entries with a single search, e.g. after :meth:`load`.
+
+        Args:
+            st (str): Search target.
+            mx (int): Maximum wait time in seconds.
+            prune (bool): Remove entries, that didn't respond and
+                weren't refreshed by any other message during the search.
+            **kwargs: Passed to :func:`ssdp.aio.search`.
+
+        Returns:
+            List[Device]: Entries, that were refreshed during the search.
+
+        """
+        from . import aio  # avoid importing asyncio with the registry
+
+        before = dict(self._devices)
+        async for response, addr in aio.search(st, mx=mx, **kwargs):
+            self.process(response, addr)
+        refreshed = []
+        for usn, device in before.items():
+            current = self._devices.get(usn)
+            if current is None:
+                continue
+            if current is not device:
+                refreshed.append(current)
+            elif prune:
+                self.remove(usn)
+        return refreshed
+
+    def _update(self, usn, type, message, addr):
+        max_age = message.max_age
+        device = self._devices.get(usn)
+        if max_age is None:
+            if device is not None:
+                max_age = max(device.expires - self.clock(), 0)
+            else:
+                max_age = self.default_max_age
+        expires = self.clock() + max_age
+        if device is not None:
+            self._unindex(device)
+            del self._devices[usn]
+        url = message.location
+        device = Device(
+            usn,
+            type,
+            message.get_header("LOCATION"),
+            message.headers,
+            addr,
+            expires,
+            host=url.hostname if url is not None else None,
+        )
+        self._insert(device)
+        return device
+
+    def _insert(self, device):
+        self._devices[device.usn] = device
+        if device.type:
+            self._by_type[device.type].add(device.usn)
+        if device.host:
+            self._by_host[device.host].add(device.usn)
+        self._counter += 1
+        heapq.heappush(self._expiry, (device.expires, self._counter, device.usn))
+        if len(self._expiry) > 2 * len(self._devices) + 64:
+            self._compact()
+        if self.max_entries is not None:
+            while len(self._devices) > self.max_entries:
+                _, evicted = self._devices.popitem(last=False)
+                self._unindex(evicted)
+
+    def _unindex(self, device):
+        for index, key in [(self._by_type, device.type), (self._by_host, device.host)]:
+            usns = index.get(key)
+            if usns is not None:
+                usns.discard(device.usn)
+                if not usns:
+                    del index[key]
+
+    def _compact(self):
+        """Drop stale entries from the expiry heap."""
+        self._expiry = [
+            (device.expires, counter, usn)
+            for counter, (usn, device) in enumerate(self._devices.items())
+        ]
+        heapq.heapify(self._expiry)
+        self._counter = len(self._expiry)
@@ -0,0 +1,287 @@
+"""
+Answer M-SEARCH requests.
+
+The :class:`Responder` answers searches for registered advertisements,
+e.g. :class:`~ssdp.advertiser.Advertisement` instances. Matching
+advertisements are looked up by their notification type. Each response
+is delayed by a random fraction of the request's ``MX`` header. All
+pending responses are kept in a single heap, that is served by a single
+timer. Responses are rate limited per source address and globally.
+"""
+
+import asyncio
+import collections
+import heapq
+import random
+import time
+
+from . import aio
+
+__all__ = ["Responder"]
+
+
+class Responder(aio.SimpleServiceDiscoveryProtocol):
+    """
+    Answer matching M-SEARCH requests after a random delay within ``MX``.
+
+    Each registered advertisement is answered, if the search target is
+    ``ssdp:all`` or matches its notification type. Searches without an
+    ``MX`` header are answered right away. A response, that is already
+    pending for a requester, is not scheduled again, so that retransmitted
+    searches don't multiply the responses.
+
+    Every response takes a token from the bucket of the requester's host
+    and from the global bucket. Responses are dropped, if either bucket
+    is empty.
+
+    Example:
+        >>> transport, responder = await loop.create_datagram_endpoint(
+        ...     lambda: Responder(advertisements), sock=sock
+        ... )
+
+    Args:
+        advertisements (Iterable[ssdp.advertiser.Advertisement]):
+            Initial advertisements.
+        coalesce (float): Send everything due within this many seconds
+            in the same wakeup.
+        rate (float): Maximum number of responses per second,
+            or ``None`` to not limit responses globally.
+        burst (float): Number of responses, that may exceed ``rate``.
+        source_rate (float): Maximum number of responses per second to
+            a single host, or ``None`` to not limit responses per host.
+        source_burst (float): Number of responses to a single host,
+            that may exceed ``source_rate``.
+        max_sources (int): Maximum number of hosts to track. If exceeded,
+            the least recently seen hosts are forgotten first.
+        clock (Callable[[], float]): Monotonic clock in seconds.
+        **kwargs: Passed to :class:`~ssdp.aio.SimpleServiceDiscoveryProtocol`.
+
+    Attributes:
+        sent (int): Number of sent datagrams.
+        coalesced (int): Number of responses, that were already pending.
+        dropped (int): Number of responses, that exceeded a rate limit.
+
+    """
+
+    def __init__(
+        self,
+        advertisements=(),
+        coalesce=0.05,
+        rate=1000,
+        burst=1000,
+        source_rate=100,
+        source_burst=200,
+        max_sources=1024,
+        clock=time.monotonic,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.clock = clock
+        self.coalesce = coalesce
+        self.source_rate = source_rate
+        self.source_burst = source_burst
+        self.max_sources = max_sources
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self._loop = None
+        self._handle = None
+        self._handle_due = None
+        self._bucket = (
+            None if rate is None else aio.TokenBucket(rate, burst, clock=clock)
+        )
+        self._sources = collections.OrderedDict()
+        # Entries are (due, sequence, advertisement, datagram, address),
+        # the advertisement is None for responses.
+        self._heap = []
+        self._sequence = 0
+        self._pending = set()
+        self._advertisements = {}
+        self._responses = {}
+        self._by_nt = {}
+        for advertisement in advertisements:
+            self.add(advertisement)
+
+    def __len__(self):
+        return len(self._advertisements)
+
+    def __iter__(self):
+        return iter(self._advertisements.values())
+
+    def connection_made(self, transport):
+        super().connection_made(transport)
+        self._loop = asyncio.get_running_loop()
+        self._schedule()
+
+    def _push(self, due, advertisement, data=None, addr=None):
+        self._sequence += 1
+        heapq.heappush(self._heap, (due, self._sequence, advertisement, data, addr))
+
+    def add(self, advertisement):
+        """
+        Add an advertisement to answer searches for.
+
+        An advertisement with the same USN is replaced.
+
+        Args:
+            advertisement (ssdp.advertiser.Advertisement): Advertisement.
+
+        """
+        self.remove(advertisement.usn)
+        self._advertisements[advertisement.usn] = advertisement
+        self._responses[advertisement.usn] = bytes(advertisement.response())
+        self._by_nt.setdefault(advertisement.nt, {})[advertisement.usn] = advertisement
+
+    def remove(self, usn):
+        """
+        Remove an advertisement.
+
+        Responses, that are already pending, are still sent.
+
+        Args:
+            usn (str): Unique service name of the advertisement.
+
+        Returns:
+            ssdp.advertiser.Advertisement: Removed advertisement, or ``None``.
+
+        """
+        advertisement = self._advertisements.pop(usn, None)
+        if advertisement is None:
+            return None
+        del self._responses[usn]
+        by_nt = self._by_nt[advertisement.nt]
+        del by_nt[usn]
+        if not by_nt:
+            del self._by_nt[advertisement.nt]
+        return advertisement
+
+    def matching(self, st):
+        """
+        Return all advertisements matching a search target.
+
+        Args:
+            st (str): Search target, e.g. ``ssdp:all``.
+
+        Returns:
+            List[ssdp.advertiser.Advertisement]: Matching advertisements.
+
+        """
+        if st == "ssdp:all":
+            return list(self._advertisements.values())
+        return list(self._by_nt.get(st, {}).values())
+
+    def _source_bucket(self, host):
+        sources = self._sources
+        try:
+            sources.move_to_end(host)
+            return sources[host]
+        except KeyError:
+            bucket = sources[host] = aio.TokenBucket(
+                self.source_rate, self.source_burst, clock=self.clock
+            )
+            if len(sources) > self.max_sources:
+                sources.popitem(last=False)
+            return bucket
+
+    def request_received(self, request, addr):
+        if request.method != "M-SEARCH":
+            return
+        if request.get_header("MAN", "").strip('"') != "ssdp:discover":
+            return
+        matching = self.matching(request.get_header("ST", ""))
+        if not matching:
+            return
+        mx = request.get_header("MX")
+        if mx is None:
+            # Unicast searches are answered right away.
+            delay = 0
+        else:
+            try:
+                delay = min(max(int(mx), 1), 5)
+            except ValueError:
+                return
+        source = None if self.source_rate is None else self._source_bucket(addr[0])
+        bucket = self._bucket
+        now = self.clock()
+        for advertisement in matching:
+            response = self._responses[advertisement.usn]
+            key = response, addr
+            if key in self._pending:
+                self.coalesced += 1
+                continue
+            if (source is not None and not source.consume()) or (
+                bucket is not None and not bucket.consume()
+            ):
+                self.dropped += 1
+                continue
+            self._pending.add(key)
+            due = now + random.uniform(0, delay)  # noqa: S311
+            self._push(due, None, response, addr)
+        self._schedule()
+
+    def response_received(self, response, addr):
+        pass
+
+    def _schedule(self):
+        """Arm the shared timer for the earliest heap entry."""
+        if self._loop is None or not self._heap:
+            return
+        due = self._heap[0][0]
+        if self._handle is not None:
+            if self._handle_due <= due:
+                return
+            self._handle.cancel()
+        self._handle_due = due
+        self._handle = self._loop.call_later(max(due - self.clock(), 0), self._run)
+
+    def _run(self):
+        self._handle = None
+        heap = self._heap
+        now = self.clock()
+        deadline = now + self.coalesce
+        due = []
+        while heap and heap[0][0] <= deadline:
+            _, sequence, advertisement, data, addr = heapq.heappop(heap)
+            if advertisement is None:
+                self._pending.discard((data, addr))
+                self._send(data, addr)
+            else:
+                due.append((sequence, advertisement))
+        if due:
+            self._due(due, now)
+        self._schedule()
+
+    def _due(self, entries, now):
+        """
+        Being called with heap entries of advertisements, that are due.
+
+        Subclasses scheduling advertisements, e.g. to announce them,
+        handle them here.
+
+        Args:
+            entries (List[Tuple[int, ssdp.advertiser.Advertisement]]):
+                Sequence number and advertisement pairs.
+            now (float): Current time of :attr:`clock`.
+
+        """
+
+    def _send(self, data, addr):
+        self.transport.sendto(data, addr)
+        self.sent += 1
+        if self.metrics is not None:
+            self.metrics.packets_sent += 1
+            self.metrics.bytes_sent += len(data)
+
+    def connection_lost(self, exc):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        super().connection_lost(exc)
+
+    def close(self):
+        """Stop the timer and discard all pending responses."""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        self._heap.clear()
+        self._pending.clear()
@@ -0,0 +1,202 @@
+"""
+Multi-process SSDP listener.
+
+A single asyncio event loop can only use a single CPU core. The
+:class:`ShardedServer` starts multiple worker processes, that each bind the
+same port with ``SO_REUSEPORT`` and run their own event loop. Workers parse
+datagrams and pass the results to the coordinating process via a pipe.
+
+The kernel balances unicast datagrams across the workers' sockets.
+Multicast datagrams, however, are delivered to every socket that joined
+the group. Therefore, if a multicast group is joined, each worker only
+handles multicast datagrams from sources, that
+:class:`~ssdp.filters.ShardFilter` assigns to it. The destination of each
+datagram is read from its ``IP_PKTINFO`` or ``IPV6_PKTINFO`` ancillary data,
+so that unicast datagrams are always handled by the receiving worker.
+
+This requires ``SO_REUSEPORT`` and an event loop, that supports
+:meth:`~asyncio.loop.add_reader`, e.g. on Linux.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import socket
+
+from . import aio, filters, network
+
+__all__ = ["ShardedServer", "WorkerProtocol"]
+
+
+class WorkerProtocol(aio.SimpleServiceDiscoveryProtocol):
+    """
+    Protocol running in a worker process.
+
+    By default, all received messages are published to the coordinator as
+    ``(message, addr)`` tuples. Override :meth:`response_received` and
+    :meth:`request_received` to publish something else, e.g. aggregated
+    registry updates.
+    """
+
+    channel = None
+
+    def publish(self, item):
+        """Send a picklable item to the coordinating process."""
+        self.channel.send(item)
+
+    def response_received(self, response, addr):
+        self.publish((response, addr))
+
+    def request_received(self, request, addr):
+        self.publish((request, addr))
+
+
+class _ShardedTransport(aio.BatchedDatagramTransport):
+    """
+    Batched transport, that shards multicast datagrams by their source.
+
+    Unicast datagrams are already balanced by the kernel and always passed on.
+    """
+
+    def __init__(self, loop, sock, protocol, shard, batch_size=64):
+        network.enable_packet_info(sock)
+        self._shard = shard
+        self._ancillary_size = socket.CMSG_SPACE(20)
+        super().__init__(loop, sock, protocol, batch_size=batch_size)
+
+    def _receive(self):
+        data, ancillary, _, addr = self._sock.recvmsg(
+            self.max_size, self._ancillary_size
+        )
+        _, multicast = network.parse_packet_info(ancillary)
+        if multicast and self._shard(data, addr):
+            return None
+        return data, addr
+
+
+def _run_worker(protocol_factory, channel, index, count, options):
+    family, host, port, group, batch_size = options
+    sock = network.create_socket(family, host, port, group=group, reuse_port=True)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        stopped = asyncio.Event()
+        loop.add_reader(channel.fileno(), stopped.set)
+        protocol = protocol_factory()
+        if group is None:
+            transport = aio.BatchedDatagramTransport(
+                loop, sock, protocol, batch_size=batch_size
+            )
+        else:
+            transport = _ShardedTransport(
+                loop,
+                sock,
+                protocol,
+                filters.ShardFilter(index, count),
+                batch_size=batch_size,
+            )
+        protocol.channel = channel
+        channel.send(None)  # ready
+        try:
+            await stopped.wait()
+        finally:
+            transport.close()
+
+    asyncio.run(main())
+
+
+class ShardedServer:
+    """
+    Coordinator of SSDP worker processes sharing the same port.
+
+    Example:
+        >>> async def main():
+        ...     server = ShardedServer(WorkerProtocol, print, workers=4)
+        ...     await server.start()
+        ...     try:
+        ...         await asyncio.sleep(60)
+        ...     finally:
+        ...         server.close()
+
+    Args:
+        protocol_factory (Callable[[], WorkerProtocol]): Picklable factory,
+            e.g. a :class:`WorkerProtocol` subclass, called in every worker.
+        callback (Callable[[Any], None]): Called in the coordinating process
+            with each item published by a worker.
+        workers (int): Number of worker processes, defaults to the CPU count.
+        family (int): Address family, either ``AF_INET`` or ``AF_INET6``.
+        host (str): Address to bind to, defaults to all interfaces.
+        port (int): Port to bind to.
+        group (str): Multicast group to join, ``None`` to not join any group.
+        batch_size (int): Maximum number of datagrams read per wakeup.
+        context (multiprocessing.context.BaseContext): Multiprocessing context,
+            defaults to ``spawn``, since forking a running event loop is unsafe.
+
+    """
+
+    def __init__(
+        self,
+        protocol_factory,
+        callback,
+        workers=None,
+        family=socket.AF_INET,
+        host="",
+        port=network.PORT,
+        group=network.MULTICAST_ADDRESS_IPV4,
+        batch_size=64,
+        context=None,
+    ):
+        self.protocol_factory = protocol_factory
+        self.callback = callback
+        self.workers = workers or os.cpu_count() or 1
+        self.options = family, host, port, group, batch_size
+        self.context = context or multiprocessing.get_context("spawn")
+        self.processes = []
+        self._channels = []
+
+    async def start(self):
+        """Start all workers and wait until they are ready to receive."""
+        loop = asyncio.get_running_loop()
+        for index in range(self.workers):
+            channel, worker_channel = self.context.Pipe()
+            process = self.context.Process(
+                target=_run_worker,
+                args=(
+                    self.protocol_factory,
+                    worker_channel,
+                    index,
+                    self.workers,
+                    self.options,
+                ),
+                daemon=True,
+            )
+            process.start()
+            worker_channel.close()
+            self.processes.append(process)
+            self._channels.append(channel)
+        for channel in self._channels:
+            # Wait for the ready signal of each worker.
+            await loop.run_in_executor(None, channel.recv)
+            loop.add_reader(channel.fileno(), self._read_ready, channel)
+
+    def _read_ready(self, channel):
+        try:
+            while channel.poll():
+                self.callback(channel.recv())
+        except EOFError:
+            asyncio.get_running_loop().remove_reader(channel.fileno())
+
+    def close(self, timeout=5):
+        """Stop all workers."""
+        loop = asyncio.get_running_loop()
+        for channel in self._channels:
+            loop.remove_reader(channel.fileno())
+            channel.send(None)  # stop
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():  # pragma: no cover
+                process.terminate()
+        for channel in self._channels:
+            channel.close()
+        self.processes.clear()
+        self._channels.clear()
@@ -1,3 +1,49 @@
+import asyncio
+import random
+
+from ssdp import advertiser
+
+
+def run(coro):
+    """Run a coroutine in a fresh event loop, without replacing the current loop."""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+class Clock:
+    """Monotonic clock, that only advances when told to."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def advance(protocol, seconds):
+    """Advance the clock of a responder, firing its timer whenever it is due."""
+    clock = protocol.clock
+    end = clock.now + seconds
+    while protocol._handle is not None and protocol._handle_due <= end:
+        clock.now = max(clock.now, protocol._handle_due)
+        protocol._handle.cancel()
+        protocol._run()
+    clock.now = end
+
+
+def advertisement(i=0, nt="upnp:rootdevice", max_age=1800):
+    return advertiser.Advertisement(
+        nt,
+        f"uuid:{i}::{nt}",
+        f"http://10.0.0.1/{i}.xml",
+        max_age=max_age,
+        headers=[("BOOTID.UPNP.ORG", "1")],
+    )
+
+
 request = b"""NOTIFY * HTTP/1.1
 Host: 239.255.255.250:1982
 Cache-Control: max-age=3600
@@ -42,3 +88,33 @@ Date:
 Ext:
 Location: yeelight://not.an.ip:55443
 Server: POSIX UPnP/1.0 YGLC/1""".replace(b"\n", b"\r\n")
+
+
+def junk(count=1000, seed=0):
+    """Return a reproducible corpus of malformed and oversized datagrams."""
+    rng = random.Random(seed)  # noqa: S311
+    corpus = [
+        b"",
+        b"\r\n",
+        b"HTTP/1.1\r\n\r\n",
+        b"NOTIFY *\r\n\r\n",
+        b"HTTP/1.1 abc OK\r\n\r\n",
+        b"\xff\xfe NOTIFY * HTTP/1.1\r\n\r\n",
+        b"NOTIFY * HTTP/1.1\r\n" + b"X: y\r\n" * 1000,
+        b"NOTIFY * HTTP/1.1\r\nX: " + b"y" * 4000 + b"\r\n\r\n",
+        b"NOTIFY * HTTP/1.1\r" + b"X: y\r" * 1000,
+        b"M-SEARCH * HTTP/1.1\r\n" + b"\x00" * 65000,
+    ]
+    while len(corpus) < count:
+        kind = rng.randrange(3)
+        if kind == 0:
+            data = rng.randbytes(rng.randrange(1, 1500))
+        elif kind == 1:
+            data = bytearray(rng.choice([request, response]))
+            for _ in range(rng.randrange(1, 20)):
+                data[rng.randrange(len(data))] = rng.randrange(256)
+            data = bytes(data)
+        else:
+            data = rng.choice([request, response])[: rng.randrange(40)]
+        corpus.append(data)
+    return corpus
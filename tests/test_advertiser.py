@@ -0,0 +1,160 @@
+import asyncio
+from unittest.mock import Mock
+
+from ssdp import advertiser, messages, network
+
+from .fixtures import Clock, advance, advertisement, run
+
+MULTICAST = network.MULTICAST_ADDRESS_IPV4, network.PORT
+
+
+def sent(transport):
+    return [
+        (messages.SSDPMessage.parse_bytes(data), addr)
+        for (data, addr), _ in transport.sendto.call_args_list
+    ]
+
+
+def connect(protocol):
+    transport = Mock()
+    protocol.connection_made(transport)
+    return transport
+
+
+class TestAdvertisement:
+    def test_notify(self):
+        request = advertisement().notify("ssdp:alive", MULTICAST)
+        assert request.method == "NOTIFY"
+        assert request.headers == [
+            ("HOST", "239.255.255.250:1900"),
+            ("CACHE-CONTROL", "max-age=1800"),
+            ("LOCATION", "http://10.0.0.1/0.xml"),
+            ("NT", "upnp:rootdevice"),
+            ("NTS", "ssdp:alive"),
+            ("SERVER", advertiser.SERVER),
+            ("USN", "uuid:0::upnp:rootdevice"),
+            ("BOOTID.UPNP.ORG", "1"),
+        ]
+
+    def test_notify__byebye(self):
+        request = advertisement().notify("ssdp:byebye", ("ff02::c", 1900))
+        assert request.headers == [
+            ("HOST", "[ff02::c]:1900"),
+            ("NT", "upnp:rootdevice"),
+            ("NTS", "ssdp:byebye"),
+            ("USN", "uuid:0::upnp:rootdevice"),
+            ("BOOTID.UPNP.ORG", "1"),
+        ]
+
+    def test_response(self):
+        response = advertisement().response()
+        assert response.status_code == 200
+        assert response.get_header("ST") == "upnp:rootdevice"
+        assert response.get_header("EXT") == ""
+        assert response.get_header("USN") == "uuid:0::upnp:rootdevice"
+
+    def test_repr(self):
+        assert repr(advertisement()) == "<Advertisement: uuid:0::upnp:rootdevice>"
+
+
+class TestAdvertiser:
+    def test_announce(self):
+        async def main():
+            protocol = advertiser.Advertiser([advertisement(i) for i in range(1000)])
+            wakeups = 0
+            run_ = protocol._run
+
+            def counting_run():
+                nonlocal wakeups
+                wakeups += 1
+                run_()
+
+            protocol._run = counting_run
+            transport = connect(protocol)
+            await asyncio.sleep(0.2)
+            return protocol, transport, wakeups
+
+        protocol, transport, wakeups = run(main())
+        messages_ = sent(transport)
+        assert len(messages_) == 1000
+        assert {addr for _, addr in messages_} == {MULTICAST}
+        assert {msg.get_header("NTS") for msg, _ in messages_} == {"ssdp:alive"}
+        assert 1 <= wakeups <= 3
+        assert protocol.sent == 1000
+        assert len(protocol) == 1000
+
+    def test_refresh(self):
+        async def main():
+            protocol = advertiser.Advertiser(initial_delay=0, repeat=2, clock=Clock())
+            transport = connect(protocol)
+            protocol.add(advertisement(max_age=10))
+            advance(protocol, 0)
+            announced = len(sent(transport))
+            advance(protocol, 3.9)
+            assert len(sent(transport)) == announced
+            advance(protocol, 1.1)
+            return announced, transport
+
+        # Announced twice right away and twice after 4 to 5 seconds.
+        announced, transport = run(main())
+        assert announced == 2
+        assert len(sent(transport)) == 4
+
+    def test_refresh_interval(self):
+        protocol = advertiser.Advertiser()
+        intervals = [protocol._refresh_interval(advertisement()) for _ in range(100)]
+        assert all(720 <= interval <= 900 for interval in intervals)
+
+    def test_remove(self):
+        async def main():
+            protocol = advertiser.Advertiser(initial_delay=0, clock=Clock())
+            transport = connect(protocol)
+            ad = advertisement()
+            protocol.add(ad)
+            assert protocol.remove(ad.usn) is ad
+            assert protocol.remove(ad.usn) is None
+            advance(protocol, 1)
+            return protocol, transport
+
+        protocol, transport = run(main())
+        [(msg, addr)] = sent(transport)
+        assert msg.get_header("NTS") == "ssdp:byebye"
+        assert len(protocol) == 0
+        assert not protocol.matching("upnp:rootdevice")
+
+    def test_add__replace(self):
+        protocol = advertiser.Advertiser()
+        protocol.add(advertisement())
+        protocol.add(advertisement())
+        assert list(protocol) == [protocol.matching("ssdp:all")[0]]
+
+    def test_compact(self):
+        protocol = advertiser.Advertiser()
+        for _ in range(1000):
+            protocol.add(advertisement())
+        assert len(protocol._heap) < 200
+
+    def test_close(self):
+        async def main():
+            protocol = advertiser.Advertiser(
+                [advertisement(i) for i in range(3)], clock=Clock()
+            )
+            transport = connect(protocol)
+            protocol.close()
+            advance(protocol, 1)
+            return protocol, transport
+
+        protocol, transport = run(main())
+        messages_ = sent(transport)
+        assert [msg.get_header("NTS") for msg, _ in messages_] == ["ssdp:byebye"] * 3
+        assert len(protocol) == 0
+
+    def test_connection_lost(self):
+        async def main():
+            protocol = advertiser.Advertiser([advertisement()])
+            transport = connect(protocol)
+            protocol.connection_lost(None)
+            await asyncio.sleep(0.2)
+            return transport
+
+        assert not run(main()).sendto.called
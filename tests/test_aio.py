@@ -0,0 +1,724 @@
+import asyncio
+import socket
+import sys
+from unittest.mock import Mock, patch
+
+import pytest
+from ssdp import aio, filters, messages, metrics, network
+
+from . import fixtures
+from .fixtures import run
+
+
+class TestSimpleServiceDiscoveryProtocol:
+    def test_datagram_received__response(self):
+        protocol = aio.SimpleServiceDiscoveryProtocol()
+        protocol.response_received = Mock()
+        protocol.datagram_received(fixtures.response, ("10.0.0.1", 1900))
+        response, addr = protocol.response_received.call_args[0]
+        assert isinstance(response, messages.SSDPResponse)
+        assert response.status_code == 200
+        assert addr == ("10.0.0.1", 1900)
+
+    def test_datagram_received__request(self):
+        protocol = aio.SimpleServiceDiscoveryProtocol()
+        protocol.request_received = Mock()
+        protocol.datagram_received(fixtures.request, ("10.0.0.1", 1900))
+        request, addr = protocol.request_received.call_args[0]
+        assert isinstance(request, messages.SSDPRequest)
+        assert request.method == "NOTIFY"
+        assert addr == ("10.0.0.1", 1900)
+
+    def test_datagram_received__invalid(self):
+        protocol = aio.SimpleServiceDiscoveryProtocol()
+        protocol.request_received = Mock()
+        protocol.response_received = Mock()
+        corpus = fixtures.junk()
+        for data in corpus:
+            protocol.datagram_received(data, ("10.0.0.1", 1900))
+        received = (
+            protocol.request_received.call_count + protocol.response_received.call_count
+        )
+        assert protocol.rejected > 0
+        assert protocol.rejected + received == len(corpus)
+
+    def test_datagram_received__limits(self):
+        protocol = aio.SimpleServiceDiscoveryProtocol(
+            limits=messages.Limits(max_size=100)
+        )
+        protocol.datagram_received(fixtures.response, ("10.0.0.1", 1900))
+        assert protocol.rejected == 1
+
+    def test_datagram_received__intern_table(self):
+        protocol = aio.SimpleServiceDiscoveryProtocol(
+            intern_table=messages.InternTable()
+        )
+        protocol.response_received = Mock()
+        for _ in range(2):
+            protocol.datagram_received(fixtures.response, ("10.0.0.1", 1900))
+        (a, _), (b, _) = (call.args for call in protocol.response_received.mock_calls)
+        assert a.headers[0] is b.headers[0]
+
+    def test_datagrams_received(self):
+        protocol = aio.SimpleServiceDiscoveryProtocol()
+        protocol.response_received = Mock()
+        protocol.request_received = Mock()
+        protocol.datagrams_received(
+            [
+                (fixtures.response, ("10.0.0.1", 1900)),
+                (fixtures.request, ("10.0.0.2", 1900)),
+            ]
+        )
+        assert protocol.response_received.call_count == 1
+        assert protocol.request_received.call_count == 1
+
+
+def udp_socket():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    return sock
+
+
+class BatchProtocol(aio.SimpleServiceDiscoveryProtocol):
+    def __init__(self):
+        self.batches = []
+        self.requests = []
+        self.lost = asyncio.get_running_loop().create_future()
+
+    def datagrams_received(self, batch):
+        self.batches.append(batch)
+        super().datagrams_received(batch)
+
+    def request_received(self, request, addr):
+        self.requests.append((request, addr))
+
+    def connection_lost(self, exc):
+        self.lost.set_result(exc)
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="requires a selector event loop")
+class TestBatchedDatagramTransport:
+    def test_receive(self):
+        async def main():
+            sock, sender = udp_socket(), udp_socket()
+            transport, protocol = await aio.create_batched_datagram_endpoint(
+                BatchProtocol, sock, batch_size=4
+            )
+            for _ in range(10):
+                sender.sendto(fixtures.request, sock.getsockname())
+            while len(protocol.requests) < 10:
+                await asyncio.sleep(0.01)
+            transport.close()
+            await protocol.lost
+            sender.close()
+            return transport, protocol
+
+        transport, protocol = run(main())
+        assert max(len(batch) for batch in protocol.batches) == 4
+        assert protocol.requests[0][0].method == "NOTIFY"
+        assert transport.is_closing()
+        assert transport.get_extra_info("socket")._closed
+
+    def test_sendto(self):
+        async def main():
+            sock, receiver = udp_socket(), udp_socket()
+            transport, protocol = await aio.create_batched_datagram_endpoint(
+                BatchProtocol, sock
+            )
+            messages.SSDPRequest("NOTIFY").sendto(transport, receiver.getsockname())
+            assert transport.get_write_buffer_size() == 0
+            transport.abort()
+            await protocol.lost
+            transport.sendto(b"", receiver.getsockname())
+            data = receiver.recv(1024)
+            receiver.close()
+            return data
+
+        assert run(main()) == b"NOTIFY * HTTP/1.1\r\n\r\n"
+
+    def test_sendto__buffer(self):
+        async def main():
+            sock, receiver = Mock(wraps=udp_socket()), udp_socket()
+            sock.sendto.side_effect = [BlockingIOError, None, None]
+            transport, protocol = await aio.create_batched_datagram_endpoint(
+                BatchProtocol, sock
+            )
+            transport.sendto(b"first", receiver.getsockname())
+            transport.sendto(b"second", receiver.getsockname())
+            assert transport.get_write_buffer_size() == 11
+            transport.close()
+            await protocol.lost
+            receiver.close()
+            return sock.sendto.call_args_list
+
+        calls = run(main())
+        assert [call.args[0] for call in calls] == [b"first", b"first", b"second"]
+
+    def test_sendto__connected(self):
+        async def main():
+            sock, receiver = Mock(wraps=udp_socket()), udp_socket()
+            sock.connect(receiver.getsockname())
+            sock.send.side_effect = [BlockingIOError, 6, 7]
+            transport, protocol = await aio.create_batched_datagram_endpoint(
+                BatchProtocol, sock
+            )
+            transport.sendto(b"first")
+            transport.sendto(b"second")
+            transport.close()
+            await protocol.lost
+            receiver.close()
+            return sock
+
+        sock = run(main())
+        assert [call.args for call in sock.send.call_args_list] == [
+            (b"first",),
+            (b"first",),
+            (b"second",),
+        ]
+        assert not sock.sendto.called
+
+    def test_abort__closed(self):
+        async def main():
+            sock = Mock(wraps=udp_socket())
+            transport, protocol = await aio.create_batched_datagram_endpoint(Mock, sock)
+            await asyncio.sleep(0)
+            transport.close()
+            transport.abort()
+            transport.abort()
+            await asyncio.sleep(0.01)
+            return sock, protocol
+
+        sock, protocol = run(main())
+        protocol.connection_lost.assert_called_once_with(None)
+        assert sock.close.call_count == 1
+
+
+class Responder(aio.SimpleServiceDiscoveryProtocol):
+    """Answer every M-SEARCH with a number of responses, optionally delayed."""
+
+    def __init__(self, count=3, delays=None):
+        self.count = count
+        self.delays = delays
+        self.requests = []
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def request_received(self, request, addr):
+        self.requests.append(request)
+        loop = asyncio.get_running_loop()
+        for i in range(self.count):
+            response = messages.SSDPResponse(
+                200,
+                "OK",
+                headers={"ST": request.get_header("ST"), "USN": f"uuid:{i}"},
+            )
+            if self.delays is None:
+                response.sendto(self.transport, addr)
+            else:
+                loop.call_later(self.delays[i], response.sendto, self.transport, addr)
+
+
+async def responder(count=3, delays=None):
+    loop = asyncio.get_running_loop()
+    return await loop.create_datagram_endpoint(
+        lambda: Responder(count, delays), local_addr=("127.0.0.1", 0)
+    )
+
+
+class TestSearch:
+    def test_search(self):
+        async def main():
+            transport, protocol = await responder()
+            results = [
+                result
+                async for result in aio.search(
+                    "upnp:rootdevice",
+                    mx=1,
+                    addr=transport.get_extra_info("sockname"),
+                    local_addr=("127.0.0.1", 0),
+                )
+            ]
+            transport.close()
+            return results, protocol
+
+        results, protocol = run(main())
+        request = protocol.requests[0]
+        assert request.method == "M-SEARCH"
+        assert request.get_header("MX") == "1"
+        assert request.get_header("MAN") == '"ssdp:discover"'
+        assert [response.get_header("USN") for response, _ in results] == [
+            "uuid:0",
+            "uuid:1",
+            "uuid:2",
+        ]
+        assert results[0][1][0] == "127.0.0.1"
+
+    def test_search__max_results(self):
+        async def main():
+            transport, protocol = await responder(count=5)
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            results = [
+                result
+                async for result in aio.search(
+                    timeout=10,
+                    max_results=2,
+                    addr=transport.get_extra_info("sockname"),
+                    local_addr=("127.0.0.1", 0),
+                )
+            ]
+            transport.close()
+            return results, loop.time() - start
+
+        results, duration = run(main())
+        assert len(results) == 2
+        assert duration < 5
+
+    def test_search__idle_timeout(self):
+        async def main():
+            transport, protocol = await responder(count=0)
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            results = [
+                result
+                async for result in aio.search(
+                    timeout=10,
+                    idle_timeout=0.1,
+                    addr=transport.get_extra_info("sockname"),
+                    local_addr=("127.0.0.1", 0),
+                )
+            ]
+            transport.close()
+            return results, loop.time() - start
+
+        results, duration = run(main())
+        assert results == []
+        assert duration < 5
+
+    def test_search__invalid_overflow(self):
+        async def main():
+            return [result async for result in aio.search(overflow="block")]
+
+        with pytest.raises(ValueError):
+            run(main())
+
+    @pytest.mark.parametrize(
+        "overflow, expected",
+        [
+            (aio.DROP_NEWEST, ["uuid:0", "uuid:1"]),
+            (aio.DROP_OLDEST, ["uuid:1", "uuid:2"]),
+        ],
+    )
+    def test_overflow(self, overflow, expected):
+        async def main():
+            queue = asyncio.Queue(maxsize=2)
+            protocol = aio._SearchProtocol(queue, overflow)
+            for i in range(3):
+                response = messages.SSDPResponse(
+                    200, "OK", headers={"USN": f"uuid:{i}"}
+                )
+                protocol.response_received(response, ("10.0.0.1", 1900))
+            protocol.request_received(
+                messages.SSDPRequest("NOTIFY"), ("10.0.0.1", 1900)
+            )
+            assert protocol.dropped == 1
+            return [queue.get_nowait()[0].get_header("USN") for _ in range(2)]
+
+        assert run(main()) == expected
+
+    def test_search__retries(self):
+        async def main():
+            transport, protocol = await responder(count=1)
+            results = [
+                result
+                async for result in aio.search(
+                    mx=1,
+                    timeout=1,
+                    retries=3,
+                    retry_interval=0.1,
+                    addr=transport.get_extra_info("sockname"),
+                    local_addr=("127.0.0.1", 0),
+                )
+            ]
+            transport.close()
+            return results, protocol
+
+        results, protocol = run(main())
+        assert len(protocol.requests) == 4
+        assert len(results) == 4
+
+    def test_search__quiet_period(self):
+        async def main():
+            transport, protocol = await responder(count=2)
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            results = [
+                result
+                async for result in aio.search(
+                    mx=1,
+                    timeout=10,
+                    quiet_period=0.2,
+                    addr=transport.get_extra_info("sockname"),
+                    local_addr=("127.0.0.1", 0),
+                )
+            ]
+            transport.close()
+            return results, loop.time() - start
+
+        results, duration = run(main())
+        assert len(results) == 2
+        assert 1 <= duration < 5
+
+    def test_discover__delayed(self):
+        async def main():
+            # Devices may respond at any time within MX.
+            transport, protocol = await responder(count=3, delays=[0.1, 1.0, 1.8])
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            results = [
+                result
+                async for result in aio.discover(
+                    mx=2,
+                    retries=0,
+                    quiet_period=0.3,
+                    addr=transport.get_extra_info("sockname"),
+                    local_addr=("127.0.0.1", 0),
+                )
+            ]
+            transport.close()
+            return results, loop.time() - start
+
+        results, duration = run(main())
+        assert [response.get_header("USN") for response, _ in results] == [
+            "uuid:0",
+            "uuid:1",
+            "uuid:2",
+        ]
+        assert 2 <= duration < 3
+
+    def test_discover__quiet(self):
+        async def main():
+            transport, protocol = await responder(count=0)
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            results = [
+                result
+                async for result in aio.discover(
+                    mx=1,
+                    addr=transport.get_extra_info("sockname"),
+                    local_addr=("127.0.0.1", 0),
+                )
+            ]
+            transport.close()
+            return results, protocol, loop.time() - start
+
+        # Retransmitted with the default settings, but finished before the
+        # timeout of two seconds.
+        results, protocol, duration = run(main())
+        assert results == []
+        assert len(protocol.requests) == 2
+        assert 1 <= duration < 1.5
+
+    def test_search_request(self):
+        request = aio.search_request("ssdp:all", 2, ("ff02::c", 1900))
+        assert request.get_header("HOST") == "[ff02::c]:1900"
+        request = aio.search_request()
+        assert request.get_header("HOST") == "239.255.255.250:1900"
+
+    def test_discover(self):
+        async def main():
+            transport, protocol = await responder(count=2)
+            results = [
+                result
+                async for result in aio.discover(
+                    mx=1,
+                    retries=2,
+                    retry_interval=0.1,
+                    quiet_period=0.2,
+                    addr=transport.get_extra_info("sockname"),
+                    local_addr=("127.0.0.1", 0),
+                )
+            ]
+            transport.close()
+            return results, protocol
+
+        results, protocol = run(main())
+        assert len(protocol.requests) == 3
+        assert [response.get_header("USN") for response, _ in results] == [
+            "uuid:0",
+            "uuid:1",
+        ]
+
+
+class TestFilters:
+    def test_datagram_received(self):
+        protocol = aio.SimpleServiceDiscoveryProtocol(
+            filters=[filters.DuplicateFilter()]
+        )
+        protocol.request_received = Mock()
+        for _ in range(3):
+            protocol.datagram_received(
+                b"NOTIFY * HTTP/1.1\r\nUSN: uuid:1\r\n\r\n", ("10.0.0.1", 1900)
+            )
+        assert protocol.request_received.call_count == 1
+        assert protocol.filters[0].suppressed == 2
+
+
+class TestMetrics:
+    def test_datagram_received(self):
+        m = metrics.Metrics()
+        protocol = aio.SimpleServiceDiscoveryProtocol(
+            filters=[filters.TargetFilter(targets=["upnp:rootdevice"])], metrics=m
+        )
+        protocol.request_received = Mock()
+        protocol.response_received = Mock()
+        protocol.datagram_received(fixtures.request, ("10.0.0.1", 1900))
+        protocol.datagram_received(
+            b"NOTIFY * HTTP/1.1\r\nNT: upnp:rootdevice\r\n\r\n", ("10.0.0.1", 1900)
+        )
+        protocol.datagram_received(
+            b"HTTP/1.1 200 OK\r\nST: upnp:rootdevice\r\n\r\n", ("10.0.0.1", 1900)
+        )
+        protocol.datagram_received(
+            b"INVALID\r\nST: upnp:rootdevice\r\n", ("10.0.0.1", 1900)
+        )
+        assert protocol.rejected == 1
+        assert m.packets_received == 4
+        assert m.bytes_received > 0
+        assert m.packets_filtered == 1
+        assert m.parse_failures == 1
+        assert m.requests == {"NOTIFY": 1}
+        assert m.responses == {200: 1}
+        assert m.parse_seconds.count == 2
+        assert m.callback_seconds.count == 2
+
+    def test_datagram_received__headers_parsed(self):
+        protocol = aio.SimpleServiceDiscoveryProtocol(metrics=metrics.Metrics())
+        protocol.request_received = Mock()
+        protocol.datagram_received(fixtures.request, ("10.0.0.1", 1900))
+        [(request, _), _] = protocol.request_received.call_args
+        # Headers are decoded while parsing, not in the callback.
+        assert request._raw_headers is None
+
+    def test_datagram_received__unknown(self):
+        m = metrics.Metrics()
+        protocol = aio.SimpleServiceDiscoveryProtocol(metrics=m)
+        protocol.request_received = Mock()
+        protocol.response_received = Mock()
+        for i in range(100):
+            protocol.datagram_received(
+                f"X{i} * HTTP/1.1\r\n\r\n".encode(), ("10.0.0.1", 1900)
+            )
+            protocol.datagram_received(
+                f"HTTP/1.1 {1000 + i} OK\r\n\r\n".encode(), ("10.0.0.1", 1900)
+            )
+        assert m.requests == {metrics.OTHER: 100}
+        assert m.responses == {metrics.OTHER: 100}
+
+    def test_sendto(self):
+        m = metrics.Metrics()
+        protocol = aio.SimpleServiceDiscoveryProtocol(metrics=m)
+        transport = Mock()
+        protocol.connection_made(transport)
+        protocol.sendto(messages.SSDPRequest("NOTIFY"), ("10.0.0.1", 1900))
+        transport.sendto.assert_called_once_with(
+            b"NOTIFY * HTTP/1.1\r\n\r\n", ("10.0.0.1", 1900)
+        )
+        assert m.packets_sent == 1
+        assert m.bytes_sent == 21
+
+    def test_sendto_many(self):
+        m = metrics.Metrics()
+        protocol = aio.SimpleServiceDiscoveryProtocol(metrics=m)
+        protocol.connection_made(Mock())
+        requests = [messages.SSDPRequest("NOTIFY"), messages.SSDPRequest("M-SEARCH")]
+        addrs = [("10.0.0.1", 1900), ("10.0.0.2", 1900)]
+        assert run(protocol.sendto_many(requests, addrs)) == 4
+        assert m.packets_sent == 4
+        assert m.bytes_sent == 2 * (21 + 23)
+
+    def test_error_received(self):
+        m = metrics.Metrics()
+        protocol = aio.SimpleServiceDiscoveryProtocol(metrics=m)
+        with pytest.raises(OSError):
+            protocol.error_received(OSError())
+        assert m.errors_received == 1
+
+
+class TestTokenBucket:
+    def test_consume(self):
+        clock = Mock(return_value=0.0)
+        bucket = aio.TokenBucket(10, burst=2, clock=clock)
+        assert bucket.consume()
+        assert bucket.consume()
+        assert not bucket.consume()
+        clock.return_value = 0.1
+        assert bucket.consume()
+        assert not bucket.consume()
+        clock.return_value = 10
+        assert bucket.consume(2)
+        assert not bucket.consume()
+
+    def test_delay(self):
+        clock = Mock(return_value=0.0)
+        bucket = aio.TokenBucket(10, burst=1, clock=clock)
+        assert bucket.delay() == 0
+        assert bucket.delay() == pytest.approx(0.1)
+        assert bucket.delay() == pytest.approx(0.2)
+        clock.return_value = 0.2
+        assert bucket.delay() == pytest.approx(0.1)
+
+    def test_burst(self):
+        assert aio.TokenBucket(10).burst == 1
+        assert aio.TokenBucket(1000).burst == 10
+
+    def test_rate__invalid(self):
+        with pytest.raises(ValueError, match="Rate must be positive"):
+            aio.TokenBucket(0)
+
+
+class TestSendtoMany:
+    def test_sendto_many(self):
+        protocol = aio.SimpleServiceDiscoveryProtocol()
+        transport = Mock()
+        protocol.connection_made(transport)
+        requests = [aio.search_request(st) for st in ("a", "b", "c")]
+        addrs = [("239.255.255.250", 1900), ("10.0.0.1", 1900)]
+        encode = messages.SSDPRequest.__str__
+        with patch.object(
+            messages.SSDPRequest, "__str__", autospec=True, side_effect=encode
+        ) as encode:
+            run(protocol.sendto_many(requests * 2, addrs))
+        assert encode.call_count == 3
+        assert transport.sendto.call_count == 12
+        data, addr = transport.sendto.call_args_list[1].args
+        assert data == bytes(requests[1])
+        assert addr == addrs[0]
+        assert transport.sendto.call_args_list[6].args[1] == addrs[1]
+
+    def test_sendto_many__paced(self):
+        async def main():
+            protocol = aio.SimpleServiceDiscoveryProtocol()
+            protocol.connection_made(Mock())
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            await protocol.sendto_many(
+                [messages.SSDPRequest("NOTIFY")] * 50,
+                [("10.0.0.1", 1900)],
+                aio.TokenBucket(500, burst=1),
+            )
+            return loop.time() - start
+
+        assert 0.09 <= run(main()) < 1
+
+
+class Recorder(aio.SimpleServiceDiscoveryProtocol):
+    received = []
+
+    def request_received(self, request, addr):
+        self.received.append((request, addr, self.interface))
+
+
+class TestMulticastManager:
+    def test_search(self):
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.bind(("", 0))
+            port = sock.getsockname()[1]
+        Recorder.received = []
+
+        async def main():
+            manager = aio.MulticastManager(
+                Recorder, families=[socket.AF_INET], port=port
+            )
+            await manager.start()
+            endpoints = list(manager.endpoints)
+            manager.search("upnp:rootdevice", mx=1)
+            manager.sendto(
+                messages.SSDPRequest("NOTIFY", headers={"NTS": "ssdp:alive"})
+            )
+            await asyncio.sleep(0.2)
+            manager.close()
+            assert manager.endpoints == []
+            return endpoints
+
+        endpoints = run(main())
+        if not endpoints:  # pragma: no cover
+            pytest.skip("multicast is not available")
+        methods = {request.method for request, _, _ in Recorder.received}
+        assert methods == {"M-SEARCH", "NOTIFY"}
+        request = next(r for r, _, _ in Recorder.received if r.method == "M-SEARCH")
+        assert request.get_header("HOST") == f"239.255.255.250:{port}"
+        interfaces = {interface for _, _, interface in Recorder.received}
+        assert interfaces <= {protocol.interface for _, protocol, _ in endpoints}
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="requires IP_PKTINFO")
+    def test_receive(self):
+        protocols = {1: Mock(), 2: Mock()}
+        sock = Mock(family=socket.AF_INET)
+        transport = aio._InterfaceTransport(Mock(), sock, protocols[1], protocols)
+
+        def receive(index):
+            info = index.to_bytes(4, sys.byteorder) + bytes(8)
+            sock.recvmsg.return_value = (
+                b"data",
+                [(socket.IPPROTO_IP, network.IP_PKTINFO, info)],
+                0,
+                ("10.0.0.1", 1900),
+            )
+            return transport._receive()
+
+        assert receive(1) == (b"data", ("10.0.0.1", 1900))
+        # Received by the socket of another interface.
+        assert receive(2) is None
+        protocols[2].datagram_received.assert_called_once_with(
+            b"data", ("10.0.0.1", 1900)
+        )
+        assert receive(3) is None
+        assert not protocols[1].datagram_received.called
+        assert protocols[2].datagram_received.call_count == 1
+
+    def test_sendto(self):
+        manager = aio.MulticastManager(aio.SimpleServiceDiscoveryProtocol)
+        for addr in [
+            ("239.255.255.250", 1900),
+            ("239.255.255.250", 1900),
+            ("ff02::c", 1900, 0, 2),
+        ]:
+            manager.endpoints.append((Mock(), None, addr))
+        notify = messages.SSDPRequest(
+            "NOTIFY", headers={"HOST": "239.255.255.250:1900", "NTS": "ssdp:alive"}
+        )
+        manager.sendto(notify)
+        headers = [
+            messages.SSDPRequest.parse_bytes(transport.sendto.call_args.args[0]).headers
+            for transport, _, _ in manager.endpoints
+        ]
+        assert headers == [
+            [("HOST", "239.255.255.250:1900"), ("NTS", "ssdp:alive")],
+            [("HOST", "239.255.255.250:1900"), ("NTS", "ssdp:alive")],
+            [("HOST", "[ff02::c]:1900"), ("NTS", "ssdp:alive")],
+        ]
+        manager.sendto(messages.SSDPResponse(200, "OK"))
+        transport = manager.endpoints[2][0]
+        assert transport.sendto.call_args.args[0] == b"HTTP/1.1 200 OK\r\n\r\n"
+
+    def test_search_many(self):
+        async def main():
+            manager = aio.MulticastManager(aio.SimpleServiceDiscoveryProtocol)
+            transports = []
+            for addr in [("239.255.255.250", 1900), ("ff02::c", 1900, 0, 2)]:
+                protocol = aio.SimpleServiceDiscoveryProtocol()
+                transports.append(Mock())
+                protocol.connection_made(transports[-1])
+                manager.endpoints.append((transports[-1], protocol, addr))
+            sent = await manager.search_many(["a", "b"], mx=1, rate=1000)
+            return sent, transports
+
+        sent, transports = run(main())
+        assert sent == 4
+        data, addr = transports[1].sendto.call_args_list[1].args
+        request = messages.SSDPRequest.parse_bytes(data)
+        assert request.get_header("ST") == "b"
+        assert request.get_header("HOST") == "[ff02::c]:1900"
+        assert addr == ("ff02::c", 1900, 0, 2)
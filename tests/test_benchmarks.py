@@ -0,0 +1,206 @@
+"""
+Benchmarks for the hot paths of the library.
+
+Run them with pytest-benchmark::
+
+    pytest tests/test_benchmarks.py --benchmark-only
+
+or as a standalone script, that doesn't require any extra dependencies::
+
+    python -m tests.test_benchmarks
+"""
+
+import asyncio
+import itertools
+import socket
+import sys
+import time
+import timeit
+
+import pytest
+from ssdp import aio, messages
+
+from . import fixtures
+from .fixtures import run
+
+try:
+    import pytest_benchmark  # noqa: F401
+except ImportError:
+    pytest_benchmark = None
+
+#: Only tests using the ``benchmark`` fixture require pytest-benchmark.
+requires_benchmark = pytest.mark.skipif(
+    pytest_benchmark is None, reason="pytest-benchmark is not installed"
+)
+
+LOOPBACK_DATAGRAMS = 5000
+MEMORY_RESPONSES = 100_000
+
+
+class CountingProtocol(aio.SimpleServiceDiscoveryProtocol):
+    """Count messages and read a header of each, like real consumers do."""
+
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+        self.location = None
+
+    def response_received(self, response, addr):
+        # Headers are decoded lazily, on the first access.
+        self.location = response.get_header("LOCATION")
+        self.count += 1
+
+    def request_received(self, request, addr):
+        self.location = request.get_header("LOCATION")
+        self.count += 1
+
+
+def parse_message():
+    return messages.SSDPMessage.parse(fixtures.response.decode())
+
+
+def parse_response():
+    return messages.SSDPResponse.parse(fixtures.response.decode())
+
+
+def parse_bytes():
+    return messages.SSDPMessage.parse_bytes(fixtures.response).headers
+
+
+response = messages.SSDPResponse.parse_bytes(fixtures.response)
+
+
+def encode_response():
+    return bytes(response)
+
+
+def encode_response_uncached():
+    response.headers = list(response.headers)
+    return bytes(response)
+
+
+protocol = CountingProtocol()
+
+
+def datagram_received():
+    protocol.datagram_received(fixtures.response, ("10.0.0.1", 1900))
+
+
+junk = itertools.cycle(fixtures.junk())
+
+
+def datagram_received_junk():
+    """Receive malformed datagrams, which should not be slower than valid ones."""
+    protocol.datagram_received(next(junk), ("10.0.0.1", 1900))
+
+
+async def _loopback(count):
+    loop = asyncio.get_running_loop()
+    transport, protocol = await loop.create_datagram_endpoint(
+        CountingProtocol, local_addr=("127.0.0.1", 0)
+    )
+    addr = transport.get_extra_info("sockname")
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    deadline = loop.time() + 30
+    try:
+        for sent in range(count):
+            # Keep a window of datagrams in flight, to not overflow the socket buffer.
+            while sent - protocol.count >= 64 and loop.time() < deadline:
+                await asyncio.sleep(0)
+            sender.sendto(fixtures.response, addr)
+        while protocol.count < count and loop.time() < deadline:
+            await asyncio.sleep(0)
+    finally:
+        sender.close()
+        transport.close()
+    return protocol.count
+
+
+def loopback(count=LOOPBACK_DATAGRAMS):
+    """Push datagrams through a UDP socket on 127.0.0.1 and return the number received."""
+    return run(_loopback(count))
+
+
+BENCHMARKS = [
+    parse_message,
+    parse_response,
+    parse_bytes,
+    encode_response,
+    encode_response_uncached,
+    datagram_received,
+    datagram_received_junk,
+]
+
+
+@requires_benchmark
+@pytest.mark.parametrize("fn", BENCHMARKS, ids=lambda fn: fn.__name__)
+def test_benchmark(benchmark, fn):
+    benchmark(fn)
+
+
+@requires_benchmark
+def test_benchmark__loopback(benchmark):
+    received = benchmark.pedantic(loopback, rounds=3)
+    assert received > LOOPBACK_DATAGRAMS * 0.9
+
+
+def fleet(count):
+    """Yield responses of identical devices, that only differ in address and id."""
+    for i in range(count):
+        host = f"10.{i >> 16}.{i >> 8 & 255}.{i & 255}".encode()
+        yield fixtures.response.replace(b"192.168.1.239", host).replace(
+            b"0x000000000015243f", f"0x{i:016x}".encode()
+        )
+
+
+def memory(count=MEMORY_RESPONSES, intern_table=None):
+    """Return the size of the given number of stored responses in bytes."""
+    responses = []
+    for data in fleet(count):
+        response = messages.SSDPMessage.parse_bytes(data, intern_table=intern_table)
+        response.headers  # noqa: B018
+        responses.append(response)
+    # Objects shared between responses are only counted once.
+    objects = {}
+    for response in responses:
+        objects[id(response)] = response
+        objects[id(response.headers)] = response.headers
+        for header in response.headers:
+            objects[id(header)] = header
+            objects[id(header[0])] = header[0]
+            objects[id(header[1])] = header[1]
+    return sum(map(sys.getsizeof, objects.values()))
+
+
+def test_datagram_received__headers():
+    # The receive path benchmark includes decoding the headers.
+    datagram_received()
+    assert protocol.location == "yeelight://192.168.1.239:55443"
+
+
+def test_memory__intern_table():
+    count = MEMORY_RESPONSES // 10
+    assert memory(count, messages.InternTable()) < memory(count) * 0.7
+
+
+def main():  # pragma: no cover
+    for fn in BENCHMARKS:
+        number, total = timeit.Timer(fn).autorange()
+        print(f"{fn.__name__:<30} {total / number * 1e6:10.2f} µs")
+    for name, intern_table in [
+        ("memory", None),
+        ("memory_interned", messages.InternTable()),
+    ]:
+        size = memory(intern_table=intern_table)
+        print(f"{name:<30} {size / 2**20:10.2f} MiB ({MEMORY_RESPONSES} responses)")
+    start = time.perf_counter()
+    received = loopback()
+    duration = time.perf_counter() - start
+    print(
+        f"{'loopback':<30} {received / duration:10.0f} datagrams/s"
+        f" ({received}/{LOOPBACK_DATAGRAMS} received)"
+    )
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
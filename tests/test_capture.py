@@ -0,0 +1,137 @@
+import asyncio
+import io
+from unittest.mock import Mock
+
+import pytest
+from ssdp import aio, capture, messages
+
+from . import fixtures
+from .fixtures import run
+
+
+def make_capture(records):
+    file = io.BytesIO()
+    writer = capture.CaptureWriter(file)
+    for timestamp, data, addr in records:
+        writer.write(data, addr, timestamp=timestamp)
+    file.seek(0)
+    return file
+
+
+RECORDS = [
+    (1.0, fixtures.request, ("10.0.0.1", 1900)),
+    (1.05, fixtures.response, ("fe80::1", 50000)),
+    (1.1, b"INVALID", ("10.0.0.2", 1900)),
+]
+
+
+class Recorder(aio.SimpleServiceDiscoveryProtocol):
+    def __init__(self):
+        self.messages = []
+
+    def request_received(self, request, addr):
+        self.messages.append((request, addr))
+        self.sendto(messages.SSDPResponse(200, "OK"), addr)
+
+    def response_received(self, response, addr):
+        self.messages.append((response, addr))
+
+
+class TestCaptureWriter:
+    def test_write(self):
+        file = io.BytesIO()
+        writer = capture.CaptureWriter(file)
+        writer.write(fixtures.request, ("10.0.0.1", 1900))
+        writer.write(fixtures.request, ("fe80::1%eth0", 1900, 0, 2))
+        writer.flush()
+        assert writer.count == 2
+        assert file.getvalue().startswith(capture.MAGIC)
+        assert len(file.getvalue()) == 8 + 2 * (13 + len(fixtures.request)) + 4 + 16
+
+    def test_write__append(self, tmp_path):
+        path = tmp_path / "test.ssdpcap"
+        for _ in range(2):
+            with path.open("ab") as file:
+                capture.CaptureWriter(file).write(fixtures.request, ("10.0.0.1", 1900))
+        with path.open("rb") as file:
+            assert len(list(capture.read(file))) == 2
+
+
+class TestRead:
+    def test_read(self):
+        assert list(capture.read(make_capture(RECORDS))) == RECORDS
+
+    def test_read__truncated(self):
+        data = make_capture(RECORDS).getvalue()
+        assert len(list(capture.read(io.BytesIO(data[:-1])))) == 2
+        assert len(list(capture.read(io.BytesIO(data[:-20])))) == 2
+
+    def test_read__invalid(self):
+        with pytest.raises(ValueError, match="Not an SSDP capture"):
+            list(capture.read(io.BytesIO(b"GARBAGE!")))
+
+    def test_read__corrupt(self):
+        data = bytearray(make_capture(RECORDS).getvalue())
+        data[8 + 10] = 7  # host size of the first record
+        with pytest.raises(ValueError, match="Corrupt record"):
+            list(capture.read(io.BytesIO(data)))
+
+
+class TestRecordingProtocol:
+    def test_datagram_received(self):
+        async def main():
+            protocol = capture.RecordingProtocol(capture.CaptureWriter(file))
+            protocol.datagram_received(b"INVALID", ("10.0.0.1", 1900))
+            protocol.connection_lost(None)
+
+        file = io.BytesIO()
+        run(main())
+        file.seek(0)
+        [(_, data, addr)] = capture.read(file)
+        assert data == b"INVALID"
+        assert addr == ("10.0.0.1", 1900)
+
+    def test_flush_interval(self):
+        async def main():
+            protocol = capture.RecordingProtocol(writer, flush_interval=0.05)
+            for _ in range(3):
+                protocol.datagram_received(b"INVALID", ("10.0.0.1", 1900))
+            assert not writer.flush.called
+            await asyncio.sleep(0.1)
+            assert writer.flush.call_count == 1
+            assert protocol._flush_handle is None
+            # Idle recordings are not flushed.
+            await asyncio.sleep(0.1)
+            assert writer.flush.call_count == 1
+
+        writer = Mock()
+        run(main())
+
+
+class TestReplay:
+    def test_replay(self):
+        protocol = Recorder()
+        stats = run(capture.replay(make_capture(RECORDS), protocol))
+        assert [addr for _, addr in protocol.messages] == [
+            ("10.0.0.1", 1900),
+            ("fe80::1", 50000),
+        ]
+        assert protocol.rejected == 1
+        assert protocol.transport.is_closing()
+        assert stats.messages == 3
+        assert stats.size == sum(len(data) for _, data, _ in RECORDS)
+        assert stats.sent == 1
+        assert stats.messages_per_second > 0
+        assert "3 messages in" in str(stats)
+
+    def test_replay__speed(self):
+        async def main():
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            await capture.replay(make_capture(RECORDS), Recorder(), speed=2)
+            return loop.time() - start
+
+        assert 0.05 <= run(main()) < 1
+
+    def test_replay_stats(self):
+        assert capture.ReplayStats().messages_per_second == 0
@@ -0,0 +1,316 @@
+import asyncio
+import http.server
+import threading
+from unittest.mock import Mock
+
+import pytest
+from ssdp import description, messages
+
+from .fixtures import run
+
+DESCRIPTION = (
+    b'<?xml version="1.0"?>'
+    b'<root xmlns="urn:schemas-upnp-org:device-1-0">'
+    b"<device><friendlyName>Living Room</friendlyName></device>"
+    b"</root>"
+)
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append((self.path, dict(self.headers), self.client_address))
+        if self.path == "/missing.xml":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif self.path == "/bare.xml":
+            # Respond to revalidations without repeating the validators.
+            if self.headers.get("If-None-Match") == '"v2"':
+                self.send_response(304)
+            else:
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(DESCRIPTION)))
+                self.send_header("ETag", '"v2"')
+            self.end_headers()
+            if self.headers.get("If-None-Match") != '"v2"':
+                self.wfile.write(DESCRIPTION)
+        elif self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.send_header("ETag", '"v1"')
+            self.end_headers()
+        elif self.path == "/chunked.xml":
+            self.send_response(200)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i in range(0, len(DESCRIPTION), 16):
+                chunk = DESCRIPTION[i : i + 16]
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+        elif self.path == "/long-header.xml":
+            self.send_response(200)
+            self.send_header("X-Padding", "x" * 70000)
+            self.end_headers()
+        elif self.path == "/close.xml":
+            self.send_response(200)
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.wfile.write(DESCRIPTION)
+            self.close_connection = True
+        else:
+            # HTTP allows an empty reason phrase.
+            self.send_response(200, "" if self.path == "/no-reason.xml" else None)
+            self.send_header("Content-Length", str(len(DESCRIPTION)))
+            self.send_header("ETag", '"v1"')
+            self.end_headers()
+            self.wfile.write(DESCRIPTION)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield httpd
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def url(server, path="/description.xml"):
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+
+class TestDescriptionFetcher:
+    def test_fetch(self, server):
+        async def main():
+            fetcher = description.DescriptionFetcher()
+            try:
+                return await fetcher.fetch(url(server))
+            finally:
+                fetcher.close()
+
+        result = run(main())
+        assert result.location == url(server)
+        assert result.root.tag == "{urn:schemas-upnp-org:device-1-0}root"
+        assert (
+            result.root.findtext(
+                "{urn:schemas-upnp-org:device-1-0}device"
+                "/{urn:schemas-upnp-org:device-1-0}friendlyName"
+            )
+            == "Living Room"
+        )
+        assert result.etag == '"v1"'
+        assert repr(result) == f"<Description: {url(server)}>"
+
+    def test_fetch__keep_alive(self, server):
+        async def main():
+            fetcher = description.DescriptionFetcher()
+            try:
+                await fetcher.fetch(url(server, "/a.xml"))
+                await fetcher.fetch(url(server, "/b.xml"))
+            finally:
+                fetcher.close()
+
+        run(main())
+        assert [path for path, *_ in server.requests] == ["/a.xml", "/b.xml"]
+        # Both requests were sent over the same connection.
+        assert server.requests[0][2] == server.requests[1][2]
+
+    def test_fetch__connection_close(self, server):
+        async def main():
+            fetcher = description.DescriptionFetcher()
+            try:
+                first = await fetcher.fetch(url(server, "/close.xml"))
+                await fetcher.fetch(url(server, "/close.xml"), boot_id="2")
+                return first
+            finally:
+                fetcher.close()
+
+        assert run(main()).root is not None
+        assert server.requests[0][2] != server.requests[1][2]
+
+    def test_fetch__chunked(self, server):
+        async def main():
+            fetcher = description.DescriptionFetcher()
+            try:
+                return await fetcher.fetch(url(server, "/chunked.xml"))
+            finally:
+                fetcher.close()
+
+        assert run(main()).root.tag == "{urn:schemas-upnp-org:device-1-0}root"
+
+    def test_fetch__boot_id(self, server):
+        async def main():
+            fetcher = description.DescriptionFetcher()
+            try:
+                first = await fetcher.fetch(url(server), boot_id="1", config_id="1")
+                second = await fetcher.fetch(url(server), boot_id="1", config_id="1")
+                third = await fetcher.fetch(url(server), boot_id="2", config_id="1")
+                return first, second, third
+            finally:
+                fetcher.close()
+
+        first, second, third = run(main())
+        assert second is first
+        assert len(server.requests) == 2
+        # The changed boot id triggered a conditional request.
+        assert server.requests[1][1]["If-None-Match"] == '"v1"'
+        assert third is not first
+        assert third.root is first.root
+        assert third.boot_id == "2"
+
+    def test_fetch__not_modified(self, server):
+        async def main():
+            fetcher = description.DescriptionFetcher()
+            try:
+                for boot_id in ["1", "2", "3"]:
+                    result = await fetcher.fetch(url(server, "/bare.xml"), boot_id)
+                return result
+            finally:
+                fetcher.close()
+
+        result = run(main())
+        assert result.etag == '"v2"'
+        assert [headers.get("If-None-Match") for _, headers, _ in server.requests] == [
+            None,
+            '"v2"',
+            '"v2"',
+        ]
+
+    @pytest.mark.parametrize("path", ["/description.xml", "/chunked.xml", "/close.xml"])
+    def test_fetch__max_size(self, server, path):
+        async def main():
+            fetcher = description.DescriptionFetcher(max_size=len(DESCRIPTION) - 1)
+            try:
+                return await fetcher.fetch(url(server, path))
+            finally:
+                fetcher.close()
+
+        with pytest.raises(description.FetchError, match="exceeds"):
+            run(main())
+
+    def test_read_body__bounded_chunks(self):
+        async def main():
+            body = b"x" * 200_000
+            reader = asyncio.StreamReader()
+            reader.feed_data(body)
+            response = messages.SSDPResponse(
+                200, "OK", headers={"Content-Length": str(len(body))}
+            )
+            parser = Mock()
+            assert await description._read_body(reader, response, parser, 10**6)
+            return [len(call.args[0]) for call in parser.feed.call_args_list]
+
+        sizes = run(main())
+        assert sum(sizes) == 200_000
+        assert max(sizes) <= 64 * 1024
+
+    def test_fetch__coalesce(self, server):
+        async def main():
+            fetcher = description.DescriptionFetcher()
+            try:
+                return await asyncio.gather(
+                    *(fetcher.fetch(url(server)) for _ in range(5))
+                )
+            finally:
+                fetcher.close()
+
+        results = run(main())
+        assert all(result is results[0] for result in results)
+        assert len(server.requests) == 1
+
+    def test_fetch__max_entries(self, server):
+        async def main():
+            fetcher = description.DescriptionFetcher(max_entries=1)
+            try:
+                await fetcher.fetch(url(server, "/a.xml"))
+                await fetcher.fetch(url(server, "/b.xml"))
+                return fetcher
+            finally:
+                fetcher.close()
+
+        fetcher = run(main())
+        assert fetcher.get(url(server, "/a.xml")) is None
+        assert fetcher.get(url(server, "/b.xml")) is not None
+
+    def test_fetch__not_found(self, server):
+        async def main():
+            fetcher = description.DescriptionFetcher()
+            try:
+                await fetcher.fetch(url(server, "/missing.xml"))
+            finally:
+                fetcher.close()
+
+        with pytest.raises(description.FetchError, match="404"):
+            run(main())
+
+    def test_fetch__no_reason(self, server):
+        async def main():
+            fetcher = description.DescriptionFetcher()
+            try:
+                return await fetcher.fetch(url(server, "/no-reason.xml"))
+            finally:
+                fetcher.close()
+
+        assert run(main()).root is not None
+
+    def test_fetch__long_header(self, server):
+        async def main():
+            fetcher = description.DescriptionFetcher()
+            try:
+                await fetcher.fetch(url(server, "/long-header.xml"))
+            finally:
+                fetcher.close()
+
+        with pytest.raises(description.FetchError):
+            run(main())
+
+    @pytest.mark.parametrize(
+        "head", [b"HTTP/1.1\r\n\r\n", b"HTTP/1.1 OK\r\n\r\n", b"\r\n\r\n"]
+    )
+    def test_parse_response__invalid(self, head):
+        with pytest.raises(ValueError, match="Invalid status line"):
+            description._parse_response(head)
+
+    def test_fetch__unsupported_scheme(self):
+        fetcher = description.DescriptionFetcher()
+        with pytest.raises(description.FetchError, match="Unsupported scheme"):
+            run(fetcher.fetch("ftp://127.0.0.1/description.xml"))
+
+    def test_fetch__connection_refused(self, server):
+        location = url(server)
+        server.shutdown()
+        server.server_close()
+        fetcher = description.DescriptionFetcher()
+        with pytest.raises(description.FetchError):
+            run(fetcher.fetch(location))
+
+    def test_fetch_message(self, server):
+        response = messages.SSDPResponse(
+            200,
+            "OK",
+            headers=[
+                ("LOCATION", url(server)),
+                ("BOOTID.UPNP.ORG", "7"),
+                ("CONFIGID.UPNP.ORG", "1"),
+            ],
+        )
+
+        async def main():
+            fetcher = description.DescriptionFetcher()
+            try:
+                return await fetcher.fetch_message(response)
+            finally:
+                fetcher.close()
+
+        result = run(main())
+        assert result.boot_id == "7"
+        assert result.config_id == "1"
@@ -0,0 +1,83 @@
+from ssdp import filters
+
+from . import fixtures
+
+ADDR = "10.0.0.1", 1900
+
+
+def notify(usn, nts=b"ssdp:alive"):
+    return b"NOTIFY * HTTP/1.1\r\nNTS: " + nts + b"\r\nUSN: " + usn + b"\r\n\r\n"
+
+
+class TestDuplicateFilter:
+    def test_call(self):
+        drop = filters.DuplicateFilter(clock=fixtures.Clock())
+        assert not drop(notify(b"uuid:1"), ADDR)
+        assert drop(notify(b"uuid:1"), ADDR)
+        assert drop(notify(b"uuid:1"), ("10.0.0.1", 50000))
+        assert not drop(notify(b"uuid:1"), ("10.0.0.2", 1900))
+        assert not drop(notify(b"uuid:1", b"ssdp:byebye"), ADDR)
+        assert not drop(notify(b"uuid:2"), ADDR)
+        assert drop.passed == 4
+        assert drop.suppressed == 2
+
+    def test_call__no_usn(self):
+        drop = filters.DuplicateFilter(clock=fixtures.Clock())
+        assert not drop(fixtures.request, ADDR)
+        assert not drop(fixtures.request, ADDR)
+        assert len(drop) == 0
+
+    def test_window(self):
+        clock = fixtures.Clock()
+        drop = filters.DuplicateFilter(window=10, clock=clock)
+        assert not drop(notify(b"uuid:1"), ADDR)
+        clock.now = 5
+        assert not drop(notify(b"uuid:2"), ADDR)
+        assert drop(notify(b"uuid:1"), ADDR)
+        clock.now = 10
+        assert not drop(notify(b"uuid:1"), ADDR)
+        assert drop(notify(b"uuid:2"), ADDR)
+        assert len(drop) == 2
+
+    def test_max_entries(self):
+        drop = filters.DuplicateFilter(max_entries=2, clock=fixtures.Clock())
+        for usn in [b"uuid:1", b"uuid:2", b"uuid:3"]:
+            assert not drop(notify(usn), ADDR)
+        assert len(drop) == 2
+        assert not drop(notify(b"uuid:1"), ADDR)
+
+
+class TestTargetFilter:
+    def test_call(self):
+        drop = filters.TargetFilter(
+            targets=["upnp:rootdevice"],
+            prefixes=["urn:schemas-upnp-org:device:MediaRenderer:"],
+        )
+        assert not drop(b"HTTP/1.1 200 OK\r\nST: upnp:rootdevice\r\n\r\n", ADDR)
+        assert not drop(
+            b"NOTIFY * HTTP/1.1\r\nnt: urn:schemas-upnp-org:device:MediaRenderer:1\r\n",
+            ADDR,
+        )
+        assert drop(b"HTTP/1.1 200 OK\r\nST: upnp:rootdevice:x\r\n\r\n", ADDR)
+        assert drop(b"M-SEARCH * HTTP/1.1\r\nST: ssdp:all\r\n\r\n", ADDR)
+        assert drop(fixtures.request, ADDR)
+        assert drop.passed == 2
+        assert drop.rejected == 3
+
+    def test_call__nts(self):
+        drop = filters.TargetFilter(targets=["upnp:rootdevice"])
+        assert drop(b"NOTIFY * HTTP/1.1\r\nNTS: ssdp:alive\r\n\r\n", ADDR)
+        assert not drop(
+            b"NOTIFY * HTTP/1.1\r\nNTS: ssdp:alive\r\nNT: upnp:rootdevice\r\n\r\n",
+            ADDR,
+        )
+
+
+class TestSourceFilter:
+    def test_call(self):
+        drop = filters.SourceFilter(["10.0.0.1"])
+        assert not drop(fixtures.response, ADDR)
+        assert not drop(fixtures.response, ("10.0.0.1", 50000))
+        assert drop(fixtures.response, ("10.0.0.2", 1900))
+        assert drop.passed == 2
+        assert drop.rejected == 1
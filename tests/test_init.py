@@ -0,0 +1,57 @@
+import subprocess
+import sys
+
+import pytest
+import ssdp
+from ssdp import messages
+
+#: Budget for ``import ssdp`` in microseconds, as reported by ``-X importtime``.
+IMPORT_TIME_BUDGET = 20_000
+
+
+def import_times(module):
+    """Return the cumulative import time in microseconds per module."""
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    times = {}
+    # Lines look like: "import time:  self [us] | cumulative | imported package"
+    for line in result.stderr.splitlines()[1:]:
+        _, cumulative, name = line.partition(":")[2].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_version():
+    assert ssdp.__version__
+    assert isinstance(ssdp.VERSION, tuple)
+
+
+def test_moved():
+    with pytest.deprecated_call():
+        request = ssdp.SSDPRequest("NOTIFY")
+    assert isinstance(request, messages.SSDPRequest)
+    assert ssdp.SSDPRequest is ssdp.SSDPRequest
+    assert "SimpleServiceDiscoveryProtocol" in dir(ssdp)
+
+
+def test_getattr__missing():
+    with pytest.raises(AttributeError, match="has no attribute 'missing'"):
+        ssdp.missing  # noqa: B018
+
+
+def test_import_time():
+    times = import_times("ssdp")
+    assert "asyncio" not in times
+    assert "ssdp.aio" not in times
+    assert times["ssdp"] < IMPORT_TIME_BUDGET
+
+
+@pytest.mark.cli
+def test_import_time__cli():
+    pytest.importorskip("ssdp.__main__")
+    times = import_times("ssdp.__main__")
+    assert not any(name.startswith("pygments") for name in times)
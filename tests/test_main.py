@@ -1,8 +1,15 @@
+import asyncio
 import importlib
+import io
+import json
 import os
 import sys
 
 import pytest
+from ssdp import capture, messages
+
+from . import fixtures
+from .fixtures import run
 
 
 @pytest.mark.cli
@@ -50,3 +57,118 @@ def test_import_warning():
         "The SSDP CLI requires needs to be installed via `pip install ssdp[cli]`."
         in str(e.value)
     )
+
+
+@pytest.mark.cli
+class TestMonitor:
+    def test_help(self):
+        main = pytest.importorskip("ssdp.__main__")
+        testing = pytest.importorskip("click.testing")
+        results = testing.CliRunner().invoke(main.ssdp, ["monitor", "--help"])
+        assert results.exit_code == 0
+        assert "--format [jsonl|plain|pretty]" in results.output
+
+    def test_call(self):
+        main = pytest.importorskip("ssdp.__main__")
+        testing = pytest.importorskip("click.testing")
+        results = testing.CliRunner().invoke(
+            main.ssdp,
+            [
+                "monitor",
+                "--bind",
+                "127.0.0.1",
+                "--port",
+                "0",
+                "--duration",
+                "0.2",
+                "--summary-interval",
+                "0.1",
+            ],
+        )
+        assert results.exit_code == 0, results.output
+        assert "msg/s | targets:" in results.output
+
+    def test_protocol(self):
+        main = pytest.importorskip("ssdp.__main__")
+        stream = io.StringIO()
+        protocol = main.MonitorProtocol(main.format_jsonl, stream, max_buffer=2)
+
+        async def receive():
+            protocol.datagram_received(fixtures.response, ("10.0.0.1", 1900))
+            assert stream.getvalue() == ""
+            protocol.datagram_received(fixtures.request, ("10.0.0.2", 1900))
+
+        run(receive())
+        records = [json.loads(line) for line in stream.getvalue().splitlines()]
+        assert records[0]["status_code"] == 200
+        assert records[0]["host"] == "10.0.0.1"
+        assert records[1]["method"] == "NOTIFY"
+        assert ["NTS", "ssdp:alive"] in records[1]["headers"]
+        summary = protocol.summary(2)
+        assert "1.0 msg/s" in summary
+        assert "10.0.0.1 0.5/s" in summary
+        assert not protocol.sources
+
+    def test_protocol__flush_interval(self):
+        main = pytest.importorskip("ssdp.__main__")
+        stream = io.StringIO()
+        protocol = main.MonitorProtocol(main.format_plain, stream, flush_interval=0.01)
+
+        async def receive():
+            protocol.datagram_received(fixtures.response, ("::1", 1900))
+            assert stream.getvalue() == ""
+            await asyncio.sleep(0.05)
+
+        run(receive())
+        assert stream.getvalue().startswith("[::1]:1900 - - [")
+
+    def test_format_pretty(self):
+        main = pytest.importorskip("ssdp.__main__")
+        msg = messages.SSDPResponse.parse_bytes(fixtures.response)
+        output = main.format_pretty(msg, ("10.0.0.1", 1900), 0, main.Timestamp())
+        assert "\x1b[" in output
+
+
+@pytest.mark.cli
+class TestRecordReplay:
+    def test_record(self, tmp_path):
+        main = pytest.importorskip("ssdp.__main__")
+        testing = pytest.importorskip("click.testing")
+        path = tmp_path / "test.ssdpcap"
+        results = testing.CliRunner().invoke(
+            main.ssdp,
+            ["record", str(path), "--bind", "127.0.0.1", "--port", "0"]
+            + ["--duration", "0.1"],
+        )
+        assert results.exit_code == 0, results.output
+        assert "Recorded 0 datagrams" in results.output
+        assert path.read_bytes() == capture.MAGIC
+
+    def test_replay(self, tmp_path):
+        main = pytest.importorskip("ssdp.__main__")
+        testing = pytest.importorskip("click.testing")
+        path = tmp_path / "test.ssdpcap"
+        with path.open("wb") as file:
+            writer = capture.CaptureWriter(file)
+            writer.write(fixtures.request, ("10.0.0.1", 1900))
+            writer.write(b"INVALID", ("10.0.0.1", 1900))
+        results = testing.CliRunner().invoke(main.ssdp, ["replay", str(path)])
+        assert results.exit_code == 0, results.output
+        assert "Replayed 2 messages in" in results.output
+        assert "1 rejected" in results.output
+
+    def test_replay__protocol(self, tmp_path):
+        main = pytest.importorskip("ssdp.__main__")
+        testing = pytest.importorskip("click.testing")
+        path = tmp_path / "test.ssdpcap"
+        path.write_bytes(capture.MAGIC)
+        results = testing.CliRunner().invoke(
+            main.ssdp,
+            ["replay", str(path), "--protocol", "ssdp.__main__:DiscardProtocol"],
+        )
+        assert results.exit_code == 0, results.output
+        results = testing.CliRunner().invoke(
+            main.ssdp, ["replay", str(path), "--protocol", "ssdp:Missing"]
+        )
+        assert results.exit_code == 2
+        assert "Cannot import ssdp:Missing" in results.output
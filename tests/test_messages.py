@@ -1,8 +1,19 @@
+import pickle
 from unittest.mock import Mock
 
 import pytest
 from ssdp import network
-from ssdp.messages import SSDPMessage, SSDPRequest, SSDPResponse
+from ssdp.messages import (
+    DEFAULT_LIMITS,
+    Headers,
+    InternTable,
+    InvalidMessage,
+    Limits,
+    SSDPMessage,
+    SSDPRequest,
+    SSDPResponse,
+    peek_header,
+)
 
 from . import fixtures
 
@@ -31,6 +42,31 @@ class TestSSDPMessage:
         headers = SSDPMessage.parse_headers("Cache-Control: max-age=3600")
         assert headers == [("Cache-Control", "max-age=3600")]
 
+    def test_parse_headers__continuation(self):
+        headers = SSDPMessage.parse_headers(
+            "Server: Linux\r\n  UPnP/1.0\r\n\tquick_ssdp/1.0\r\nExt:"
+        )
+        assert headers == [
+            ("Server", "Linux\r\n  UPnP/1.0\r\n\tquick_ssdp/1.0"),
+            ("Ext", ""),
+        ]
+
+    def test_parse_headers__body(self):
+        headers = SSDPMessage.parse_headers("Ext:\r\n\r\nST: ssdp:all")
+        assert headers == [("Ext", "")]
+
+    def test_parse_headers__invalid_line(self):
+        headers = SSDPMessage.parse_headers("Ext:\r\nnot a header\r\nST: ssdp:all")
+        assert headers == [("Ext", "")]
+
+    def test_parse_headers__email_parser_compat(self):
+        email_parser = pytest.importorskip("email.parser")
+        for msg in [fixtures.request, fixtures.response]:
+            headers = "\r\n".join(msg.decode().splitlines()[1:])
+            assert SSDPMessage.parse_headers(headers) == list(
+                email_parser.Parser().parsestr(headers).items()
+            )
+
     def test_str(self):
         with pytest.raises(NotImplementedError):
             str(SSDPMessage())
@@ -51,6 +87,13 @@ class TestSSDPResponse:
         response = SSDPResponse.parse(fixtures.response.decode())
         assert response.status_code == 200
         assert response.reason == "OK"
+        assert response.headers[0] == ("Cache-Control", "max-age=3600")
+        assert ("Ext", "") in response.headers
+
+    def test_parse__reason_phrase(self):
+        response = SSDPResponse.parse("HTTP/1.1 404 Not Found\r\n\r\n")
+        assert response.status_code == 404
+        assert response.reason == "Not Found"
 
     def test_str(self):
         response = SSDPResponse(
@@ -88,3 +131,387 @@ class TestSSDPRequest:
         addr = network.MULTICAST_ADDRESS_IPV4, network.PORT
         SSDPRequest("NOTIFY", "*").sendto(transport, addr)
         transport.sendto.assert_called_once_with(b"NOTIFY * HTTP/1.1\r\n\r\n", addr)
+
+
+class TestParseBytes:
+    def test_parse_bytes(self):
+        response = SSDPMessage.parse_bytes(fixtures.response)
+        assert isinstance(response, SSDPResponse)
+        assert response.status_code == 200
+        assert (
+            response.headers == SSDPResponse.parse(fixtures.response.decode()).headers
+        )
+
+        request = SSDPMessage.parse_bytes(fixtures.request)
+        assert isinstance(request, SSDPRequest)
+        assert request.method == "NOTIFY"
+        assert request.headers == SSDPRequest.parse(fixtures.request.decode()).headers
+
+    def test_parse_bytes__memoryview(self):
+        request = SSDPRequest.parse_bytes(memoryview(fixtures.request))
+        assert request.method == "NOTIFY"
+        assert request.headers[0] == ("Host", "239.255.255.250:1982")
+
+    def test_parse_bytes__lazy(self):
+        response = SSDPResponse.parse_bytes(fixtures.response)
+        assert response._headers is None
+        assert response.headers[0] == ("Cache-Control", "max-age=3600")
+        assert response._raw_headers is None
+
+    def test_parse_bytes__mutable_buffer(self):
+        buffer = bytearray(fixtures.request)
+        request = SSDPRequest.parse_bytes(memoryview(buffer))
+        buffer[:] = b"\0" * len(buffer)
+        assert request.headers[0] == ("Host", "239.255.255.250:1982")
+
+    def test_parse_bytes__no_headers(self):
+        response = SSDPResponse.parse_bytes(b"HTTP/1.1 200 OK")
+        assert response.reason == "OK"
+        assert response.headers == []
+
+    def test_headers_setter(self):
+        response = SSDPResponse.parse_bytes(fixtures.response)
+        response.headers = [("ST", "ssdp:all")]
+        assert response.headers == [("ST", "ssdp:all")]
+
+
+class TestLimits:
+    def test_check(self):
+        DEFAULT_LIMITS.check(fixtures.request)
+        DEFAULT_LIMITS.check(memoryview(fixtures.response))
+
+    def test_check__max_size(self):
+        with pytest.raises(InvalidMessage, match="exceeds 100 bytes"):
+            Limits(max_size=100).check(fixtures.response)
+
+    def test_check__max_headers(self):
+        with pytest.raises(InvalidMessage, match="exceeds 5 headers"):
+            Limits(max_headers=5).check(memoryview(fixtures.response))
+        with pytest.raises(InvalidMessage, match="exceeds 5 headers"):
+            Limits(max_headers=5).check(fixtures.response.replace(b"\r\n", b"\r"))
+
+    def test_check__max_line_length(self):
+        with pytest.raises(InvalidMessage, match="Line exceeds 100 bytes"):
+            Limits(max_line_length=100).check(fixtures.response)
+        Limits(max_line_length=150).check(fixtures.response)
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            b"",
+            b"\r\n",
+            b"NOTIFY *\r\n",
+            b"NOTIFY * HTTP/1.1 x\r\n",
+            b"HTTP/1.1\r\n",
+            b"HTTP/1.1 OK\r\n",
+            b"HTTP/1.1 abc OK\r\n",
+            b"NOTIFY \xff HTTP/1.1\r\n",
+        ],
+    )
+    def test_parse_bytes__invalid(self, data):
+        with pytest.raises(InvalidMessage):
+            SSDPMessage.parse_bytes(data)
+
+    def test_parse_bytes__lenient(self):
+        request = SSDPMessage.parse_bytes(
+            b"NOTIFY * HTTP/9\r\nNT: \xff\r\ninvalid\r\nUSN: uuid:1\r\n\r\n",
+            DEFAULT_LIMITS,
+        )
+        assert request.headers == [("NT", "\ufffd")]
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            b"NOTIFY * HTTP/9\r\n\r\n",
+            b"NOTIFY * HTTP/1.1\r\nNT: \xff\r\n\r\n",
+            b"NOTIFY * HTTP/1.1\r\ninvalid\r\n\r\n",
+            b"NOTIFY * HTTP/1.1\r\n continued\r\n\r\n",
+            b"HTTP/1.1 200 OK\r\n" + b"X: y\fX: y\r\n" * 4,
+        ],
+    )
+    def test_parse_bytes__strict(self, data):
+        with pytest.raises(InvalidMessage):
+            SSDPMessage.parse_bytes(data, Limits(max_headers=5, strict=True))
+
+    def test_parse_bytes__strict_valid(self):
+        response = SSDPMessage.parse_bytes(fixtures.response, Limits(strict=True))
+        assert response._raw_headers is None
+        assert response.headers[0] == ("Cache-Control", "max-age=3600")
+
+    @pytest.mark.parametrize("strict", [False, True])
+    def test_parse_bytes__junk(self, strict):
+        limits = Limits(strict=strict)
+        rejected = 0
+        for data in fixtures.junk():
+            try:
+                message = SSDPMessage.parse_bytes(data, limits)
+            except InvalidMessage:
+                rejected += 1
+            else:
+                assert len(message.headers) <= limits.max_headers
+                str(message)
+        assert rejected > 0
+
+
+class TestInternTable:
+    def test_header(self):
+        table = InternTable()
+        a = table.header("".join(["Cache-", "Control"]), "".join(["max-age=", "60"]))
+        b = table.header("".join(["Cache-", "Control"]), "".join(["max-age=", "60"]))
+        assert a == ("Cache-Control", "max-age=60")
+        assert a is b
+        assert len(table) == 2
+
+    def test_header__unique_value(self):
+        table = InternTable()
+        a = table.header("".join(["U", "SN"]), "".join(["uuid:", "1"]))
+        b = table.header("".join(["U", "SN"]), "".join(["uuid:", "1"]))
+        assert a == b
+        assert a is not b
+        assert a[0] is b[0]
+
+    def test_header__max_length(self):
+        table = InternTable(max_length=3)
+        assert table.header("ST", "".join(["ab", "cd"])) is not table.header(
+            "ST", "".join(["ab", "cd"])
+        )
+
+    def test_header__values(self):
+        table = InternTable(values={"Model"})
+        assert table.header("MODEL", "".join(["co", "lor"])) is table.header(
+            "MODEL", "".join(["co", "lor"])
+        )
+
+    def test_header__bounded(self):
+        table = InternTable(max_size=10)
+        for i in range(1000):
+            table.header(f"X-{i}", "")
+            table.header("ST", f"urn:{i}")
+        assert len(table) <= 20
+        table.clear()
+        assert len(table) == 0
+
+    def test_parse_bytes(self):
+        table = InternTable()
+        a = SSDPMessage.parse_bytes(fixtures.response, intern_table=table)
+        b = SSDPMessage.parse_bytes(fixtures.response, intern_table=table)
+        assert a._raw_headers is None
+        assert a.headers == SSDPMessage.parse_bytes(fixtures.response).headers
+        assert a.headers[0] is b.headers[0]  # Cache-Control
+        assert a.headers[3] is not b.headers[3]  # Location
+        assert a.headers[4] is b.headers[4]  # Server
+        assert all(x[0] is y[0] for x, y in zip(a.headers, b.headers, strict=True))
+
+    def test_parse_bytes__strict(self):
+        table = InternTable()
+        a, b = (
+            SSDPMessage.parse_bytes(fixtures.request, Limits(strict=True), table)
+            for _ in range(2)
+        )
+        assert a.headers[1] is b.headers[1]  # Cache-Control
+
+
+class TestHeaders:
+    def test_get(self):
+        headers = Headers([("Location", "http://10.0.0.1/"), ("LOCATION", "other")])
+        assert headers.get("location") == "http://10.0.0.1/"
+        assert headers.get("LOCATION") == "http://10.0.0.1/"
+        assert headers.get("ST") is None
+        assert headers.get("ST", "ssdp:all") == "ssdp:all"
+
+    def test_get__invalidate(self):
+        headers = Headers([("ST", "ssdp:all")])
+        assert headers.get("st") == "ssdp:all"
+        headers[0] = ("ST", "upnp:rootdevice")
+        assert headers.get("st") == "upnp:rootdevice"
+        headers.append(("USN", "uuid:1"))
+        assert headers.get("usn") == "uuid:1"
+        headers.sort(key=lambda header: header[0], reverse=True)
+        del headers[0]
+        assert headers.get("usn") is None
+        headers += [("USN", "uuid:2")]
+        assert isinstance(headers, Headers)
+        assert headers.get("usn") == "uuid:2"
+
+    def test_list(self):
+        assert Headers([("ST", "ssdp:all")]) == [("ST", "ssdp:all")]
+
+
+class TestSlots:
+    @pytest.mark.parametrize(
+        "msg",
+        [
+            SSDPMessage(),
+            SSDPResponse(200, "OK"),
+            SSDPRequest("NOTIFY"),
+        ],
+    )
+    def test_no_dict(self, msg):
+        assert not hasattr(msg, "__dict__")
+
+    def test_get_header(self):
+        response = SSDPResponse.parse_bytes(fixtures.response)
+        assert response.get_header("location") == "yeelight://192.168.1.239:55443"
+        assert response.get_header("USN") is None
+        response.headers.append(("USN", "uuid:1"))
+        assert response.get_header("usn") == "uuid:1"
+
+
+class TestAccessors:
+    def response(self, **headers):
+        return SSDPResponse(
+            200,
+            "OK",
+            headers={
+                "CACHE-CONTROL": 'no-cache="Ext", max-age = 1800',
+                "LOCATION": "http://[fe80::1]:49152/description.xml",
+                "USN": "uuid:2fac1234-31f8::urn:schemas-upnp-org:device:Basic:1",
+                "BOOTID.UPNP.ORG": "7",
+                "CONFIGID.UPNP.ORG": "42",
+                **headers,
+            },
+        )
+
+    def test_accessors(self):
+        response = self.response()
+        assert response.max_age == 1800
+        assert response.location.hostname == "fe80::1"
+        assert response.location.port == 49152
+        assert response.usn_uuid == "2fac1234-31f8"
+        assert response.usn_type == "urn:schemas-upnp-org:device:Basic:1"
+        assert response.boot_id == 7
+        assert response.config_id == 42
+
+    def test_accessors__missing(self):
+        msg = SSDPRequest("NOTIFY")
+        assert msg.max_age is None
+        assert msg.location is None
+        assert msg.usn_uuid is None
+        assert msg.usn_type is None
+        assert msg.boot_id is None
+        assert msg.config_id is None
+
+    def test_accessors__invalid(self):
+        response = self.response(
+            **{
+                "CACHE-CONTROL": "no-cache",
+                "LOCATION": "http://[invalid/",
+                "USN": "uuid:1",
+                "BOOTID.UPNP.ORG": "x",
+            }
+        )
+        assert response.max_age is None
+        assert response.location is None
+        assert response.usn_uuid == "1"
+        assert response.usn_type is None
+        assert response.boot_id is None
+
+    def test_accessors__cached(self):
+        response = SSDPResponse.parse_bytes(fixtures.response)
+        assert response._accessors is None
+        assert response.location is response.location
+        assert response.max_age == 3600
+        assert set(response._accessors[2]) == {"location", "max_age"}
+
+    def test_accessors__invalidated(self):
+        response = self.response()
+        assert response.max_age == 1800
+        response.headers[0] = ("CACHE-CONTROL", "max-age=60")
+        assert response.max_age == 60
+        response.headers = [("CACHE-CONTROL", "max-age=10")]
+        assert response.max_age == 10
+
+    def test_accessors__pickle(self):
+        response = self.response()
+        assert response.boot_id == 7
+        response = pickle.loads(pickle.dumps(response))  # noqa: S301
+        assert response._accessors is None
+        assert response.boot_id == 7
+
+
+class TestBytesCache:
+    def test_cached(self):
+        response = SSDPResponse(200, "OK", headers=[("ST", "ssdp:all")])
+        assert bytes(response) is bytes(response)
+
+    def test_invalidate__headers(self):
+        response = SSDPResponse(200, "OK", headers=[("ST", "ssdp:all")])
+        assert bytes(response) == b"HTTP/1.1 200 OK\r\nST: ssdp:all\r\n\r\n"
+        response.headers[0] = ("ST", "upnp:rootdevice")
+        assert bytes(response) == b"HTTP/1.1 200 OK\r\nST: upnp:rootdevice\r\n\r\n"
+        response.headers = [("EXT", "")]
+        assert bytes(response) == b"HTTP/1.1 200 OK\r\nEXT: \r\n\r\n"
+
+    def test_invalidate__start_line(self):
+        request = SSDPRequest("NOTIFY")
+        assert bytes(request) == b"NOTIFY * HTTP/1.1\r\n\r\n"
+        request.method = "M-SEARCH"
+        assert bytes(request) == b"M-SEARCH * HTTP/1.1\r\n\r\n"
+
+
+class TestMessageTemplate:
+    def test_render(self):
+        response = SSDPResponse(
+            200,
+            "OK",
+            headers=[
+                ("CACHE-CONTROL", "max-age=1800"),
+                ("DATE", ""),
+                ("EXT", ""),
+                ("ST", "upnp:rootdevice"),
+            ],
+        )
+        template = response.template("date", "ST", "BOOTID.UPNP.ORG")
+        response.headers[1] = ("DATE", "Sun, 11 Jun 2023 12:07:09 GMT")
+        response.headers[3] = ("ST", "ssdp:all")
+        response.headers.append(("BOOTID.UPNP.ORG", "1"))
+        assert template.render(
+            DATE="Sun, 11 Jun 2023 12:07:09 GMT",
+            st="ssdp:all",
+            **{"bootid.upnp.org": "1"},
+        ) == bytes(response)
+
+    def test_render__defaults(self):
+        request = SSDPRequest("NOTIFY", headers={"NT": "upnp:rootdevice"})
+        assert request.template("NT").render() == bytes(request)
+        assert request.template().render() == bytes(request)
+
+    def test_render__no_start_line(self):
+        with pytest.raises(TypeError):
+            SSDPMessage().template("DATE")
+
+    def test_sendto(self):
+        transport = Mock()
+        addr = network.MULTICAST_ADDRESS_IPV4, network.PORT
+        template = SSDPRequest("NOTIFY", headers={"NT": ""}).template("NT")
+        template.sendto(transport, addr, nt="upnp:rootdevice")
+        transport.sendto.assert_called_once_with(
+            b"NOTIFY * HTTP/1.1\r\nNT: upnp:rootdevice\r\n\r\n", addr
+        )
+
+
+class TestPeekHeader:
+    def test_peek_header(self):
+        assert peek_header(fixtures.request, b"nts") == b"ssdp:alive"
+        assert peek_header(fixtures.response, b"LOCATION") == (
+            b"yeelight://192.168.1.239:55443"
+        )
+        assert peek_header(memoryview(fixtures.response), b"Ext") == b""
+        assert peek_header(fixtures.response, b"USN") is None
+
+    def test_peek_header__prefix(self):
+        assert peek_header(b"NOTIFY * HTTP/1.1\r\nNTS: ssdp:alive", b"NT") is None
+
+
+class TestPickle:
+    def test_pickle(self):
+        pickle = pytest.importorskip("pickle")
+        response = SSDPResponse.parse_bytes(fixtures.response)
+        copy = pickle.loads(pickle.dumps(response))
+        assert isinstance(copy, SSDPResponse)
+        assert copy.status_code == 200
+        assert copy.get_header("location") == "yeelight://192.168.1.239:55443"
+        assert bytes(copy) == bytes(response)
+
+        request = pickle.loads(pickle.dumps(SSDPRequest("NOTIFY", headers={"NT": "x"})))
+        assert bytes(request) == b"NOTIFY * HTTP/1.1\r\nNT: x\r\n\r\n"
@@ -0,0 +1,76 @@
+import json
+from unittest.mock import Mock
+
+from ssdp import metrics
+
+
+class TestHistogram:
+    def test_observe(self):
+        histogram = metrics.Histogram(buckets=[0.1, 1])
+        for value in [0.05, 0.1, 0.5, 2]:
+            histogram.observe(value)
+        assert histogram.snapshot() == {
+            "buckets": {"0.1": 2, "1": 3, "+Inf": 4},
+            "sum": 2.65,
+            "count": 4,
+        }
+
+
+class TestMetrics:
+    def test_snapshot(self):
+        m = metrics.Metrics(buckets=[1])
+        m.packets_received += 2
+        m.requests["NOTIFY"] += 1
+        m.responses[200] += 1
+        m.parse_seconds.observe(0.5)
+        snapshot = m.snapshot()
+        assert snapshot["packets_received"] == 2
+        assert snapshot["packets_sent"] == 0
+        assert snapshot["requests"] == {"NOTIFY": 1}
+        assert snapshot["responses"] == {"200": 1}
+        assert snapshot["parse_seconds"] == {
+            "buckets": {"1": 1, "+Inf": 1},
+            "sum": 0.5,
+            "count": 1,
+        }
+        assert json.loads(m.to_json()) == snapshot
+
+    def test_export(self):
+        exporter = Mock()
+        m = metrics.Metrics(exporters=[exporter])
+        m.export()
+        exporter.assert_called_once_with(m.snapshot())
+
+    def test_to_prometheus(self):
+        m = metrics.Metrics(buckets=[1])
+        m.packets_received += 2
+        m.requests["NOTIFY"] += 1
+        m.callback_seconds.observe(0.5)
+        text = m.to_prometheus()
+        assert "# TYPE ssdp_packets_received_total counter\n" in text
+        assert "ssdp_packets_received_total 2\n" in text
+        assert 'ssdp_requests_total{method="NOTIFY"} 1\n' in text
+        assert "# TYPE ssdp_callback_seconds histogram\n" in text
+        assert 'ssdp_callback_seconds_bucket{le="+Inf"} 1\n' in text
+        assert "ssdp_callback_seconds_sum 0.5\n" in text
+        assert text.endswith("ssdp_callback_seconds_count 1\n")
+
+    def test_count_request(self):
+        m = metrics.Metrics()
+        for i in range(1000):
+            m.count_request(f"X{i}")
+        m.count_request("NOTIFY")
+        m.count_request("M-SEARCH")
+        assert m.requests == {"NOTIFY": 1, "M-SEARCH": 1, metrics.OTHER: 1000}
+
+    def test_count_response(self):
+        m = metrics.Metrics()
+        for status_code in [200, 200, 404, 0, 99, 600, 10**9]:
+            m.count_response(status_code)
+        assert m.responses == {200: 2, 404: 1, metrics.OTHER: 4}
+
+    def test_to_prometheus__escape(self):
+        m = metrics.Metrics()
+        m.requests['X0"}\\\n'] += 1
+        text = m.to_prometheus()
+        assert 'ssdp_requests_total{method="X0\\"}\\\\\\n"} 1\n' in text
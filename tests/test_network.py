@@ -18,3 +18,82 @@ def test_get_best_family__win32():
         socket.AF_INET,
         ("0.0.0.0", 1900, 0, 0),  # noqa S104
     )
+
+
+def test_create_socket():
+    with network.create_socket(host="127.0.0.1", port=0) as sock:
+        assert sock.type == socket.SOCK_DGRAM
+        assert sock.getsockname()[0] == "127.0.0.1"
+
+
+def test_create_socket__group():
+    try:
+        sock = network.create_socket(port=0, group=network.MULTICAST_ADDRESS_IPV4)
+    except OSError:  # pragma: no cover
+        pytest.skip("multicast is not available")
+    sock.close()
+
+
+def test_create_socket__error():
+    with pytest.raises(OSError):
+        network.create_socket(host="127.0.0.1", port=0, group="invalid")
+
+
+@pytest.mark.skipif(
+    sys.platform != "linux", reason="addresses are only available on Linux"
+)
+def test_get_interfaces():
+    interfaces = network.get_interfaces()
+    assert network.get_interfaces() is interfaces
+    loopback = next(
+        interface for interface in interfaces if interface.ipv4 == ("127.0.0.1",)
+    )
+    assert loopback.index > 0
+    assert isinstance(loopback.ipv6, tuple)
+
+
+def multicast_interfaces():
+    return [
+        interface
+        for interface in network.get_interfaces()
+        if interface.ipv4 or interface.ipv6
+    ]
+
+
+@pytest.mark.parametrize("family", [socket.AF_INET, socket.AF_INET6])
+def test_create_multicast_socket(family):
+    for interface in multicast_interfaces():
+        try:
+            sock = network.create_multicast_socket(family, interface, port=0)
+        except (OSError, IndexError):
+            continue
+        with sock:
+            assert sock.family == family
+            return
+    pytest.skip("multicast is not available")  # pragma: no cover
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="requires IP_PKTINFO")
+def test_parse_packet_info():
+    index = (3).to_bytes(4, sys.byteorder)
+    ipv4 = index + bytes(4) + socket.inet_aton("239.255.255.250")
+    ipv6 = socket.inet_pton(socket.AF_INET6, "fe80::1") + index
+    assert network.parse_packet_info(
+        [(socket.IPPROTO_IP, network.IP_PKTINFO, ipv4)]
+    ) == (3, True)
+    assert network.parse_packet_info(
+        [(socket.IPPROTO_IPV6, socket.IPV6_PKTINFO, ipv6)]
+    ) == (3, False)
+    assert network.parse_packet_info([]) == (None, False)
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="requires IP_PKTINFO")
+def test_enable_packet_info():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        network.enable_packet_info(sock)
+        sock.sendto(b"data", sock.getsockname())
+        _, ancillary, _, _ = sock.recvmsg(16, socket.CMSG_SPACE(20))
+    index, multicast = network.parse_packet_info(ancillary)
+    assert index == socket.if_nametoindex("lo")
+    assert not multicast
@@ -0,0 +1,222 @@
+import gzip
+import io
+
+import pytest
+from ssdp import aio
+from ssdp.messages import SSDPRequest, SSDPResponse
+from ssdp.registry import Registry
+
+from .fixtures import Clock, run
+
+
+def notify(usn, nts="ssdp:alive", nt="upnp:rootdevice", max_age=1800, **headers):
+    return SSDPRequest(
+        "NOTIFY",
+        headers={
+            "CACHE-CONTROL": f"max-age={max_age}",
+            "LOCATION": "http://10.0.0.1:80/description.xml",
+            "NT": nt,
+            "NTS": nts,
+            "USN": usn,
+            **headers,
+        },
+    )
+
+
+def response(usn, st="upnp:rootdevice", max_age=1800, location="http://10.0.0.2/"):
+    return SSDPResponse(
+        200,
+        "OK",
+        headers={
+            "CACHE-CONTROL": f"max-age={max_age}",
+            "LOCATION": location,
+            "ST": st,
+            "USN": usn,
+        },
+    )
+
+
+class TestRegistry:
+    def test_process__alive(self):
+        registry = Registry(clock=Clock())
+        device = registry.process(notify("uuid:1::upnp:rootdevice"), ("10.0.0.1", 1900))
+        assert device.usn == "uuid:1::upnp:rootdevice"
+        assert device.type == "upnp:rootdevice"
+        assert device.host == "10.0.0.1"
+        assert device.addr == ("10.0.0.1", 1900)
+        assert device.expires == 1800
+        assert registry.get("uuid:1::upnp:rootdevice") is device
+        assert "uuid:1::upnp:rootdevice" in registry
+        assert len(registry) == 1
+        assert list(registry) == [device]
+
+    def test_process__byebye(self):
+        registry = Registry(clock=Clock())
+        registry.process(notify("uuid:1"))
+        assert registry.process(notify("uuid:1", nts="ssdp:byebye")).usn == "uuid:1"
+        assert "uuid:1" not in registry
+        assert registry.by_type("upnp:rootdevice") == []
+        assert registry.by_host("10.0.0.1") == []
+
+    def test_process__update(self):
+        clock = Clock()
+        registry = Registry(clock=clock)
+        registry.process(notify("uuid:1", max_age=100))
+        clock.now = 40
+        update = notify("uuid:1", nts="ssdp:update", **{"BOOTID.UPNP.ORG": "2"})
+        del update.headers[0]  # CACHE-CONTROL
+        device = registry.process(update)
+        assert device.expires == 100
+        assert device.headers.get("bootid.upnp.org") == "2"
+
+    def test_process__response(self):
+        registry = Registry(clock=Clock())
+        device = registry.process(response("uuid:2::urn:x", st="urn:x"))
+        assert device.type == "urn:x"
+        assert registry.by_type("urn:x") == [device]
+        assert registry.by_host("10.0.0.2") == [device]
+
+    def test_process__ignored(self):
+        registry = Registry(clock=Clock())
+        assert registry.process(SSDPRequest("M-SEARCH", headers={"USN": "x"})) is None
+        assert registry.process(SSDPRequest("NOTIFY")) is None
+        assert registry.process(notify("uuid:1", nts="ssdp:other")) is None
+        assert (
+            registry.process(SSDPResponse(404, "Not Found", headers={"USN": "x"}))
+            is None
+        )
+        assert len(registry) == 0
+
+    def test_process__default_max_age(self):
+        registry = Registry(default_max_age=60, clock=Clock())
+        device = registry.process(response("uuid:1", max_age="invalid"))
+        assert device.expires == 60
+
+    def test_expire(self):
+        clock = Clock()
+        registry = Registry(clock=clock)
+        registry.process(notify("uuid:1", max_age=10))
+        registry.process(notify("uuid:2", max_age=20))
+        assert registry.next_expiry() == 10
+        clock.now = 5
+        registry.process(notify("uuid:1", max_age=30))
+        assert registry.next_expiry() == 20
+        clock.now = 20
+        assert [device.usn for device in registry.expire()] == ["uuid:2"]
+        assert registry.get("uuid:2") is None
+        clock.now = 35
+        assert registry.get("uuid:1") is None
+        assert registry.next_expiry() is None
+        assert registry.expire() == []
+
+    def test_max_entries(self):
+        registry = Registry(max_entries=2, clock=Clock())
+        registry.process(notify("uuid:1"))
+        registry.process(notify("uuid:2"))
+        registry.get("uuid:1")
+        registry.process(notify("uuid:3"))
+        assert [device.usn for device in registry] == ["uuid:1", "uuid:3"]
+        assert {d.usn for d in registry.by_type("upnp:rootdevice")} == {
+            "uuid:1",
+            "uuid:3",
+        }
+
+    def test_compact(self):
+        registry = Registry(clock=Clock())
+        for max_age in range(200):
+            registry.process(notify("uuid:1", max_age=max_age + 1))
+        assert len(registry._expiry) < 100
+        assert registry.next_expiry() == 200
+
+    def test_invalid_location(self):
+        registry = Registry(clock=Clock())
+        device = registry.process(response("uuid:1", location="http://[invalid/"))
+        assert device.host is None
+        assert repr(device) == "<Device: uuid:1>"
+
+
+class TestSnapshot:
+    def test_dump_load(self):
+        clock = Clock()
+        registry = Registry(clock=clock)
+        registry.process(notify("uuid:1", max_age=10), ("10.0.0.1", 1900))
+        registry.process(response("uuid:2", max_age=100))
+        file = io.BytesIO()
+        registry.dump(file, wall_time=1000)
+        assert file.getvalue()[:2] == b"\x1f\x8b"
+
+        file.seek(0)
+        clock = Clock()
+        clock.now = 50
+        restored = Registry(clock=clock)
+        loaded = restored.load(file, wall_time=1005)
+        assert [device.usn for device in loaded] == ["uuid:1", "uuid:2"]
+        device = restored.get("uuid:1")
+        assert device.expires == 55
+        assert device.addr == ("10.0.0.1", 1900)
+        assert device.location == "http://10.0.0.1:80/description.xml"
+        assert device.headers.get("nts") == "ssdp:alive"
+        assert device.type == "upnp:rootdevice"
+        assert restored.by_host("10.0.0.2") == [restored.get("uuid:2")]
+        assert restored.next_expiry() == 55
+
+    def test_load__expired(self):
+        registry = Registry(clock=Clock())
+        registry.process(notify("uuid:1", max_age=10))
+        registry.process(notify("uuid:2", max_age=100))
+        file = io.BytesIO()
+        registry.dump(file, wall_time=1000)
+        file.seek(0)
+        restored = Registry(clock=Clock())
+        assert [d.usn for d in restored.load(file, wall_time=1010)] == ["uuid:2"]
+        assert len(restored) == 1
+
+    def test_load__existing(self):
+        registry = Registry(clock=Clock())
+        registry.process(notify("uuid:1"))
+        file = io.BytesIO()
+        registry.dump(file)
+        file.seek(0)
+        restored = Registry(clock=Clock())
+        device = restored.process(response("uuid:1"))
+        assert restored.load(file) == []
+        assert restored.get("uuid:1") is device
+
+    def test_load__invalid(self):
+        with pytest.raises(ValueError, match="Invalid snapshot"):
+            Registry().load(io.BytesIO(b"invalid"))
+        file = io.BytesIO()
+        with gzip.GzipFile(fileobj=file, mode="wb") as f:
+            f.write(b"[]")
+        file.seek(0)
+        with pytest.raises(ValueError, match="Unsupported snapshot version"):
+            Registry().load(file)
+
+
+class TestVerify:
+    def verify(self, monkeypatch, **kwargs):
+        clock = Clock()
+        registry = Registry(clock=clock)
+        registry.process(notify("uuid:1"))
+        registry.process(notify("uuid:2"))
+        calls = []
+
+        async def search(st, mx, **kwargs):
+            calls.append((st, mx, kwargs))
+            yield response("uuid:1"), ("10.0.0.2", 1900)
+            yield response("uuid:3"), ("10.0.0.3", 1900)
+
+        monkeypatch.setattr(aio, "search", search)
+        refreshed = run(registry.verify(**kwargs))
+        return registry, refreshed, calls
+
+    def test_verify(self, monkeypatch):
+        registry, refreshed, calls = self.verify(monkeypatch, retries=1)
+        assert calls == [("ssdp:all", 2, {"retries": 1})]
+        assert [device.usn for device in refreshed] == ["uuid:1"]
+        assert refreshed[0].addr == ("10.0.0.2", 1900)
+        assert {device.usn for device in registry} == {"uuid:1", "uuid:2", "uuid:3"}
+
+    def test_verify__prune(self, monkeypatch):
+        registry, _, _ = self.verify(monkeypatch, prune=True)
+        assert {device.usn for device in registry} == {"uuid:1", "uuid:3"}
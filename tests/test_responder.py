@@ -0,0 +1,171 @@
+from unittest.mock import Mock
+
+from ssdp import messages, responder
+
+from .fixtures import Clock, advance, advertisement, run
+
+SEARCHER = "10.0.0.2", 50000
+BASIC = "urn:schemas-upnp-org:device:Basic:1"
+
+
+def search(st, mx="1", man='"ssdp:discover"'):
+    headers = {"HOST": "239.255.255.250:1900", "ST": st}
+    if man is not None:
+        headers["MAN"] = man
+    if mx is not None:
+        headers["MX"] = mx
+    return messages.SSDPRequest("M-SEARCH", headers=headers)
+
+
+def respond(protocol, *requests, wait=1.1):
+    """Pass requests from their addresses to the protocol and return the responses."""
+
+    async def main():
+        transport = Mock()
+        protocol.connection_made(transport)
+        start = protocol.clock()
+        times = []
+        transport.sendto.side_effect = lambda *args: times.append(
+            protocol.clock() - start
+        )
+        for request, addr in requests:
+            protocol.request_received(request, addr)
+        advance(protocol, wait)
+        return [
+            (messages.SSDPResponse.parse_bytes(data), addr, time)
+            for ((data, addr), _), time in zip(
+                transport.sendto.call_args_list, times, strict=True
+            )
+        ]
+
+    return run(main())
+
+
+def usns(responses):
+    return sorted(response.get_header("USN") for response, _, _ in responses)
+
+
+class TestResponder:
+    def responder(self, **kwargs):
+        return responder.Responder(
+            [advertisement(0), advertisement(1), advertisement(0, nt=BASIC)],
+            clock=Clock(),
+            **kwargs,
+        )
+
+    def test_search(self):
+        responses = respond(self.responder(), (search(BASIC), SEARCHER))
+        assert usns(responses) == [f"uuid:0::{BASIC}"]
+        [(response, addr, time)] = responses
+        assert response.get_header("ST") == BASIC
+        assert addr == SEARCHER
+        assert time <= 1
+
+    def test_search__all(self):
+        responses = respond(
+            self.responder(), (search("ssdp:all", mx="2"), SEARCHER), wait=2.1
+        )
+        assert len(responses) == 3
+        assert all(time <= 2 for _, _, time in responses)
+
+    def test_search__unicast(self):
+        responses = respond(
+            self.responder(), (search("upnp:rootdevice", mx=None), SEARCHER), wait=0
+        )
+        assert usns(responses) == ["uuid:0::upnp:rootdevice", "uuid:1::upnp:rootdevice"]
+        assert {addr for _, addr, _ in responses} == {SEARCHER}
+
+    def test_search__ignored(self):
+        notify = messages.SSDPRequest("NOTIFY", headers={"NT": "upnp:rootdevice"})
+        assert not respond(
+            self.responder(),
+            (search("urn:schemas-upnp-org:device:Other:1"), SEARCHER),
+            (search("ssdp:all", mx="invalid"), SEARCHER),
+            (search("ssdp:all", man=None), SEARCHER),
+            (notify, SEARCHER),
+        )
+
+    def test_coalesce(self):
+        protocol = self.responder()
+        other = "10.0.0.3", 50000
+        responses = respond(
+            protocol,
+            (search("ssdp:all"), SEARCHER),
+            (search("ssdp:all"), SEARCHER),
+            (search("upnp:rootdevice"), SEARCHER),
+            (search("upnp:rootdevice"), other),
+        )
+        assert len(responses) == 5
+        assert protocol.coalesced == 5
+        assert not protocol._pending
+        # Once sent, responses are no longer pending.
+        assert len(respond(protocol, (search("ssdp:all"), SEARCHER))) == 3
+
+    def test_rate__source(self):
+        protocol = self.responder(source_rate=1, source_burst=4)
+        other = "10.0.0.3", 50000
+        responses = respond(
+            protocol,
+            (search("ssdp:all", mx=None), ("10.0.0.2", 50000)),
+            (search("ssdp:all", mx=None), ("10.0.0.2", 50001)),
+            (search("ssdp:all", mx=None), other),
+            wait=0,
+        )
+        hosts = [addr[0] for _, addr, _ in responses]
+        assert hosts.count("10.0.0.2") == 4
+        assert hosts.count("10.0.0.3") == 3
+        assert protocol.dropped == 2
+
+    def test_rate__global(self):
+        protocol = self.responder(rate=1, burst=4)
+        responses = respond(
+            protocol,
+            (search("ssdp:all", mx=None), SEARCHER),
+            (search("ssdp:all", mx=None), ("10.0.0.3", 50000)),
+            wait=0,
+        )
+        assert len(responses) == 4
+        assert protocol.dropped == 2
+
+    def test_rate__disabled(self):
+        protocol = self.responder(rate=None, source_rate=None)
+        requests = [(search("ssdp:all", mx=None), ("10.0.0.2", i)) for i in range(1000)]
+        assert len(respond(protocol, *requests, wait=0)) == 3000
+        assert protocol.dropped == 0
+        assert not protocol._sources
+
+    def test_max_sources(self):
+        protocol = self.responder(max_sources=10)
+        for i in range(100):
+            protocol.request_received(search("ssdp:all"), (f"10.0.1.{i}", 1900))
+        assert len(protocol._sources) == 10
+        assert "10.0.1.99" in protocol._sources
+
+    def test_add__replace(self):
+        protocol = self.responder()
+        protocol.add(advertisement(0))
+        assert len(protocol) == 3
+        assert len(protocol.matching("upnp:rootdevice")) == 2
+
+    def test_remove(self):
+        protocol = self.responder()
+        assert protocol.remove(f"uuid:0::{BASIC}").nt == BASIC
+        assert protocol.remove(f"uuid:0::{BASIC}") is None
+        assert not protocol.matching(BASIC)
+        assert BASIC not in protocol._by_nt
+        assert len(list(protocol)) == 2
+
+    def test_close(self):
+        async def main():
+            protocol = self.responder()
+            transport = Mock()
+            protocol.connection_made(transport)
+            protocol.request_received(search("ssdp:all"), SEARCHER)
+            protocol.close()
+            advance(protocol, 1.1)
+            return protocol, transport
+
+        protocol, transport = run(main())
+        assert not transport.sendto.called
+        assert not protocol._pending
+        assert len(protocol) == 3
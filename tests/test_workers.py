@@ -0,0 +1,131 @@
+import asyncio
+import os
+import socket
+import sys
+from unittest.mock import Mock
+
+import pytest
+from ssdp import filters, messages, network, workers
+
+from . import fixtures
+from .fixtures import run
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class PidProtocol(workers.WorkerProtocol):
+    def request_received(self, request, addr):
+        self.publish((request, addr, os.getpid()))
+
+
+def serve(port, senders, host="127.0.0.1", group=None, target="127.0.0.1"):
+    """Send a datagram from each sender to two workers and return the items."""
+    items = []
+
+    async def main():
+        server = workers.ShardedServer(
+            PidProtocol,
+            items.append,
+            workers=2,
+            host=host,
+            port=port,
+            group=group,
+        )
+        await server.start()
+        sockets = [socket.socket(socket.AF_INET, socket.SOCK_DGRAM) for _ in senders]
+        try:
+            for sock in sockets:
+                sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+                sock.sendto(fixtures.request, (target, port))
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + 10
+            while len(items) < len(sockets) and loop.time() < deadline:
+                await asyncio.sleep(0.01)
+            # Catch datagrams, that were delivered more than once.
+            await asyncio.sleep(0.1)
+        finally:
+            for sock in sockets:
+                sock.close()
+            server.close()
+        return server
+
+    server = run(main())
+    assert server.processes == []
+    return items
+
+
+@pytest.mark.skipif(not hasattr(socket, "SO_REUSEPORT"), reason="requires SO_REUSEPORT")
+@pytest.mark.skipif(sys.platform == "win32", reason="requires a selector event loop")
+class TestShardedServer:
+    def test_loopback(self):
+        items = serve(free_port(), range(20))
+        assert len(items) == 20
+        request, addr, pid = items[0]
+        assert isinstance(request, messages.SSDPRequest)
+        assert request.get_header("NTS") == "ssdp:alive"
+        assert addr[0] == "127.0.0.1"
+        assert len({pid for *_, pid in items}) == 2
+
+    def test_loopback__group(self):
+        try:
+            network.create_socket(port=0, group=network.MULTICAST_ADDRESS_IPV4).close()
+        except OSError:  # pragma: no cover
+            pytest.skip("multicast is not available")
+        # Unicast datagrams are not sharded, since the kernel balances them.
+        items = serve(free_port(), range(40), group=network.MULTICAST_ADDRESS_IPV4)
+        assert len(items) == 40
+        assert len({pid for *_, pid in items}) == 2
+
+    def test_multicast(self):
+        group = network.MULTICAST_ADDRESS_IPV4
+        try:
+            with network.create_socket(port=0, group=group) as sock:
+                sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+                sock.sendto(b"", (group, sock.getsockname()[1]))
+        except OSError:  # pragma: no cover
+            pytest.skip("multicast is not available")
+        # Every worker receives each multicast datagram, but only one handles it.
+        items = serve(free_port(), range(20), host="", group=group, target=group)
+        assert len(items) == 20
+        assert len({addr for _, addr, _ in items}) == 20
+        # All datagrams are sent from the same host, and thus the same shard.
+        assert len({pid for *_, pid in items}) == 1
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="requires a selector event loop")
+class TestShardedTransport:
+    def receive(self, level, kind, info, drop=True):
+        sock = Mock(family=socket.AF_INET if level == socket.IPPROTO_IP else 10)
+        sock.recvmsg.return_value = b"data", [(level, kind, info)], 0, ("10.0.0.1", 1)
+        shard = Mock(return_value=drop)
+        transport = workers._ShardedTransport(Mock(), sock, Mock(), shard)
+        return transport._receive()
+
+    def test_receive__ipv4(self):
+        multicast = bytes(8) + socket.inet_aton("239.255.255.250")
+        unicast = bytes(8) + socket.inet_aton("10.0.0.2")
+        pktinfo = network.IP_PKTINFO
+        assert self.receive(socket.IPPROTO_IP, pktinfo, multicast) is None
+        assert self.receive(socket.IPPROTO_IP, pktinfo, multicast, drop=False)
+        assert self.receive(socket.IPPROTO_IP, pktinfo, unicast) == (
+            b"data",
+            ("10.0.0.1", 1),
+        )
+
+    def test_receive__ipv6(self):
+        multicast = socket.inet_pton(socket.AF_INET6, "ff02::c") + bytes(4)
+        unicast = socket.inet_pton(socket.AF_INET6, "fe80::1") + bytes(4)
+        pktinfo = socket.IPV6_PKTINFO
+        assert self.receive(socket.IPPROTO_IPV6, pktinfo, multicast) is None
+        assert self.receive(socket.IPPROTO_IPV6, pktinfo, unicast)
+
+
+class TestShardFilter:
+    def test_call(self):
+        shards = [filters.ShardFilter(index, 3) for index in range(3)]
+        for host in ["10.0.0.1", "10.0.0.2", "192.168.1.42", "fe80::1"]:
+            assert [drop(b"", (host, 1900)) for drop in shards].count(False) == 1